@@ -0,0 +1,25 @@
+const { DEFAULT_TENANT_ID } = require("../services/tenant.service");
+
+const UUID_PATTERN = /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i;
+
+/**
+ * Tenant scoping middleware
+ * Sets req.tenantId from the X-Tenant-Id header (agent workers) or the
+ * tenant_id query parameter (dashboard), defaulting to the default tenant so
+ * single-tenant deployments need no changes.
+ */
+function tenantScope(req, res, next) {
+  const tenantId = req.get("X-Tenant-Id") || req.query.tenant_id || DEFAULT_TENANT_ID;
+
+  if (!UUID_PATTERN.test(tenantId)) {
+    return res.status(400).json({
+      success: false,
+      error: "Tenant id must be a UUID",
+    });
+  }
+
+  req.tenantId = tenantId;
+  next();
+}
+
+module.exports = { tenantScope };
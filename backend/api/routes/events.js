@@ -0,0 +1,67 @@
+const express = require("express");
+const router = express.Router();
+const eventsService = require("../services/events.service");
+
+const TOPICS = ["help_requests", "knowledge_base"];
+const HEARTBEAT_MS = parseInt(process.env.EVENTS_HEARTBEAT_MS) || 15000;
+
+/**
+ * GET /api/events
+ * Server-sent events stream of the tenant's help request and knowledge base
+ * changes (dashboards via EventSource, agent workers via a streaming GET)
+ * Query params:
+ *   - topics: Optional. Comma-separated subset of "help_requests,knowledge_base"
+ *
+ * Events:
+ *   - ready: Sent once the stream is subscribed; refetch anything loaded before it
+ *   - help_requests: { op, id, status, call_id, tenant_id }
+ *   - knowledge_base: { op, id, is_active, learned_from_request_id, tenant_id }
+ *   - resync: Changes may have been missed (backend reconnected to the database)
+ * Comment lines are sent every 15s so proxies and clients can detect dead streams.
+ */
+router.get("/", (req, res) => {
+  const topics = req.query.topics
+    ? req.query.topics.split(",").map((topic) => topic.trim())
+    : TOPICS;
+
+  if (topics.length === 0 || topics.some((topic) => !TOPICS.includes(topic))) {
+    return res.status(400).json({
+      success: false,
+      error: `Query parameter "topics" must be a subset of: ${TOPICS.join(", ")}`,
+    });
+  }
+
+  res.set({
+    "Content-Type": "text/event-stream",
+    "Cache-Control": "no-cache",
+    Connection: "keep-alive",
+    "X-Accel-Buffering": "no", // Disable proxy buffering (nginx)
+  });
+  res.flushHeaders();
+
+  const send = (event, data) => {
+    res.write(`event: ${event}\ndata: ${JSON.stringify(data)}\n\n`);
+  };
+
+  const unsubscribe = eventsService.subscribe(
+    (change) => {
+      if (change.tenant_id === req.tenantId && topics.includes(change.table)) {
+        send(change.table, change);
+      }
+    },
+    () => send("resync", {})
+  );
+
+  const heartbeat = setInterval(() => res.write(": heartbeat\n\n"), HEARTBEAT_MS);
+
+  req.on("close", () => {
+    clearInterval(heartbeat);
+    unsubscribe();
+  });
+
+  // Reconnect after 3s if the stream drops (EventSource)
+  res.write("retry: 3000\n\n");
+  send("ready", { tenant_id: req.tenantId, topics });
+});
+
+module.exports = router;
@@ -17,7 +17,7 @@ router.get("/", async (req, res, next) => {
       offset: parseInt(offset) || 0,
     };
 
-    const requests = await helpRequestService.getHelpRequests(filters);
+    const requests = await helpRequestService.getHelpRequests(req.tenantId, filters);
 
     res.json({
       success: true,
@@ -35,7 +35,7 @@ router.get("/", async (req, res, next) => {
  */
 router.get("/stats", async (req, res, next) => {
   try {
-    const stats = await helpRequestService.getStatistics();
+    const stats = await helpRequestService.getStatistics(req.tenantId);
 
     res.json({
       success: true,
@@ -53,7 +53,7 @@ router.get("/stats", async (req, res, next) => {
 router.get("/:id", async (req, res, next) => {
   try {
     const { id } = req.params;
-    const helpRequest = await helpRequestService.getHelpRequestById(id);
+    const helpRequest = await helpRequestService.getHelpRequestById(req.tenantId, id);
 
     if (!helpRequest) {
       return res.status(404).json({
@@ -88,7 +88,7 @@ router.post("/", async (req, res, next) => {
       });
     }
 
-    const helpRequest = await helpRequestService.createHelpRequest({
+    const helpRequest = await helpRequestService.createHelpRequest(req.tenantId, {
       customer_phone,
       question,
       call_id,
@@ -104,6 +104,51 @@ router.post("/", async (req, res, next) => {
   }
 });
 
+/**
+ * POST /api/help-requests/batch
+ * Create several help requests at once (agent escalation queue flush)
+ * Body: { requests: [{ customer_phone, question, call_id }] }
+ * All requests belong to the request's tenant (X-Tenant-Id); a tenant_id on a
+ * request, sent by older agent workers, must name that same tenant.
+ */
+router.post("/batch", async (req, res, next) => {
+  try {
+    const { requests } = req.body;
+
+    // Validate required fields
+    if (!Array.isArray(requests) || requests.length === 0) {
+      return res.status(400).json({
+        success: false,
+        error: "Missing required field: requests (non-empty array)",
+      });
+    }
+
+    if (requests.some((r) => !r || !r.customer_phone || !r.question)) {
+      return res.status(400).json({
+        success: false,
+        error: "Every request needs customer_phone and question",
+      });
+    }
+
+    if (requests.some((r) => r.tenant_id && String(r.tenant_id).toLowerCase() !== req.tenantId.toLowerCase())) {
+      return res.status(400).json({
+        success: false,
+        error: "Every request must belong to the X-Tenant-Id tenant",
+      });
+    }
+
+    const helpRequests = await helpRequestService.createHelpRequests(req.tenantId, requests);
+
+    res.status(201).json({
+      success: true,
+      count: helpRequests.length,
+      data: helpRequests,
+    });
+  } catch (error) {
+    next(error);
+  }
+});
+
 /**
  * POST /api/help-requests/:id/respond
  * Respond to a help request (supervisor provides answer)
@@ -123,6 +168,7 @@ router.post("/:id/respond", async (req, res, next) => {
     }
 
     const updatedRequest = await helpRequestService.respondToHelpRequest(
+      req.tenantId,
       id,
       answer
     );
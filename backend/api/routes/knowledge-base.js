@@ -17,7 +17,7 @@ router.get('/', async (req, res, next) => {
       active_only: active_only !== 'false', // Default to true
     };
 
-    const entries = await knowledgeService.getAllKnowledge(options);
+    const entries = await knowledgeService.getAllKnowledge(req.tenantId, options);
 
     res.json({
       success: true,
@@ -35,7 +35,7 @@ router.get('/', async (req, res, next) => {
  */
 router.get('/stats', async (req, res, next) => {
   try {
-    const stats = await knowledgeService.getKnowledgeStatistics();
+    const stats = await knowledgeService.getKnowledgeStatistics(req.tenantId);
 
     res.json({
       success: true,
@@ -46,6 +46,63 @@ router.get('/stats', async (req, res, next) => {
   }
 });
 
+/**
+ * GET /api/knowledge-base/version
+ * Get the current knowledge base version (used by agents to invalidate caches)
+ * Supports If-None-Match: responds 304 when the version is unchanged
+ */
+router.get('/version', async (req, res, next) => {
+  try {
+    const version = await knowledgeService.getKnowledgeVersion(req.tenantId);
+    const etag = `"${version.version}"`;
+
+    res.set('ETag', etag);
+    if (req.get('If-None-Match') === etag) {
+      return res.status(304).end();
+    }
+
+    res.json({
+      success: true,
+      data: version,
+    });
+  } catch (error) {
+    next(error);
+  }
+});
+
+/**
+ * GET /api/knowledge-base/sync
+ * Get entries changed since a timestamp, for agent-side local indexes
+ * Query params:
+ *   - since: Optional ISO timestamp. Omit for a full load of active entries.
+ *
+ * Returns: Changed entries (including deactivated ones) and the server time
+ *          to use as the next "since" cursor
+ */
+router.get('/sync', async (req, res, next) => {
+  try {
+    const { since } = req.query;
+
+    if (since && isNaN(Date.parse(since))) {
+      return res.status(400).json({
+        success: false,
+        error: 'Query parameter "since" must be an ISO timestamp',
+      });
+    }
+
+    const changes = await knowledgeService.getKnowledgeChanges(req.tenantId, since || null);
+
+    res.json({
+      success: true,
+      count: changes.entries.length,
+      server_time: changes.server_time,
+      data: changes.entries,
+    });
+  } catch (error) {
+    next(error);
+  }
+});
+
 /**
  * GET /api/knowledge-base/search
  * Search knowledge base for an answer using multi-strategy matching
@@ -79,6 +136,7 @@ router.get('/search', async (req, res, next) => {
       : null;
 
     const entries = await knowledgeService.searchKnowledgeBase(
+      req.tenantId,
       q,
       parseFloat(threshold) || 0.3,
       tagsArray,
@@ -107,6 +165,73 @@ router.get('/search', async (req, res, next) => {
   }
 });
 
+/**
+ * POST /api/knowledge-base/search/batch
+ * Search knowledge base for several questions in one database round trip
+ * (e.g. the parts of a compound question)
+ * Body: {
+ *   queries: [{ q, extracted_tags }] - extracted_tags optional, array of tags
+ *   threshold: Optional. Minimum similarity score (default 0.3)
+ *   limit: Optional. Maximum results per question (default 5, max 20)
+ * }
+ *
+ * Returns: One result set per query, in request order
+ */
+router.post('/search/batch', async (req, res, next) => {
+  try {
+    const { queries, threshold, limit } = req.body;
+
+    if (!Array.isArray(queries) || queries.length === 0) {
+      return res.status(400).json({
+        success: false,
+        error: 'Missing required field: queries (non-empty array)',
+      });
+    }
+
+    if (queries.length > 10) {
+      return res.status(400).json({
+        success: false,
+        error: 'At most 10 queries per batch',
+      });
+    }
+
+    if (queries.some((item) => !item || typeof item.q !== 'string' || item.q.trim().length === 0)) {
+      return res.status(400).json({
+        success: false,
+        error: 'Every query needs a non-empty "q"',
+      });
+    }
+
+    let parsedLimit = parseInt(limit) || 5;
+    parsedLimit = Math.min(Math.max(1, parsedLimit), 20); // Cap between 1 and 20
+
+    const results = await knowledgeService.searchKnowledgeBaseBatch(
+      req.tenantId,
+      queries.map((item) => ({
+        question: item.q,
+        extractedTags: Array.isArray(item.extracted_tags)
+          ? item.extracted_tags.map((tag) => String(tag).trim().toLowerCase()).filter((tag) => tag.length > 0)
+          : null,
+      })),
+      parseFloat(threshold) || 0.3,
+      parsedLimit
+    );
+
+    res.json({
+      success: true,
+      count: results.length,
+      data: queries.map((item, i) => ({
+        q: item.q,
+        found: results[i].length > 0,
+        count: results[i].length,
+        data: results[i],
+      })),
+    });
+  } catch (error) {
+    next(error);
+  }
+});
+
 /**
  * GET /api/knowledge-base/:id
  * Get a single knowledge base entry by ID
@@ -114,7 +239,7 @@ router.get('/search', async (req, res, next) => {
 router.get('/:id', async (req, res, next) => {
   try {
     const { id } = req.params;
-    const entry = await knowledgeService.getKnowledgeById(id);
+    const entry = await knowledgeService.getKnowledgeById(req.tenantId, id);
 
     if (!entry) {
       return res.status(404).json({
@@ -149,7 +274,7 @@ router.post('/', async (req, res, next) => {
       });
     }
 
-    const entry = await knowledgeService.createKnowledgeEntry({
+    const entry = await knowledgeService.createKnowledgeEntry(req.tenantId, {
       question_pattern,
       answer,
       tags: tags || [],
@@ -172,6 +297,24 @@ router.post('/', async (req, res, next) => {
   }
 });
 
+/**
+ * POST /api/knowledge-base/:id/usage
+ * Record that an entry was used to answer a caller
+ * (used by agents that search their local index instead of /search)
+ */
+router.post('/:id/usage', async (req, res, next) => {
+  try {
+    const { id } = req.params;
+    await knowledgeService.incrementUsageCount(req.tenantId, id);
+
+    res.json({
+      success: true,
+    });
+  } catch (error) {
+    next(error);
+  }
+});
+
 /**
  * PATCH /api/knowledge-base/:id
  * Update a knowledge base entry
@@ -182,7 +325,7 @@ router.patch('/:id', async (req, res, next) => {
     const { id } = req.params;
     const updates = req.body;
 
-    const updatedEntry = await knowledgeService.updateKnowledgeEntry(id, updates);
+    const updatedEntry = await knowledgeService.updateKnowledgeEntry(req.tenantId, id, updates);
 
     res.json({
       success: true,
@@ -215,7 +358,7 @@ router.patch('/:id', async (req, res, next) => {
 router.delete('/:id', async (req, res, next) => {
   try {
     const { id } = req.params;
-    const deletedEntry = await knowledgeService.deleteKnowledgeEntry(id);
+    const deletedEntry = await knowledgeService.deleteKnowledgeEntry(req.tenantId, id);
 
     res.json({
       success: true,
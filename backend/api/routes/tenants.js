@@ -0,0 +1,91 @@
+const express = require("express");
+const router = express.Router();
+const tenantService = require("../services/tenant.service");
+
+/**
+ * GET /api/tenants
+ * Get all active tenants
+ */
+router.get("/", async (req, res, next) => {
+  try {
+    const tenants = await tenantService.getTenants();
+
+    res.json({
+      success: true,
+      count: tenants.length,
+      data: tenants,
+    });
+  } catch (error) {
+    next(error);
+  }
+});
+
+/**
+ * GET /api/tenants/resolve
+ * Resolve the tenant of an inbound call (used by agent workers at call start)
+ * Query params (first match wins):
+ *   - tenant_id: Tenant UUID or slug, e.g. from the room metadata
+ *   - phone: Dialed SIP number (E.164)
+ * Falls back to the default tenant when neither matches.
+ */
+router.get("/resolve", async (req, res, next) => {
+  try {
+    const { tenant_id, phone } = req.query;
+
+    let tenant = null;
+    let matchedBy = "default";
+    if (tenant_id) {
+      tenant = await tenantService.getTenant(tenant_id);
+      matchedBy = "tenant_id";
+    }
+    if (!tenant && phone) {
+      tenant = await tenantService.getTenantByPhoneNumber(phone);
+      matchedBy = "phone";
+    }
+    if (!tenant) {
+      tenant = await tenantService.getTenant(tenantService.DEFAULT_TENANT_ID);
+      matchedBy = "default";
+    }
+
+    if (!tenant) {
+      return res.status(404).json({
+        success: false,
+        error: "No tenant found",
+      });
+    }
+
+    res.json({
+      success: true,
+      matched_by: matchedBy,
+      data: tenant,
+    });
+  } catch (error) {
+    next(error);
+  }
+});
+
+/**
+ * GET /api/tenants/:id
+ * Get a single tenant by ID or slug
+ */
+router.get("/:id", async (req, res, next) => {
+  try {
+    const tenant = await tenantService.getTenant(req.params.id);
+
+    if (!tenant) {
+      return res.status(404).json({
+        success: false,
+        error: "Tenant not found",
+      });
+    }
+
+    res.json({
+      success: true,
+      data: tenant,
+    });
+  } catch (error) {
+    next(error);
+  }
+});
+
+module.exports = router;
@@ -5,8 +5,12 @@ require('dotenv').config();
 
 const helpRequestRoutes = require('./routes/help-requests');
 const knowledgeBaseRoutes = require('./routes/knowledge-base');
+const tenantRoutes = require('./routes/tenants');
+const eventRoutes = require('./routes/events');
+const { tenantScope } = require('./middleware/tenant');
 const { pool } = require('../db/config');
 const { processTimeouts } = require('./services/helpRequest.service');
+const { startChangeFeed, stopChangeFeed, getChangeFeedStats } = require('./services/events.service');
 
 const app = express();
 const PORT = process.env.PORT || 3000;
@@ -39,7 +43,8 @@ app.get('/health', async (req, res) => {
     res.json({
       status: 'healthy',
       timestamp: new Date().toISOString(),
-      database: 'connected'
+      database: 'connected',
+      events: getChangeFeedStats()
     });
   } catch (error) {
     res.status(503).json({
@@ -54,8 +59,10 @@ app.get('/health', async (req, res) => {
 /**
  * API Routes
  */
-app.use('/api/help-requests', helpRequestRoutes);
-app.use('/api/knowledge-base', knowledgeBaseRoutes);
+app.use('/api/help-requests', tenantScope, helpRequestRoutes);
+app.use('/api/knowledge-base', tenantScope, knowledgeBaseRoutes);
+app.use('/api/tenants', tenantRoutes);
+app.use('/api/events', tenantScope, eventRoutes);
 
 /**
  * 404 Handler
@@ -109,6 +116,7 @@ process.on('SIGTERM', async () => {
     timeoutJob.stop();
     console.log('⏰ Timeout monitor stopped');
   }
+  await stopChangeFeed();
   await pool.end();
   process.exit(0);
 });
@@ -119,6 +127,7 @@ process.on('SIGINT', async () => {
     timeoutJob.stop();
     console.log('⏰ Timeout monitor stopped');
   }
+  await stopChangeFeed();
   await pool.end();
   process.exit(0);
 });
@@ -157,6 +166,9 @@ app.listen(PORT, () => {
 
   // Start the timeout monitor after server is running
   startTimeoutMonitor();
+
+  // Push help request and knowledge base changes to /api/events subscribers
+  startChangeFeed();
 });
 
 module.exports = app;
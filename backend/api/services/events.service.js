@@ -0,0 +1,160 @@
+const EventEmitter = require('events');
+const { createClient } = require('../../db/config');
+
+/**
+ * Change Feed Service
+ * Holds one dedicated connection that LISTENs for the notifications of
+ * migration 011 and fans each change out to in-process subscribers (the
+ * GET /api/events streams). However many dashboards and agent workers are
+ * subscribed, the database sees a single listening connection.
+ */
+
+const CHANNEL = 'frontdesk_changes';
+const RECONNECT_DELAY_MS = parseInt(process.env.EVENTS_RECONNECT_DELAY_MS) || 2000;
+
+const emitter = new EventEmitter();
+emitter.setMaxListeners(0); // One listener per open stream
+
+let client = null;
+let stopped = false;
+let reconnectTimer = null;
+let notifications = 0;
+let connectedOnce = false;
+
+/**
+ * Schedule a reconnect after the listening connection failed
+ */
+function scheduleReconnect() {
+  if (stopped || reconnectTimer) {
+    return;
+  }
+  reconnectTimer = setTimeout(() => {
+    reconnectTimer = null;
+    connect();
+  }, RECONNECT_DELAY_MS);
+}
+
+/**
+ * Parse and publish one notification
+ * @param {Object} msg - pg notification { channel, payload }
+ */
+function handleNotification(msg) {
+  if (msg.channel !== CHANNEL) {
+    return;
+  }
+
+  let change;
+  try {
+    change = JSON.parse(msg.payload);
+  } catch (error) {
+    console.error('Ignoring malformed change notification:', msg.payload);
+    return;
+  }
+
+  notifications += 1;
+  emitter.emit('change', change);
+}
+
+/**
+ * Open the listening connection
+ * Changes made while it was down were never delivered, so after a reconnect
+ * subscribers are told to resync (refetch what they show).
+ */
+async function connect() {
+  const listener = createClient();
+
+  listener.on('notification', handleNotification);
+  listener.on('error', (error) => {
+    console.error('Change feed connection error:', error.message);
+    if (client === listener) {
+      client = null;
+    }
+    listener.end().catch(() => {});
+    scheduleReconnect();
+  });
+
+  try {
+    await listener.connect();
+    await listener.query(`LISTEN ${CHANNEL}`);
+  } catch (error) {
+    console.error('Change feed failed to connect:', error.message);
+    listener.end().catch(() => {});
+    scheduleReconnect();
+    return;
+  }
+
+  if (stopped) {
+    await listener.end();
+    return;
+  }
+
+  client = listener;
+  console.log(`📣 Change feed listening on "${CHANNEL}"`);
+  if (connectedOnce) {
+    emitter.emit('resync');
+  }
+  connectedOnce = true;
+}
+
+/**
+ * Start listening for changes
+ * Called once when the server starts
+ */
+async function startChangeFeed() {
+  stopped = false;
+  await connect();
+}
+
+/**
+ * Stop listening and close the connection
+ */
+async function stopChangeFeed() {
+  stopped = true;
+  clearTimeout(reconnectTimer);
+  reconnectTimer = null;
+
+  const listener = client;
+  client = null;
+  if (listener) {
+    await listener.end();
+  }
+}
+
+/**
+ * Subscribe to changes
+ * @param {Function} onChange - Called with each change { table, op, tenant_id, id, ... }
+ * @param {Function} onResync - Called when changes may have been missed
+ * @returns {Function} Unsubscribe function
+ */
+function subscribe(onChange, onResync) {
+  emitter.on('change', onChange);
+  if (onResync) {
+    emitter.on('resync', onResync);
+  }
+
+  return () => {
+    emitter.off('change', onChange);
+    if (onResync) {
+      emitter.off('resync', onResync);
+    }
+  };
+}
+
+/**
+ * Get change feed status (for the health check)
+ * @returns {Object} { listening, subscribers, notifications }
+ */
+function getChangeFeedStats() {
+  return {
+    listening: client !== null,
+    subscribers: emitter.listenerCount('change'),
+    notifications,
+  };
+}
+
+module.exports = {
+  startChangeFeed,
+  stopChangeFeed,
+  subscribe,
+  getChangeFeedStats,
+};
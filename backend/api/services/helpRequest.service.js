@@ -6,11 +6,17 @@ const { query, getClient } = require('../../db/config');
  */
 
 /**
- * Create a new help request
+ * Insert a help request, or return the existing one for the same call and question
+ * Agent workers retry escalations from a local spool, so the same request can
+ * arrive more than once, possibly concurrently. The unique index on
+ * (tenant_id, call_id, question) (migration 012) makes the insert itself
+ * idempotent; on a conflict the row already there is returned.
+ * @param {Object} db - query function's owner (pool helper or transaction client)
+ * @param {string} tenantId - Tenant whose caller escalated
  * @param {Object} requestData - { customer_phone, question, call_id }
- * @returns {Promise<Object>} Created help request
+ * @returns {Promise<Object>} { helpRequest, created }
  */
-async function createHelpRequest({ customer_phone, question, call_id }) {
+async function insertHelpRequest(db, tenantId, { customer_phone, question, call_id }) {
   // Validate input
   if (!customer_phone || !question) {
     throw new Error('customer_phone and question are required');
@@ -19,36 +25,101 @@ async function createHelpRequest({ customer_phone, question, call_id }) {
   // Calculate timeout timestamp (30 minutes from now by default)
   const timeoutMinutes = parseInt(process.env.REQUEST_TIMEOUT_MINUTES) || 30;
 
-  const result = await query(
+  const result = await db.query(
     `INSERT INTO help_requests
-     (customer_phone, question, status, call_id, timeout_at)
-     VALUES ($1, $2, 'pending', $3, NOW() + INTERVAL '${timeoutMinutes} minutes')
+     (tenant_id, customer_phone, question, status, call_id, timeout_at)
+     VALUES ($1, $2, $3, 'pending', $4, NOW() + INTERVAL '${timeoutMinutes} minutes')
+     ON CONFLICT (tenant_id, call_id, question) WHERE call_id IS NOT NULL DO NOTHING
      RETURNING *`,
-    [customer_phone, question, call_id]
+    [tenantId, customer_phone, question, call_id]
+  );
+
+  if (result.rows[0]) {
+    return { helpRequest: result.rows[0], created: true };
+  }
+
+  // Conflict: the request was already delivered (the conflicting insert has committed by now)
+  const existing = await db.query(
+    `SELECT * FROM help_requests
+     WHERE tenant_id = $1 AND call_id = $2 AND question = $3`,
+    [tenantId, call_id, question]
   );
 
-  const helpRequest = result.rows[0];
+  return { helpRequest: existing.rows[0], created: false };
+}
 
-  // Simulate notifying supervisor (in production, this would send SMS/webhook)
+/**
+ * Simulate notifying supervisor (in production, this would send SMS/webhook)
+ * @param {Object} helpRequest - Created help request
+ */
+function notifySupervisor(helpRequest) {
   console.log('\n📱 [SIMULATED] Texting supervisor:');
-  console.log(`   "Hey, I need help answering: ${question}"`);
+  console.log(`   "Hey, I need help answering: ${helpRequest.question}"`);
   console.log(`   Request ID: ${helpRequest.id}`);
-  console.log(`   Customer: ${customer_phone}\n`);
+  console.log(`   Customer: ${helpRequest.customer_phone}\n`);
+}
+
+/**
+ * Create a new help request
+ * @param {string} tenantId - Tenant whose caller escalated
+ * @param {Object} requestData - { customer_phone, question, call_id }
+ * @returns {Promise<Object>} Created (or already existing) help request
+ */
+async function createHelpRequest(tenantId, requestData) {
+  const { helpRequest, created } = await insertHelpRequest({ query }, tenantId, requestData);
+
+  if (created) {
+    notifySupervisor(helpRequest);
+  }
 
   return helpRequest;
 }
 
+/**
+ * Create several help requests of one tenant in one transaction
+ * Used by agent workers to flush their escalation queue in a single round trip
+ * (one batch per tenant).
+ * @param {string} tenantId - Tenant whose callers escalated
+ * @param {Array<Object>} requests - [{ customer_phone, question, call_id }]
+ * @returns {Promise<Array>} Created (or already existing) help requests, in input order
+ */
+async function createHelpRequests(tenantId, requests) {
+  const client = await getClient();
+
+  try {
+    await client.query('BEGIN');
+
+    const results = [];
+    for (const requestData of requests) {
+      results.push(await insertHelpRequest(client, tenantId, requestData));
+    }
+
+    await client.query('COMMIT');
+
+    results.filter((r) => r.created).forEach((r) => notifySupervisor(r.helpRequest));
+
+    return results.map((r) => r.helpRequest);
+
+  } catch (error) {
+    await client.query('ROLLBACK');
+    throw error;
+  } finally {
+    client.release();
+  }
+}
+
 /**
  * Get all help requests with optional filtering
+ * @param {string} tenantId - Owning tenant
  * @param {Object} filters - { status, limit, offset }
  * @returns {Promise<Array>} List of help requests
  */
-async function getHelpRequests({ status = null, limit = 50, offset = 0 } = {}) {
-  let sqlQuery = 'SELECT * FROM help_requests';
-  const params = [];
+async function getHelpRequests(tenantId, { status = null, limit = 50, offset = 0 } = {}) {
+  let sqlQuery = 'SELECT * FROM help_requests WHERE tenant_id = $1';
+  const params = [tenantId];
 
   if (status) {
-    sqlQuery += ' WHERE status = $1';
+    sqlQuery += ' AND status = $2';
     params.push(status);
   }
 
@@ -61,13 +132,14 @@ async function getHelpRequests({ status = null, limit = 50, offset = 0 } = {}) {
 
 /**
  * Get a single help request by ID
+ * @param {string} tenantId - Owning tenant
  * @param {string} id - Help request UUID
  * @returns {Promise<Object>} Help request or null
  */
-async function getHelpRequestById(id) {
+async function getHelpRequestById(tenantId, id) {
   const result = await query(
-    'SELECT * FROM help_requests WHERE id = $1',
-    [id]
+    'SELECT * FROM help_requests WHERE tenant_id = $1 AND id = $2',
+    [tenantId, id]
   );
 
   return result.rows[0] || null;
@@ -75,11 +147,12 @@ async function getHelpRequestById(id) {
 
 /**
  * Respond to a help request (supervisor provides answer)
+ * @param {string} tenantId - Owning tenant
  * @param {string} id - Help request UUID
  * @param {string} answer - Supervisor's answer
  * @returns {Promise<Object>} Updated help request
  */
-async function respondToHelpRequest(id, answer) {
+async function respondToHelpRequest(tenantId, id, answer) {
   if (!answer || answer.trim().length === 0) {
     throw new Error('Answer cannot be empty');
   }
@@ -91,8 +164,8 @@ async function respondToHelpRequest(id, answer) {
 
     // Get the help request
     const requestResult = await client.query(
-      'SELECT * FROM help_requests WHERE id = $1',
-      [id]
+      'SELECT * FROM help_requests WHERE tenant_id = $1 AND id = $2',
+      [tenantId, id]
     );
 
     const helpRequest = requestResult.rows[0];
@@ -139,17 +212,17 @@ async function respondToHelpRequest(id, answer) {
 
     const updatedRequest = updateResult.rows[0];
 
-    // Add to knowledge base
+    // Add to the tenant's knowledge base
     await client.query(
-      `INSERT INTO knowledge_base (question_pattern, answer, learned_from_request_id)
-       VALUES ($1, $2, $3)
-       ON CONFLICT (question_pattern)
+      `INSERT INTO knowledge_base (tenant_id, question_pattern, answer, learned_from_request_id)
+       VALUES ($1, $2, $3, $4)
+       ON CONFLICT (tenant_id, question_pattern)
        DO UPDATE SET
          answer = EXCLUDED.answer,
          updated_at = NOW(),
          learned_from_request_id = EXCLUDED.learned_from_request_id,
          is_active = true`,
-      [helpRequest.question, answer, id]
+      [helpRequest.tenant_id, helpRequest.question, answer, id]
     );
 
     await client.query('COMMIT');
@@ -199,9 +272,10 @@ async function processTimeouts() {
 
 /**
  * Get request statistics
+ * @param {string} tenantId - Owning tenant
  * @returns {Promise<Object>} Statistics object
  */
-async function getStatistics() {
+async function getStatistics(tenantId) {
   const result = await query(`
     SELECT
       COUNT(*) FILTER (WHERE status = 'pending') as pending_count,
@@ -210,13 +284,15 @@ async function getStatistics() {
       COUNT(*) as total_count,
       AVG(EXTRACT(EPOCH FROM (resolved_at - created_at))/60) FILTER (WHERE status = 'resolved') as avg_resolution_time_minutes
     FROM help_requests
-  `);
+    WHERE tenant_id = $1
+  `, [tenantId]);
 
   return result.rows[0];
 }
 
 module.exports = {
   createHelpRequest,
+  createHelpRequests,
   getHelpRequests,
   getHelpRequestById,
   respondToHelpRequest,
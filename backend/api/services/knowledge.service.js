@@ -14,6 +14,7 @@ const { query } = require("../../db/config");
  * 4. Normalized question matching
  * 5. Semantic tag matching (if extracted_tags provided)
  *
+ * @param {string} tenantId - Tenant whose knowledge base is searched
  * @param {string} question - The question to search for
  * @param {number} threshold - Minimum similarity threshold (0-1), default 0.3
  * @param {Array<string>|null} extractedTags - Optional semantic tags extracted from question
@@ -21,6 +22,7 @@ const { query } = require("../../db/config");
  * @returns {Promise<Array>} Array of matching knowledge base entries with similarity_score (empty array if no match)
  */
 async function searchKnowledgeBase(
+  tenantId,
   question,
   threshold = 0.3,
   extractedTags = null,
@@ -39,15 +41,16 @@ async function searchKnowledgeBase(
   let result = await query(
     `SELECT *, 1.0::numeric as similarity_score
      FROM knowledge_base
-     WHERE is_active = true
+     WHERE tenant_id = $3
+     AND is_active = true
      AND LOWER(question_pattern) = LOWER($1)
      LIMIT $2`,
-    [trimmedQuestion, cappedLimit]
+    [trimmedQuestion, cappedLimit, tenantId]
   );
 
   if (result.rows.length > 0) {
     // Only increment usage count for the first/best match to avoid skewing statistics
-    await incrementUsageCount(result.rows[0].id);
+    await incrementUsageCount(tenantId, result.rows[0].id);
     return result.rows;
   }
 
@@ -149,7 +152,8 @@ async function searchKnowledgeBase(
        END as similarity_score
 
      FROM knowledge_base
-     WHERE is_active = true
+     WHERE tenant_id = $${hasExtractedTags ? 5 : 4}
+     AND is_active = true
      AND (`;
 
   // Add extracted tag matching condition if tags provided
@@ -191,8 +195,8 @@ async function searchKnowledgeBase(
      LIMIT $${hasExtractedTags ? 4 : 3}`;
 
   const params = hasExtractedTags
-    ? [trimmedQuestion, threshold, extractedTags, cappedLimit]
-    : [trimmedQuestion, threshold, cappedLimit];
+    ? [trimmedQuestion, threshold, extractedTags, cappedLimit, tenantId]
+    : [trimmedQuestion, threshold, cappedLimit, tenantId];
 
   result = await query(queryText, params);
 
@@ -240,7 +244,7 @@ async function searchKnowledgeBase(
     // console.log(logMessage);
 
     // Only increment usage count for the first/best match to avoid skewing statistics
-    await incrementUsageCount(topMatch.id);
+    await incrementUsageCount(tenantId, topMatch.id);
     return matches;
   }
 
@@ -250,12 +254,130 @@ async function searchKnowledgeBase(
   return [];
 }
 
+/**
+ * Search knowledge base for several questions in one database round trip
+ * Scores every question with the same signals and weights as searchKnowledgeBase.
+ * The questions are unnested into rows and matched with a LATERAL subquery.
+ * The top match of each question has its usage count incremented in the same
+ * statement.
+ * @param {string} tenantId - Tenant whose knowledge base is searched
+ * @param {Array<{question: string, extractedTags?: Array<string>|null}>} queries - Questions to search for
+ * @param {number} threshold - Minimum similarity threshold (0-1), default 0.3
+ * @param {number} limit - Maximum number of results per question, default 5
+ * @returns {Promise<Array<Array>>} One array of matching entries per query, in input order
+ */
+async function searchKnowledgeBaseBatch(tenantId, queries, threshold = 0.3, limit = 5) {
+  const cappedLimit = Math.min(Math.max(1, limit), 20);
+  const questions = queries.map((q) => (q.question || "").trim());
+  // Tags travel as comma-separated text: Postgres arrays cannot be ragged
+  const tagLists = queries.map((q) =>
+    q.extractedTags && q.extractedTags.length > 0 ? q.extractedTags.join(",") : null
+  );
+
+  const result = await query(
+    `WITH queries AS (
+       SELECT ord, question, string_to_array(tag_list, ',') AS extracted_tags
+       FROM unnest($1::text[], $2::text[]) WITH ORDINALITY AS q(question, tag_list, ord)
+       WHERE question <> ''
+     ),
+     matches AS (
+       SELECT q.ord, m.*,
+              ROW_NUMBER() OVER (PARTITION BY q.ord ORDER BY m.similarity_score DESC, m.times_used DESC) AS match_rank,
+              bool_or(m.exact_match) OVER (PARTITION BY q.ord) AS has_exact_match
+       FROM queries q
+       CROSS JOIN LATERAL (
+         SELECT s.*,
+                -- Same tiers as searchKnowledgeBase: exact, semantic tags, word tags, weighted fuzzy
+                (CASE
+                   WHEN s.exact_match THEN 1.0
+                   WHEN s.extracted_tag_overlap_count > 0 THEN LEAST(0.90, 0.70 + s.extracted_tag_overlap_count * 0.05)
+                   WHEN s.exact_tag_match THEN 0.85
+                   WHEN s.tag_similarity > 0.7 THEN 0.75
+                   ELSE s.sim_original * 0.5 + s.sim_normalized * 0.3 + s.fts_rank * 0.2
+                 END)::float8 AS similarity_score
+         FROM (
+           SELECT kb.*,
+                  LOWER(kb.question_pattern) = LOWER(q.question) AS exact_match,
+                  similarity(kb.question_pattern, q.question) AS sim_original,
+                  COALESCE(similarity(kb.normalized_question, normalize_question(q.question)), 0) AS sim_normalized,
+                  ts_rank(to_tsvector('english', kb.question_pattern), plainto_tsquery('english', q.question)) AS fts_rank,
+                  to_tsvector('english', kb.question_pattern) @@ plainto_tsquery('english', q.question) AS fts_match,
+                  EXISTS (
+                    SELECT 1
+                    FROM unnest(kb.tags) AS tag,
+                         unnest(string_to_array(LOWER(q.question), ' ')) AS word
+                    WHERE LOWER(tag) = word
+                  ) AS exact_tag_match,
+                  (
+                    SELECT MAX(similarity(tag, word))
+                    FROM unnest(kb.tags) AS tag,
+                         unnest(string_to_array(q.question, ' ')) AS word
+                  ) AS tag_similarity,
+                  (
+                    SELECT COUNT(*)
+                    FROM unnest(kb.tags) AS kb_tag,
+                         unnest(q.extracted_tags) AS extracted_tag
+                    WHERE LOWER(kb_tag) = LOWER(extracted_tag)
+                  ) AS extracted_tag_overlap_count
+           FROM knowledge_base kb
+           WHERE kb.tenant_id = $5
+           AND kb.is_active = true
+         ) s
+         WHERE s.exact_match
+            OR s.extracted_tag_overlap_count > 0
+            OR s.sim_original > $3
+            OR s.sim_normalized > $3
+            OR s.fts_match
+            OR s.exact_tag_match
+            OR s.tag_similarity > 0.7
+       ) m
+     ),
+     -- An exact match hides fuzzy matches, as in searchKnowledgeBase
+     filtered AS (
+       SELECT *
+       FROM matches
+       WHERE exact_match OR NOT has_exact_match
+     ),
+     ranked AS (
+       SELECT *, ROW_NUMBER() OVER (PARTITION BY ord ORDER BY match_rank) AS result_rank
+       FROM filtered
+     ),
+     usage AS (
+       UPDATE knowledge_base kb
+       SET times_used = kb.times_used + top.hits
+       FROM (
+         SELECT id, COUNT(*) AS hits FROM ranked WHERE result_rank = 1 GROUP BY id
+       ) top
+       WHERE kb.tenant_id = $5 AND kb.id = top.id
+     )
+     SELECT *,
+            extracted_tag_overlap_count > 0 AS has_extracted_tag_match
+     FROM ranked
+     WHERE result_rank <= $4
+     ORDER BY ord, result_rank`,
+    [questions, tagLists, threshold, cappedLimit, tenantId]
+  );
+
+  const results = queries.map(() => []);
+  for (const row of result.rows) {
+    const { ord, match_rank, result_rank, exact_match, has_exact_match, fts_match, ...entry } = row;
+    results[Number(ord) - 1].push(entry);
+  }
+
+  const found = results.filter((matches) => matches.length > 0).length;
+  console.log(
+    `[Knowledge Base] Batch search: ${found}/${queries.length} question(s) matched (threshold: ${threshold})`
+  );
+  return results;
+}
+
 /**
  * Get all knowledge base entries
+ * @param {string} tenantId - Owning tenant
  * @param {Object} options - { limit, offset, active_only }
  * @returns {Promise<Array>} List of knowledge base entries with populated help_request data
  */
-async function getAllKnowledge({
+async function getAllKnowledge(tenantId, {
   limit = 100,
   offset = 0,
   active_only = true,
@@ -280,15 +402,16 @@ async function getAllKnowledge({
       END as learned_from_request
     FROM knowledge_base kb
     LEFT JOIN help_requests hr ON kb.learned_from_request_id = hr.id
+    WHERE kb.tenant_id = $1
   `;
-  const params = [];
+  const params = [tenantId];
 
   if (active_only) {
-    sqlQuery += " WHERE kb.is_active = true";
+    sqlQuery += " AND kb.is_active = true";
   }
 
   sqlQuery +=
-    " ORDER BY kb.times_used DESC, kb.created_at DESC LIMIT $1 OFFSET $2";
+    " ORDER BY kb.times_used DESC, kb.created_at DESC LIMIT $2 OFFSET $3";
   params.push(limit, offset);
 
   const result = await query(sqlQuery, params);
@@ -297,32 +420,35 @@ async function getAllKnowledge({
 
 /**
  * Get a single knowledge base entry by ID
+ * @param {string} tenantId - Owning tenant
  * @param {string} id - Knowledge base entry UUID
  * @returns {Promise<Object|null>} Knowledge base entry or null
  */
-async function getKnowledgeById(id) {
-  const result = await query("SELECT * FROM knowledge_base WHERE id = $1", [
-    id,
-  ]);
+async function getKnowledgeById(tenantId, id) {
+  const result = await query(
+    "SELECT * FROM knowledge_base WHERE tenant_id = $1 AND id = $2",
+    [tenantId, id]
+  );
 
   return result.rows[0] || null;
 }
 
 /**
  * Create a new knowledge base entry
+ * @param {string} tenantId - Owning tenant
  * @param {Object} data - { question_pattern, answer, tags }
  * @returns {Promise<Object>} Created knowledge base entry
  */
-async function createKnowledgeEntry({ question_pattern, answer, tags = [] }) {
+async function createKnowledgeEntry(tenantId, { question_pattern, answer, tags = [] }) {
   if (!question_pattern || !answer) {
     throw new Error("question_pattern and answer are required");
   }
 
   const result = await query(
-    `INSERT INTO knowledge_base (question_pattern, answer, tags)
-     VALUES ($1, $2, $3)
+    `INSERT INTO knowledge_base (tenant_id, question_pattern, answer, tags)
+     VALUES ($1, $2, $3, $4)
      RETURNING *`,
-    [question_pattern.trim(), answer.trim(), tags]
+    [tenantId, question_pattern.trim(), answer.trim(), tags]
   );
 
   return result.rows[0];
@@ -330,11 +456,12 @@ async function createKnowledgeEntry({ question_pattern, answer, tags = [] }) {
 
 /**
  * Update a knowledge base entry
+ * @param {string} tenantId - Owning tenant
  * @param {string} id - Knowledge base entry UUID
  * @param {Object} updates - Fields to update
  * @returns {Promise<Object>} Updated knowledge base entry
  */
-async function updateKnowledgeEntry(id, updates) {
+async function updateKnowledgeEntry(tenantId, id, updates) {
   const allowedFields = ["question_pattern", "answer", "tags", "is_active"];
   const setClauses = [];
   const params = [];
@@ -352,12 +479,12 @@ async function updateKnowledgeEntry(id, updates) {
     throw new Error("No valid fields to update");
   }
 
-  params.push(id);
+  params.push(tenantId, id);
 
   const result = await query(
     `UPDATE knowledge_base
      SET ${setClauses.join(", ")}, updated_at = NOW()
-     WHERE id = $${paramCount}
+     WHERE tenant_id = $${paramCount} AND id = $${paramCount + 1}
      RETURNING *`,
     params
   );
@@ -371,16 +498,17 @@ async function updateKnowledgeEntry(id, updates) {
 
 /**
  * Delete a knowledge base entry (soft delete by setting is_active = false)
+ * @param {string} tenantId - Owning tenant
  * @param {string} id - Knowledge base entry UUID
  * @returns {Promise<Object>} Updated knowledge base entry
  */
-async function deleteKnowledgeEntry(id) {
+async function deleteKnowledgeEntry(tenantId, id) {
   const result = await query(
     `UPDATE knowledge_base
      SET is_active = false, updated_at = NOW()
-     WHERE id = $1
+     WHERE tenant_id = $1 AND id = $2
      RETURNING *`,
-    [id]
+    [tenantId, id]
   );
 
   if (result.rows.length === 0) {
@@ -392,21 +520,85 @@ async function deleteKnowledgeEntry(id) {
 
 /**
  * Increment the usage counter for a knowledge base entry
+ * @param {string} tenantId - Owning tenant
  * @param {string} id - Knowledge base entry UUID
  * @returns {Promise<void>}
  */
-async function incrementUsageCount(id) {
+async function incrementUsageCount(tenantId, id) {
   await query(
-    "UPDATE knowledge_base SET times_used = times_used + 1 WHERE id = $1",
-    [id]
+    "UPDATE knowledge_base SET times_used = times_used + 1 WHERE tenant_id = $1 AND id = $2",
+    [tenantId, id]
   );
 }
 
+/**
+ * Get knowledge base entries changed since a point in time (delta sync)
+ * Includes inactive entries so that soft deletes propagate to agent workers.
+ * @param {string} tenantId - Owning tenant
+ * @param {string|null} since - ISO timestamp; null returns every entry
+ * @returns {Promise<Object>} { entries, server_time }
+ */
+async function getKnowledgeChanges(tenantId, since = null) {
+  const params = [tenantId];
+  let sqlQuery = `
+    SELECT id, question_pattern, normalized_question, answer, tags,
+           is_active, times_used, updated_at, NOW() as server_time
+    FROM knowledge_base
+    WHERE tenant_id = $1`;
+
+  if (since) {
+    sqlQuery += " AND updated_at > $2";
+    params.push(since);
+  } else {
+    sqlQuery += " AND is_active = true";
+  }
+
+  sqlQuery += " ORDER BY updated_at ASC";
+
+  const result = await query(sqlQuery, params);
+
+  // Take the server clock from the query so the agent's next cursor is not
+  // affected by clock skew between the API host and the database
+  const serverTime = result.rows.length > 0
+    ? result.rows[0].server_time
+    : (await query("SELECT NOW() as server_time")).rows[0].server_time;
+
+  return {
+    entries: result.rows.map(({ server_time, ...entry }) => entry),
+    server_time: serverTime,
+  };
+}
+
+/**
+ * Get the current knowledge base version
+ * Changes whenever an entry is created, updated or soft-deleted, so agent
+ * workers can cheaply detect when their cached search results are stale.
+ * @param {string} tenantId - Owning tenant
+ * @returns {Promise<Object>} { version, count, last_updated }
+ */
+async function getKnowledgeVersion(tenantId) {
+  const result = await query(`
+    SELECT COUNT(*) as count, MAX(updated_at) as last_updated
+    FROM knowledge_base
+    WHERE tenant_id = $1
+  `, [tenantId]);
+
+  const { count, last_updated } = result.rows[0];
+  const lastUpdatedMs = last_updated ? new Date(last_updated).getTime() : 0;
+
+  return {
+    version: `${count}-${lastUpdatedMs}`,
+    count: parseInt(count),
+    last_updated,
+  };
+}
+
 /**
  * Get knowledge base statistics
+ * @param {string} tenantId - Owning tenant
  * @returns {Promise<Object>} Statistics object
  */
-async function getKnowledgeStatistics() {
+async function getKnowledgeStatistics(tenantId) {
   const result = await query(`
     SELECT
       COUNT(*) FILTER (WHERE is_active = true) as active_count,
@@ -423,18 +615,20 @@ async function getKnowledgeStatistics() {
           'times_used', times_used
         )
         FROM knowledge_base
-        WHERE is_active = true
+        WHERE tenant_id = $1 AND is_active = true
         ORDER BY times_used DESC
         LIMIT 1
       ) as most_used
     FROM knowledge_base
-  `);
+    WHERE tenant_id = $1
+  `, [tenantId]);
 
   return result.rows[0];
 }
 
 module.exports = {
   searchKnowledgeBase,
+  searchKnowledgeBaseBatch,
   getAllKnowledge,
   getKnowledgeById,
   createKnowledgeEntry,
@@ -442,4 +636,6 @@ module.exports = {
   deleteKnowledgeEntry,
   incrementUsageCount,
   getKnowledgeStatistics,
+  getKnowledgeVersion,
+  getKnowledgeChanges,
 };
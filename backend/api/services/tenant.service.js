@@ -0,0 +1,60 @@
+const { query } = require("../../db/config");
+
+/**
+ * Tenant Service
+ * Businesses hosted on the platform and how calls are routed to them
+ */
+
+// Seeded by migration 010; owns every row created before multi-tenancy
+const DEFAULT_TENANT_ID =
+  process.env.DEFAULT_TENANT_ID || "00000000-0000-0000-0000-000000000001";
+
+const TENANT_COLUMNS = `id, slug, business_name, assistant_name, services,
+  timezone, business_hours, phone_numbers, updated_at`;
+
+/**
+ * Get all active tenants
+ * @returns {Promise<Array>} List of tenants
+ */
+async function getTenants() {
+  const result = await query(
+    `SELECT ${TENANT_COLUMNS} FROM tenants WHERE is_active = true ORDER BY business_name`
+  );
+  return result.rows;
+}
+
+/**
+ * Get an active tenant by ID or slug
+ * @param {string} idOrSlug - Tenant UUID or slug
+ * @returns {Promise<Object|null>} Tenant or null
+ */
+async function getTenant(idOrSlug) {
+  const result = await query(
+    `SELECT ${TENANT_COLUMNS} FROM tenants
+     WHERE (id::text = $1 OR slug = $1) AND is_active = true`,
+    [idOrSlug]
+  );
+  return result.rows[0] || null;
+}
+
+/**
+ * Get the active tenant a dialed phone number is routed to
+ * @param {string} phoneNumber - Dialed number (E.164, e.g. +14155550100)
+ * @returns {Promise<Object|null>} Tenant or null
+ */
+async function getTenantByPhoneNumber(phoneNumber) {
+  const result = await query(
+    `SELECT ${TENANT_COLUMNS} FROM tenants
+     WHERE phone_numbers @> ARRAY[$1::text] AND is_active = true
+     LIMIT 1`,
+    [phoneNumber]
+  );
+  return result.rows[0] || null;
+}
+
+module.exports = {
+  DEFAULT_TENANT_ID,
+  getTenants,
+  getTenant,
+  getTenantByPhoneNumber,
+};
@@ -1,17 +1,24 @@
-const { Pool } = require('pg');
+const { Pool, Client } = require('pg');
 require('dotenv').config();
 
 /**
- * PostgreSQL connection pool configuration
+ * PostgreSQL connection settings
  * Uses environment variables for configuration
- * Implements connection pooling for better performance
  */
-const pool = new Pool({
+const connectionConfig = {
   host: process.env.DB_HOST || 'localhost',
   port: process.env.DB_PORT || 5432,
   database: process.env.DB_NAME || 'frontdesk_ai',
   user: process.env.DB_USER || 'postgres',
   password: process.env.DB_PASSWORD || 'postgres',
+};
+
+/**
+ * PostgreSQL connection pool configuration
+ * Implements connection pooling for better performance
+ */
+const pool = new Pool({
+  ...connectionConfig,
   max: 20, // Maximum number of clients in the pool
   idleTimeoutMillis: 30000, // Close idle clients after 30 seconds
   connectionTimeoutMillis: 2000, // Return error after 2 seconds if connection not available
@@ -56,8 +63,18 @@ const getClient = () => {
   return pool.connect();
 };
 
+/**
+ * Create a dedicated client outside the pool
+ * For sessions that must stay on one connection, such as LISTEN
+ * @returns {Client} Unconnected database client
+ */
+const createClient = () => {
+  return new Client(connectionConfig);
+};
+
 module.exports = {
   query,
   getClient,
+  createClient,
   pool,
 };
@@ -0,0 +1,33 @@
+-- Migration 008: Only bump knowledge_base.updated_at when content changes
+-- incrementUsageCount() updates times_used on every search hit, and the
+-- generic update_updated_at_column() trigger was bumping updated_at on each
+-- of those writes. Agent workers use updated_at to detect knowledge base
+-- changes (GET /api/knowledge-base/version) and for delta sync
+-- (GET /api/knowledge-base/sync), so usage counting must not touch it.
+
+CREATE OR REPLACE FUNCTION update_knowledge_base_content_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (NEW.question_pattern, NEW.answer, NEW.tags, NEW.is_active, NEW.learned_from_request_id)
+       IS DISTINCT FROM
+       (OLD.question_pattern, OLD.answer, OLD.tags, OLD.is_active, OLD.learned_from_request_id)
+    THEN
+        NEW.updated_at = NOW();
+    ELSE
+        NEW.updated_at = OLD.updated_at;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS update_knowledge_base_updated_at ON knowledge_base;
+
+CREATE TRIGGER update_knowledge_base_updated_at
+    BEFORE UPDATE ON knowledge_base
+    FOR EACH ROW
+    EXECUTE FUNCTION update_knowledge_base_content_updated_at();
+
+-- Delta sync reads rows by updated_at
+CREATE INDEX IF NOT EXISTS idx_knowledge_base_updated_at ON knowledge_base(updated_at);
+
+COMMENT ON FUNCTION update_knowledge_base_content_updated_at() IS 'Sets updated_at only when knowledge base content changes (not on times_used increments)';
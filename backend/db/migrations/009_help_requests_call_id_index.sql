@@ -0,0 +1,9 @@
+-- Migration 009: Index help_requests by call_id
+-- Agent workers deliver escalations from a retrying queue, and
+-- createHelpRequest() looks up (call_id, question) to make redelivery
+-- idempotent. A call produces at most a handful of requests, so call_id
+-- alone is selective enough.
+
+CREATE INDEX IF NOT EXISTS idx_help_requests_call_id
+    ON help_requests(call_id)
+    WHERE call_id IS NOT NULL;
@@ -0,0 +1,132 @@
+-- Migration 010: Multi-tenant knowledge base and help requests
+-- One backend and agent fleet serves many salons ("tenants"). Each tenant has
+-- its own knowledge base, help requests, assistant persona and business hours.
+-- Agent workers resolve the tenant of a call from the room metadata or the
+-- dialed SIP number (GET /api/tenants/resolve).
+--
+-- knowledge_base is rebuilt as a table hash-partitioned on tenant_id, with
+-- tenant-leading indexes. Every search filters on a single tenant, so Postgres
+-- prunes to one partition and a large tenant's rows never sit in the scan of
+-- another's. BEFORE ROW triggers on partitioned tables need PostgreSQL 13+.
+--
+-- Existing rows belong to the default tenant (Priya's Beauty Lounge), which is
+-- also the column default, so single-tenant clients keep working unchanged.
+
+-- btree_gin lets GIN indexes lead with the tenant_id equality column
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+
+-- Step 1: Tenants
+CREATE TABLE IF NOT EXISTS tenants (
+  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  slug VARCHAR(100) NOT NULL UNIQUE,
+  business_name TEXT NOT NULL,
+  assistant_name VARCHAR(100) NOT NULL DEFAULT 'Priya',
+  services TEXT[] NOT NULL DEFAULT '{}',
+  timezone VARCHAR(64) NOT NULL DEFAULT 'Asia/Kolkata',
+  -- Opening hours by weekday: {"mon": null, "tue": [10, 19], ...}; null = closed
+  business_hours JSONB NOT NULL DEFAULT '{}',
+  -- Dialed numbers (E.164) routed to this tenant's agent
+  phone_numbers TEXT[] NOT NULL DEFAULT '{}',
+  is_active BOOLEAN DEFAULT true,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_tenants_phone_numbers ON tenants USING gin(phone_numbers);
+
+CREATE TRIGGER update_tenants_updated_at
+    BEFORE UPDATE ON tenants
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+INSERT INTO tenants (id, slug, business_name, assistant_name, services, timezone, business_hours)
+VALUES (
+  '00000000-0000-0000-0000-000000000001',
+  'priya-beauty-lounge',
+  'PRIYA''S BEAUTY LOUNGE',
+  'Priya',
+  ARRAY['Hair Services', 'Makeup Services', 'Skin Care', 'Nail Services', 'Bridal packages and Henna/Mehndi'],
+  'Asia/Kolkata',
+  '{"mon": null, "tue": [10, 19], "wed": [10, 19], "thu": [10, 19], "fri": [10, 19], "sat": [9, 20], "sun": [10, 18]}'
+)
+ON CONFLICT (id) DO NOTHING;
+
+-- Step 2: Help requests belong to a tenant
+ALTER TABLE help_requests
+  ADD COLUMN IF NOT EXISTS tenant_id UUID NOT NULL
+  DEFAULT '00000000-0000-0000-0000-000000000001'
+  REFERENCES tenants(id);
+
+-- Dashboard listings and the timeout monitor, per tenant
+CREATE INDEX IF NOT EXISTS idx_help_requests_tenant_status
+    ON help_requests(tenant_id, status, created_at DESC);
+
+-- Step 3: Rebuild knowledge_base partitioned by tenant
+ALTER TABLE knowledge_base RENAME TO knowledge_base_unpartitioned;
+
+CREATE TABLE knowledge_base (
+  id UUID NOT NULL DEFAULT uuid_generate_v4(),
+  tenant_id UUID NOT NULL DEFAULT '00000000-0000-0000-0000-000000000001' REFERENCES tenants(id),
+  question_pattern TEXT NOT NULL,
+  normalized_question TEXT,
+  answer TEXT NOT NULL,
+  learned_from_request_id UUID REFERENCES help_requests(id) ON DELETE SET NULL,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  times_used INTEGER DEFAULT 0,
+  is_active BOOLEAN DEFAULT true,
+  tags TEXT[],
+
+  PRIMARY KEY (tenant_id, id),
+  -- Question patterns are unique within a tenant, not across tenants
+  CONSTRAINT unique_tenant_question_pattern UNIQUE (tenant_id, question_pattern)
+) PARTITION BY HASH (tenant_id);
+
+DO $$
+BEGIN
+  FOR i IN 0..15 LOOP
+    EXECUTE format(
+      'CREATE TABLE knowledge_base_p%s PARTITION OF knowledge_base FOR VALUES WITH (MODULUS 16, REMAINDER %s)',
+      i, i
+    );
+  END LOOP;
+END $$;
+
+INSERT INTO knowledge_base
+  (id, question_pattern, normalized_question, answer, learned_from_request_id,
+   created_at, updated_at, times_used, is_active, tags)
+SELECT id, question_pattern, normalized_question, answer, learned_from_request_id,
+       created_at, updated_at, times_used, is_active, tags
+FROM knowledge_base_unpartitioned;
+
+DROP TABLE knowledge_base_unpartitioned;
+
+-- Step 4: Triggers (same functions as before, see migrations 002 and 008)
+CREATE TRIGGER trigger_normalize_question
+    BEFORE INSERT OR UPDATE OF question_pattern ON knowledge_base
+    FOR EACH ROW
+    EXECUTE FUNCTION update_normalized_question();
+
+CREATE TRIGGER update_knowledge_base_updated_at
+    BEFORE UPDATE ON knowledge_base
+    FOR EACH ROW
+    EXECUTE FUNCTION update_knowledge_base_content_updated_at();
+
+-- Step 5: Tenant-scoped indexes (created on every partition)
+CREATE INDEX idx_knowledge_base_tenant_active
+    ON knowledge_base(tenant_id) WHERE is_active = true;
+CREATE INDEX idx_knowledge_base_tenant_times_used
+    ON knowledge_base(tenant_id, times_used DESC);
+CREATE INDEX idx_knowledge_base_tenant_updated_at
+    ON knowledge_base(tenant_id, updated_at);
+CREATE INDEX idx_knowledge_base_tenant_question_trgm
+    ON knowledge_base USING gin (tenant_id, question_pattern gin_trgm_ops);
+CREATE INDEX idx_knowledge_base_tenant_normalized_trgm
+    ON knowledge_base USING gin (tenant_id, normalized_question gin_trgm_ops);
+CREATE INDEX idx_knowledge_base_tenant_question_fts
+    ON knowledge_base USING gin (tenant_id, to_tsvector('english', question_pattern));
+
+COMMENT ON TABLE tenants IS 'Businesses hosted on the platform; each has its own knowledge base, help requests and agent persona';
+COMMENT ON TABLE knowledge_base IS 'Learned Q&A pairs that the AI agent can use to answer future questions, hash-partitioned by tenant';
+COMMENT ON COLUMN knowledge_base.tenant_id IS 'Owning tenant; every search is scoped to one tenant';
+COMMENT ON COLUMN help_requests.tenant_id IS 'Tenant whose caller escalated the question';
@@ -0,0 +1,61 @@
+-- Migration 011: Notify listeners of help request and knowledge base changes
+-- The backend LISTENs on the "frontdesk_changes" channel and pushes each
+-- notification to dashboards and agent workers over GET /api/events, so they
+-- no longer poll for new requests, supervisor answers and learned entries.
+--
+-- NOTIFY is transactional: listeners only hear about committed rows, once
+-- per transaction and payload. Payloads carry ids only (the 8000 byte limit
+-- rules out answers); subscribers fetch the rows they care about.
+
+CREATE OR REPLACE FUNCTION notify_help_request_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('frontdesk_changes', json_build_object(
+        'table', TG_TABLE_NAME,
+        'op', TG_OP,
+        'tenant_id', NEW.tenant_id,
+        'id', NEW.id,
+        'status', NEW.status,
+        'call_id', NEW.call_id
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notify_knowledge_base_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- times_used increments leave updated_at alone (migration 008) and are not changes
+    IF TG_OP = 'UPDATE' AND NEW.updated_at IS NOT DISTINCT FROM OLD.updated_at THEN
+        RETURN NULL;
+    END IF;
+
+    PERFORM pg_notify('frontdesk_changes', json_build_object(
+        'table', 'knowledge_base',
+        'op', TG_OP,
+        'tenant_id', NEW.tenant_id,
+        'id', NEW.id,
+        'is_active', NEW.is_active,
+        'learned_from_request_id', NEW.learned_from_request_id
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notify_help_requests_change ON help_requests;
+
+CREATE TRIGGER notify_help_requests_change
+    AFTER INSERT OR UPDATE OF status ON help_requests
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_help_request_change();
+
+-- On the partitioned table, so every partition fires it (PostgreSQL 13+)
+DROP TRIGGER IF EXISTS notify_knowledge_base_change ON knowledge_base;
+
+CREATE TRIGGER notify_knowledge_base_change
+    AFTER INSERT OR UPDATE ON knowledge_base
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_knowledge_base_change();
+
+COMMENT ON FUNCTION notify_help_request_change() IS 'Publishes help request inserts and status changes on the frontdesk_changes channel';
+COMMENT ON FUNCTION notify_knowledge_base_change() IS 'Publishes knowledge base content changes (not usage counting) on the frontdesk_changes channel';
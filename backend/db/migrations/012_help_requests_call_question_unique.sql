@@ -0,0 +1,31 @@
+-- Migration 012: One help request per (tenant, call, question)
+-- createHelpRequest() made redelivery idempotent by looking up (call_id,
+-- question) before inserting, which two concurrent deliveries of the same
+-- escalation (two workers replaying a spool, a retry racing a slow response)
+-- can both pass. A unique index lets the insert itself decide, with
+-- INSERT ... ON CONFLICT DO NOTHING. It replaces the call_id index from
+-- migration 009, which only served that lookup.
+--
+-- Duplicates already in the table keep their rows: all but the oldest of
+-- each (tenant, call, question) lose their call_id, which leaves them out of
+-- the index.
+
+UPDATE help_requests
+SET call_id = NULL
+WHERE id IN (
+  SELECT id FROM (
+    SELECT id, ROW_NUMBER() OVER (
+      PARTITION BY tenant_id, call_id, question
+      ORDER BY created_at, id
+    ) AS position
+    FROM help_requests
+    WHERE call_id IS NOT NULL
+  ) ranked
+  WHERE position > 1
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_help_requests_call_question
+    ON help_requests(tenant_id, call_id, question)
+    WHERE call_id IS NOT NULL;
+
+DROP INDEX IF EXISTS idx_help_requests_call_id;
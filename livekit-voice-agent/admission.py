@@ -0,0 +1,294 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable
+
+import psutil
+
+logger = logging.getLogger("priya-salon-assistant")
+
+# Directory job processes publish their load samples to; set by the main process so they inherit it
+LOAD_REPORT_DIR = "LOAD_REPORT_DIR"
+
+# A job accepted by `request` counts as a session until it shows up in the worker's active jobs
+RESERVATION_TTL = 10.0
+
+
+@dataclass(frozen=True)
+class AdmissionLimits:
+    """
+    What one worker (node) can serve. Each load component is a fraction of
+    its limit and the worker's load is the largest of them, so whichever
+    resource runs out first makes the worker full. Overridable with
+    ADMISSION_* environment variables.
+    """
+    max_sessions: int = 12
+    max_loop_lag_ms: float = 100.0
+    max_in_flight: int = 64
+    max_rss_mb: float = 4096.0
+    max_cpu: float = 0.9
+    load_threshold: float = 0.8
+
+    @classmethod
+    def from_env(cls) -> "AdmissionLimits":
+        cpus = psutil.cpu_count() or 1
+        ram_mb = psutil.virtual_memory().total / (1024 * 1024)
+        return cls(
+            max_sessions=int(os.getenv("ADMISSION_MAX_SESSIONS", 3 * cpus)),
+            max_loop_lag_ms=float(os.getenv("ADMISSION_MAX_LOOP_LAG_MS", cls.max_loop_lag_ms)),
+            max_in_flight=int(os.getenv("ADMISSION_MAX_IN_FLIGHT", cls.max_in_flight)),
+            max_rss_mb=float(os.getenv("ADMISSION_MAX_RSS_MB", round(0.8 * ram_mb))),
+            max_cpu=float(os.getenv("ADMISSION_MAX_CPU", cls.max_cpu)),
+            load_threshold=float(os.getenv("ADMISSION_LOAD_THRESHOLD", cls.load_threshold)),
+        )
+
+
+def load_components(
+    limits: AdmissionLimits,
+    sessions: int,
+    loop_lag_ms: float,
+    in_flight: int,
+    rss_mb: float,
+    cpu: float,
+) -> dict[str, float]:
+    """Each resource's use as a fraction of its limit."""
+    return {
+        "sessions": sessions / limits.max_sessions,
+        "loop_lag": loop_lag_ms / limits.max_loop_lag_ms,
+        "in_flight": in_flight / limits.max_in_flight,
+        "rss": rss_mb / limits.max_rss_mb,
+        "cpu": cpu / limits.max_cpu,
+    }
+
+
+class LoadReporter:
+    """
+    Runs in each job process. Samples event loop lag (how late a short sleep
+    wakes up, the delay every audio frame and tool call is also seeing) and
+    the number of in-flight backend/OpenAI requests, and writes them to
+    `<directory>/<pid>.json` for the main process's load_fnc.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        in_flight: Callable[[], int],
+        interval: float = 1.0,
+        probe: float = 0.05,
+    ) -> None:
+        self.directory = directory
+        self.in_flight = in_flight
+        self.interval = interval
+        self.probe = probe
+        self.path = os.path.join(directory, f"{os.getpid()}.json")
+        self.loop_lag_ms = 0.0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        window_lag = 0.0
+        next_report = time.monotonic() + self.interval
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.probe)
+            window_lag = max(window_lag, time.perf_counter() - start - self.probe)
+            if time.monotonic() >= next_report:
+                # Worst lag of the interval, smoothed so one GC pause does not make the worker full
+                self.loop_lag_ms = 0.5 * self.loop_lag_ms + 0.5 * window_lag * 1000
+                self._write({"pid": os.getpid(), "loop_lag_ms": round(self.loop_lag_ms, 1),
+                             "in_flight": self.in_flight(), "at": time.time()})
+                window_lag = 0.0
+                next_report = time.monotonic() + self.interval
+
+    def _write(self, report: dict) -> None:
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(report, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"[Admission] Writing load report failed: {e}")
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class AdmissionController:
+    """
+    Load-aware admission for the worker (main) process.
+
+    `load` is the worker's load_fnc: the largest of sessions (active and
+    just-accepted jobs), worst job process loop lag, in-flight requests
+    across job processes, RSS of the whole process tree and CPU, each as a
+    fraction of its AdmissionLimits. LiveKit dispatches to the least loaded
+    worker and stops sending jobs to one whose load reaches load_threshold,
+    which spreads calls across nodes. `request` is the request_fnc: it
+    re-measures with the offered job counted and rejects it if that would
+    cross the threshold, so a spike between two load reports cannot
+    overfill a worker; LiveKit then offers the call to another worker.
+
+    LiveKit calls `load` from an executor thread and `request` on the event
+    loop, so the session bookkeeping (`_reservations`, `_active_jobs`) is
+    only touched under `_lock`.
+    """
+
+    def __init__(self, limits: AdmissionLimits, directory: str, stale_after: float = 5.0) -> None:
+        self.limits = limits
+        self.directory = directory
+        self.stale_after = stale_after
+        self.accepted = 0
+        self.rejected = 0
+        self.last: dict[str, float] = {}
+        self._reservations: dict[str, float] = {}  # job id -> accepted at (monotonic)
+        self._active_jobs: set[str] = set()
+        self._lock = threading.Lock()
+        self._process = psutil.Process()
+        self._process.cpu_percent(None)  # first call only starts the measurement
+        psutil.cpu_percent(None)
+
+    def _job_reports(self) -> list[dict]:
+        reports = []
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path) as f:
+                    report = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if now - report.get("at", 0) <= self.stale_after:
+                reports.append(report)
+            elif not psutil.pid_exists(report.get("pid", -1)):
+                os.remove(path)  # the job process is gone
+        return reports
+
+    def _rss_mb(self) -> float:
+        rss = 0
+        for process in [self._process, *self._process.children(recursive=True)]:
+            try:
+                rss += process.memory_info().rss
+            except psutil.Error:
+                pass
+        return rss / (1024 * 1024)
+
+    def _sessions(self, worker=None) -> int:
+        """Active jobs plus jobs accepted but not active yet, dropping reservations that started or expired."""
+        active_jobs = {job.job.id for job in worker.active_jobs} if worker is not None else None
+        now = time.monotonic()
+        with self._lock:
+            if active_jobs is not None:
+                self._active_jobs = active_jobs
+            self._reservations = {
+                job_id: at for job_id, at in self._reservations.items()
+                if job_id not in self._active_jobs and now - at < RESERVATION_TTL
+            }
+            return len(self._active_jobs) + len(self._reservations)
+
+    def measure(self, worker=None, extra_sessions: int = 0) -> dict[str, float]:
+        sessions = self._sessions(worker)
+        reports = self._job_reports()
+        return load_components(
+            self.limits,
+            sessions=sessions + extra_sessions,
+            loop_lag_ms=max((r["loop_lag_ms"] for r in reports), default=0.0),
+            in_flight=sum(r["in_flight"] for r in reports),
+            rss_mb=self._rss_mb(),
+            cpu=psutil.cpu_percent(None) / 100,
+        )
+
+    def load(self, worker=None) -> float:
+        """WorkerOptions.load_fnc: called by the worker with itself every status update."""
+        self.last = self.measure(worker)
+        return min(1.0, max(self.last.values()))
+
+    async def request(self, job_request) -> None:
+        """WorkerOptions.request_fnc: accept the offered job only if there is room for it."""
+        components = self.measure(extra_sessions=1)
+        resource = max(components, key=components.get)
+        if components[resource] > self.limits.load_threshold:
+            self.rejected += 1
+            logger.warning(f"[Admission] Rejecting job {job_request.id}: {resource} at "
+                           f"{components[resource]:.2f} of its limit")
+            await job_request.reject()
+            return
+
+        with self._lock:
+            self._reservations[job_request.id] = time.monotonic()
+        self.accepted += 1
+        await job_request.accept()
+
+    def worker_options(self) -> dict:
+        """WorkerOptions arguments for admission, job process pool and memory limits."""
+        options = {
+            "load_fnc": self.load,
+            "load_threshold": self.limits.load_threshold,
+            "request_fnc": self.request,
+        }
+        # Warm job processes kept ready; LiveKit shrinks the pool as load approaches the threshold
+        if os.getenv("NUM_IDLE_PROCESSES"):
+            options["num_idle_processes"] = int(os.getenv("NUM_IDLE_PROCESSES"))
+        if os.getenv("JOB_MEMORY_WARN_MB"):
+            options["job_memory_warn_mb"] = float(os.getenv("JOB_MEMORY_WARN_MB"))
+        if os.getenv("JOB_MEMORY_LIMIT_MB"):
+            options["job_memory_limit_mb"] = float(os.getenv("JOB_MEMORY_LIMIT_MB"))
+        return options
+
+    def stats(self) -> dict:
+        return {
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "limits": asdict(self.limits),
+            "load": {name: round(value, 2) for name, value in self.last.items()},
+        }
+
+
+def init_admission(limits: AdmissionLimits | None = None) -> AdmissionController:
+    """
+    Create the worker's admission controller. Called in the main process
+    before the worker starts, so the job processes it spawns inherit the
+    report directory.
+    """
+    directory = os.getenv(LOAD_REPORT_DIR) or tempfile.mkdtemp(prefix="frontdesk-load-")
+    os.makedirs(directory, exist_ok=True)
+    os.environ[LOAD_REPORT_DIR] = directory
+    controller = AdmissionController(limits or AdmissionLimits.from_env(), directory)
+    logger.info(f"[Admission] {controller.limits}, job load reports in {directory}")
+    return controller
+
+
+_reporter: LoadReporter | None = None
+
+
+def start_load_reporting(in_flight: Callable[[], int]) -> LoadReporter | None:
+    """
+    Start this job process's reporter (once per process; it outlives jobs).
+    None when the worker was not started with admission.
+    """
+    global _reporter
+    directory = os.getenv(LOAD_REPORT_DIR)
+    if directory is None:
+        return None
+    if _reporter is None:
+        _reporter = LoadReporter(directory, in_flight)
+    _reporter.start()
+    return _reporter
@@ -1,60 +1,324 @@
+import asyncio
+import logging
+import os
+
 from dotenv import load_dotenv
 
 from livekit import agents
 from livekit.agents import (
     Agent,
     AgentSession,
+    ChatContext,
+    ChatMessage,
     JobContext,
     JobProcess,
     RoomInputOptions,
     WorkerOptions,
     cli,
+    get_job_context,
 )
-from livekit.plugins import noise_cancellation, silero
-from livekit.plugins.turn_detector.multilingual import MultilingualModel
+# Plugins register their model files and inference runners on import, so they are
+# imported here on the main process; the models themselves are loaded by model_registry
+from livekit.plugins import noise_cancellation, silero  # noqa: F401
+from livekit.plugins.turn_detector.multilingual import MultilingualModel  # noqa: F401
 
-from prompt import AGENT_INSTRUCTIONS, SESSION_INSTRUCTIONS
-from tool import end_call, check_knowledge_base, create_help_request
+from admission import init_admission, start_load_reporting
+from change_feed import CHANGE_FEED, init_change_feed
+from circuit_breaker import BREAKERS
+from escalation_queue import init_escalation_queue
+from http_client import acquire_http_client, in_flight_requests, init_http_client, release_http_client
+from kb_cache import init_kb_cache
+from kb_embeddings import embeddings_enabled, init_kb_embeddings
+from kb_index import fetch_kb_snapshot, init_kb_index, local_index_enabled, tenant_kb_index
+from kb_prefetch import KB_PREFETCH, start_prefetching
+from model_registry import init_model_registry, load_turn_detector
+from prompt import (
+    UNROUTED_GREETING,
+    UNROUTED_INSTRUCTIONS,
+    render_instructions,
+    session_instructions,
+    supervisor_answer_instructions,
+)
+from tool import (
+    API_BASE_URL,
+    apply_kb_change,
+    end_call,
+    check_knowledge_base,
+    check_knowledge_base_batch,
+    create_help_request,
+    extract_query_tags_llm,
+    fetch_help_request,
+    fetch_kb_version,
+    fetch_tenant,
+    get_caller_phone,
+    kb_search_flight,
+    post_help_requests,
+    prefetch_knowledge_base,
+    refresh_tag_model,
+    sync_kb_index,
+    tag_extraction_flight,
+    wait_background_tasks,
+)
+from tag_extractor import init_tag_extractor, local_model_first
+from tag_memo import get_tag_memo
+from tenant import Tenant, TenantUnavailableError, call_routing, init_tenant_directory, set_current_tenant
+from tracing import export_call_trace, start_call_tracing, tracing_enabled
 
 load_dotenv(".env.local")
 
+logger = logging.getLogger("priya-salon-assistant")
+
 
 class Assistant(Agent):
-    def __init__(self) -> None:
+    def __init__(self, tenant: Tenant) -> None:
         super().__init__(
-            instructions=AGENT_INSTRUCTIONS,
-            tools=[check_knowledge_base, create_help_request, end_call],
+            instructions=render_instructions(tenant=tenant),
+            tools=[check_knowledge_base, check_knowledge_base_batch, create_help_request, end_call],
+        )
+        self._tenant = tenant
+
+    async def on_user_turn_completed(self, turn_ctx: ChatContext, new_message: ChatMessage) -> None:
+        # Refresh the time, open/closed status and caller context; the static prefix never changes
+        job_ctx = get_job_context()
+        instructions = render_instructions(
+            caller_phone=get_caller_phone(job_ctx.room) if job_ctx else None,
+            tenant=self._tenant,
         )
+        if instructions != self.instructions:
+            await self.update_instructions(instructions)
 
 def prewarm(proc: JobProcess):
-    proc.userdata["vad"] = silero.VAD.load()
+    # VAD and noise cancellation, loaded once and shared by every job in this process
+    proc.userdata["models"] = init_model_registry()
+    # Shared keep-alive HTTP client used by every tool call in this process
+    proc.userdata["http_client"] = init_http_client()
+    # Per-tenant KB caches, and the tenants this process has served
+    proc.userdata["kb_cache"] = init_kb_cache()
+    proc.userdata["tenants"] = init_tenant_directory()
 
-async def entrypoint(ctx: JobContext):
-    session = AgentSession(
+    # Default tenant's knowledge base, only if the local index or tag model needs it. Short
+    # timeout: prewarm must finish within initialize_process_timeout, and whatever is
+    # not loaded here is loaded by the first call (other tenants' indexes and tag models always are)
+    kb_snapshot = None
+    if local_index_enabled() or local_model_first():
+        kb_snapshot = fetch_kb_snapshot(API_BASE_URL, timeout=float(os.getenv("KB_SNAPSHOT_TIMEOUT", "2")))
+    # Optional in-process copy of the knowledge base, searched without a backend round trip,
+    # with embeddings of its entries for paraphrases (loaded before the index is created)
+    if local_index_enabled():
+        proc.userdata["kb_embedder"] = init_kb_embeddings()
+        proc.userdata["kb_index"] = init_kb_index(kb_snapshot)
+    elif embeddings_enabled():
+        logger.warning("[KB Embeddings] KB_EMBEDDINGS needs KB_LOCAL_INDEX, embedding search is off")
+    # Tag extractors; the default tenant's offline classifier is trained on its knowledge base's own tags
+    proc.userdata["tag_extractor"] = init_tag_extractor(
+        kb_snapshot.get("data", []) if kb_snapshot else [],
+        llm_extract=extract_query_tags_llm,
+    )
+    # Background delivery of help requests, replaying anything a crashed worker left spooled
+    proc.userdata["escalation_queue"] = init_escalation_queue()
+    # Backend push channel: knowledge base changes and supervisor answers, per tenant
+    if CHANGE_FEED:
+        proc.userdata["change_feed"] = init_change_feed(API_BASE_URL, on_kb_change=apply_kb_change)
+
+def new_session(models) -> AgentSession:
+    return AgentSession(
         stt="deepgram/nova-3:en",
         llm="google/gemini-2.5-flash",
         tts="elevenlabs/eleven_flash_v2:cgSgspJ2msm6clMCkdW9",
-        vad=silero.VAD.load(),
-        turn_detection=MultilingualModel(),
+        vad=models.get("vad"),
+        # Built per job: it binds to this job's inference executor
+        turn_detection=load_turn_detector(),
+    )
+
+
+async def answer_unrouted_call(ctx: JobContext) -> None:
+    """Ask the caller to call back and hang up; with nobody on the line, just end the job."""
+    if not ctx.room.remote_participants:
+        ctx.shutdown(reason="tenant unresolved, no caller")
+        return
+    models = ctx.proc.userdata["models"]
+    session = new_session(models)
+    await session.start(
+        room=ctx.room,
+        agent=Agent(instructions=UNROUTED_INSTRUCTIONS, tools=[end_call]),
+        room_input_options=RoomInputOptions(noise_cancellation=models.get("noise_cancellation")),
+    )
+    await session.generate_reply(instructions=UNROUTED_GREETING)
+
+
+async def entrypoint(ctx: JobContext):
+    # Loop lag and in-flight requests of this job process, read by the worker's load_fnc
+    start_load_reporting(in_flight=in_flight_requests)
+
+    # Per-turn latency spans; set before the session starts so tool calls inherit the tracer
+    tracer = start_call_tracing(ctx.job.room.name) if tracing_enabled() else None
+
+    # Shared with the other jobs of this process; closed when the last of them ends
+    acquire_http_client()
+
+    # Salon this call is for (room metadata or dialed number); tool calls inherit it
+    try:
+        routing = await call_routing(ctx, participant_timeout=float(os.getenv("TENANT_PARTICIPANT_TIMEOUT", "15")))
+        tenant = await ctx.proc.userdata["tenants"].resolve(fetch_tenant, **routing)
+    except TenantUnavailableError as e:
+        logger.error(f"[Tenant] Cannot tell which salon call {ctx.job.room.name} is for: {e}")
+        ctx.add_shutdown_callback(release_http_client)
+        await answer_unrouted_call(ctx)
+        return
+    set_current_tenant(tenant)
+    logger.info(f"[Tenant] Call {ctx.job.room.name} is for {tenant.slug} ({tenant.id})")
+
+    # Drop the tenant's cached KB answers as soon as its backend knowledge base version changes
+    kb_cache = ctx.proc.userdata["kb_cache"].get(tenant.id)
+    kb_cache.start_version_polling(
+        lambda: fetch_kb_version(tenant.id),
+        interval=float(os.getenv("KB_VERSION_POLL_INTERVAL", "15")),
     )
 
+    kb_index = None
+    if local_index_enabled():
+        kb_index = tenant_kb_index(tenant.id)
+        if not kb_index.loaded:
+            try:
+                await sync_kb_index(tenant.id)
+            except Exception as e:
+                # Searches use the backend until the next delta sync loads the index
+                logger.warning(f"[KB Index] Initial load for tenant {tenant.slug} failed: {e}")
+        kb_index.start_delta_sync(
+            lambda: sync_kb_index(tenant.id),
+            interval=float(os.getenv("KB_SYNC_INTERVAL", "30")),
+        )
+
+    # The tenant's local tag model learns from its own knowledge base; train it off the call's path
+    refresh_tag_model(tenant.id)
+
+    tag_memo = get_tag_memo()
+    if tag_memo is not None:
+        async def _log_tag_memo() -> None:
+            await tag_memo.flush()
+            logger.info(f"[Tag Memo] {tag_memo.stats()}")
+
+    escalation_queue = ctx.proc.userdata["escalation_queue"]
+    escalation_queue.start(post_help_requests)
+
+    async def _drain_escalations() -> None:
+        await escalation_queue.drain(timeout=float(os.getenv("ESCALATION_DRAIN_TIMEOUT", "5")))
+        logger.info(f"[Escalations] {escalation_queue.stats()}")
+
+    async def _log_dependency_stats() -> None:
+        logger.info(f"[Single-flight] kb_search {kb_search_flight.stats()}, tag_extraction {tag_extraction_flight.stats()}")
+        for breaker in BREAKERS:
+            logger.info(f"[Breaker] {breaker.name} {breaker.stats()}")
+
+    # Knowledge base lookups started from interim transcripts, before the LLM asks
+    prefetcher = start_prefetching(prefetch_knowledge_base) if KB_PREFETCH else None
+    if prefetcher is not None:
+        async def _stop_prefetching() -> None:
+            await prefetcher.aclose()
+            logger.info(f"[Prefetch] {prefetcher.stats()}")
+
+    models = ctx.proc.userdata["models"]
+    session = new_session(models)
+
+    if tracer is not None:
+        session.on("metrics_collected", lambda ev: tracer.on_metrics(ev.metrics))
+
+    if prefetcher is not None:
+        session.on("user_input_transcribed", lambda ev: prefetcher.on_transcript(ev.transcript, ev.is_final))
+
+    # The tenant's KB cache and index follow pushed changes; a supervisor answer to
+    # one of this call's escalations is relayed if the caller is still on the line
+    change_feed = ctx.proc.userdata.get("change_feed")
+    if change_feed is not None:
+        relayed: set[str] = set()
+        relay_tasks: set[asyncio.Task] = set()
+
+        async def _relay_answer(request_id: str) -> None:
+            try:
+                help_request = await fetch_help_request(request_id, tenant.id)
+                if help_request is None or not help_request.get("supervisor_response"):
+                    return
+                logger.info(f"[Change Feed] Relaying supervisor answer to {request_id} on call {ctx.room.name}")
+                await session.generate_reply(
+                    instructions=supervisor_answer_instructions(help_request["question"], help_request["supervisor_response"])
+                )
+            except Exception as e:
+                logger.warning(f"[Change Feed] Relaying answer to {request_id} failed: {e}")
+
+        def _on_change(event: str, data: dict) -> None:
+            if (
+                event == "help_requests"
+                and data.get("status") == "resolved"
+                and data.get("call_id") == ctx.room.name
+                and data.get("id") not in relayed
+            ):
+                relayed.add(data["id"])
+                task = asyncio.create_task(_relay_answer(data["id"]))
+                relay_tasks.add(task)
+                task.add_done_callback(relay_tasks.discard)
+
+        unsubscribe = change_feed.subscribe(tenant.id, _on_change)
+
+        async def _unsubscribe_changes() -> None:
+            unsubscribe()
+            for task in relay_tasks:
+                task.cancel()
+            await asyncio.gather(*relay_tasks, return_exceptions=True)
+            logger.info(f"[Change Feed] {change_feed.stats()}")
+
+    async def _finish_background_requests() -> None:
+        await wait_background_tasks(timeout=float(os.getenv("ESCALATION_DRAIN_TIMEOUT", "5")))
+
+    async def _export_trace() -> None:
+        await export_call_trace(tracer)
+
+    async def _shutdown() -> None:
+        # One callback running the steps in order (livekit runs separate shutdown
+        # callbacks concurrently): nothing may use the shared HTTP client once this job releases it
+        steps = [
+            _stop_prefetching if prefetcher is not None else None,
+            _unsubscribe_changes if change_feed is not None else None,
+            kb_cache.stop_version_polling,
+            kb_index.stop_delta_sync if kb_index is not None else None,
+            _drain_escalations,
+            _finish_background_requests,
+            _export_trace if tracer is not None else None,
+            _log_tag_memo if tag_memo is not None else None,
+            _log_dependency_stats,
+        ]
+        try:
+            for step in steps:
+                if step is None:
+                    continue
+                try:
+                    await step()
+                except Exception as e:
+                    logger.warning(f"Shutdown step {step.__name__} failed: {e}")
+        finally:
+            await release_http_client()
+
+    ctx.add_shutdown_callback(_shutdown)
+
     await session.start(
         room=ctx.room,
-        agent=Assistant(),
+        agent=Assistant(tenant),
         room_input_options=RoomInputOptions(
-            # For telephony applications, use `BVCTelephony` instead for best results
-            noise_cancellation=noise_cancellation.BVC(), 
+            noise_cancellation=models.get("noise_cancellation"),
         ),
     )
 
     await session.generate_reply(
-        instructions=SESSION_INSTRUCTIONS
+        instructions=session_instructions(tenant)
     )
 
 
 if __name__ == "__main__":
+    # Load-aware admission: report load from sessions, loop lag, in-flight requests,
+    # RSS and CPU, and turn jobs away before the worker is overloaded
+    admission = init_admission()
     cli.run_app(WorkerOptions(
         entrypoint_fnc=entrypoint,
         prewarm_fnc=prewarm,
-           agent_name="frontdesk_telephony_agent"
+           agent_name="frontdesk_telephony_agent",
+        **admission.worker_options(),
         ))
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""
+Recall and latency of the embedding search (kb_embeddings.py) against the
+current retrieval tiers, each on its own, on the seed corpus of
+replay_kb.py (labelled caller phrasings of seed questions, and past help
+request questions no entry answers):
+
+  tier 1      KnowledgeIndex.search, the port of searchKnowledgeBase
+  embeddings  VectorIndex.search
+  tier 2      local tag extraction, then KnowledgeIndex.search with the tags
+
+A question counts as answered when the tier returns results that
+format_kb_results keeps (what check_knowledge_base hands to the LLM).
+"Rescued" counts the questions tier 1 answers wrongly or not at all that
+the tier gets right at rank 1.
+
+Then the cost of keeping the vectors: embedding the whole knowledge base,
+re-embedding one edited entry (apply_changes), reopening the memory-mapped
+file in a new process (no embedding), and search latency as the knowledge
+base grows (rows replicated with new ids).
+
+Needs the embedding model (`python agent.py download-files`, or
+KB_EMBEDDING_TOKENIZER/KB_EMBEDDING_WEIGHTS set to local files).
+
+Usage (from livekit-voice-agent/):
+    uv run python -m benchmarks.bench_embeddings
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.replay_kb import seed_corpus
+from kb_embeddings import VectorIndex, init_kb_embeddings
+from kb_index import KnowledgeIndex
+from tag_extractor import LocalTagExtractor
+from tool import format_kb_results
+
+
+def _pct(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _answered(results: list[dict]) -> list[str]:
+    if not results:
+        return []
+    _, _, formatted = format_kb_results(results)
+    ids = {r["question_pattern"]: r["id"] for r in results}
+    return [ids[r["question"]] for r in formatted]
+
+
+async def evaluate(name: str, search, questions: list[dict], tier1: dict[str, list[str]]) -> None:
+    answered, latencies = {}, []
+    for item in questions:
+        start = time.perf_counter()
+        results = await search(item["question"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        answered[item["question"]] = _answered(results)
+
+    answerable = [q for q in questions if q["expected"]]
+    unanswerable = [q for q in questions if not q["expected"]]
+    recall = {k: sum(bool(set(answered[q["question"]][:k]) & set(q["expected"])) for q in answerable) / len(answerable)
+              for k in (1, 3)}
+    false_matches = sum(bool(answered[q["question"]]) for q in unanswerable)
+    missed_by_tier1 = [q for q in answerable if tier1[q["question"]][:1] != q["expected"][:1]]
+    rescued = sum(answered[q["question"]][:1] == q["expected"][:1] for q in missed_by_tier1)
+    print(f"{name:<11} recall@1 {recall[1]:.3f}  recall@3 {recall[3]:.3f}  "
+          f"false matches {false_matches}/{len(unanswerable)}  "
+          f"rescued {rescued}/{len(missed_by_tier1)}  "
+          f"p50={statistics.median(latencies):.3f}ms p95={_pct(latencies, 0.95):.3f}ms")
+
+
+def _timed(fn) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def maintenance(embedder, rows: list[dict], sizes: list[int], min_similarity: float) -> None:
+    directory = tempfile.mkdtemp(prefix="bench-embeddings-")
+    vectors = VectorIndex(embedder, directory, "bench", min_similarity)
+    ms, embedded = _timed(lambda: vectors.apply_changes([dict(row) for row in rows]))
+    print(f"embed all        {embedded} entries in {ms:.2f}ms, {os.path.getsize(vectors.path) / 1024:.1f}KB on disk")
+
+    edited = {**rows[0], "question_pattern": rows[0]["question_pattern"] + " for men"}
+    ms, embedded = _timed(lambda: vectors.apply_changes([edited]))
+    print(f"edit one entry   {embedded} re-embedded in {ms:.2f}ms")
+    ms, embedded = _timed(lambda: vectors.apply_changes([]))
+    print(f"empty delta      {embedded} re-embedded in {ms:.3f}ms")
+
+    reopened = VectorIndex(embedder, directory, "bench", min_similarity)
+    ms, embedded = _timed(lambda: reopened.apply_changes([dict(row) for row in rows[1:]] + [edited]))
+    print(f"new process      {embedded} re-embedded in {ms:.2f}ms (memory-mapped file reused)\n")
+
+    question = "what do you charge for a trim"
+    for size in sizes:
+        grown = [{**rows[i % len(rows)], "id": f"{rows[i % len(rows)]['id']}-{i}",
+                  "question_pattern": f"{rows[i % len(rows)]['question_pattern']} {i}"} for i in range(size)]
+        index = KnowledgeIndex()
+        index.apply_changes(grown)
+        vectors = VectorIndex(embedder, tempfile.mkdtemp(prefix="bench-embeddings-"), "bench", min_similarity)
+        build_ms, _ = _timed(lambda: vectors.apply_changes(grown))
+        timings = {}
+        for name, search in (("tier 1", lambda: index.search(question)), ("embeddings", lambda: vectors.search(question))):
+            samples = [_timed(search)[0] for _ in range(max(5, 2000 // size))]
+            timings[name] = statistics.median(samples)
+        print(f"{size:6d} entries  embed all {build_ms:8.1f}ms  search: tier 1 {timings['tier 1']:8.3f}ms  "
+              f"embeddings {timings['embeddings']:6.3f}ms")
+
+
+async def main(args) -> int:
+    os.environ["KB_EMBEDDINGS"] = "true"
+    embedder = init_kb_embeddings()
+    if embedder is None:
+        print("Embedding model not available (run `python agent.py download-files`, or set "
+              "KB_EMBEDDING_TOKENIZER/KB_EMBEDDING_WEIGHTS)")
+        return 1
+
+    corpus = seed_corpus()
+    rows = corpus["knowledge_base"]
+    questions = corpus["questions"]
+    index = KnowledgeIndex()
+    index.apply_changes([dict(row) for row in rows])
+    vectors = VectorIndex(embedder, tempfile.mkdtemp(prefix="bench-embeddings-"), "bench", args.min_similarity)
+    vectors.apply_changes([dict(row) for row in rows])
+    extractor = LocalTagExtractor().train(rows)
+
+    async def tier1(question: str) -> list[dict]:
+        return index.search(question)[:5]
+
+    async def embeddings(question: str) -> list[dict]:
+        return vectors.search(question)
+
+    async def tier2(question: str) -> list[dict]:
+        return index.search(question, extracted_tags=await extractor.extract(question))[:5]
+
+    tier1_answers = {q["question"]: _answered(index.search(q["question"])[:5]) for q in questions}
+    print(f"{len(questions)} questions ({sum(bool(q['expected']) for q in questions)} answerable) over {len(rows)} "
+          f"entries, {embedder.name} ({embedder.dim} dimensions), min similarity {args.min_similarity:g}\n")
+    for name, search in (("tier 1", tier1), ("embeddings", embeddings), ("tier 2", tier2)):
+        await evaluate(name, search, questions, tier1_answers)
+    print()
+    maintenance(embedder, rows, args.sizes, args.min_similarity)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-similarity", type=float, default=float(os.getenv("KB_EMBEDDING_MIN_SIMILARITY", "0.5")))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    sys.exit(asyncio.run(main(parser.parse_args())))
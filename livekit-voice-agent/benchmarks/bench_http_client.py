@@ -0,0 +1,74 @@
+"""
+Compare tool HTTP latency with a per-call httpx.AsyncClient (old behaviour)
+against the shared pooled client from http_client.py.
+
+Usage (from livekit-voice-agent/):
+    uv run python -m benchmarks.bench_http_client --calls 500 --concurrency 10
+
+The stub server is plain HTTP on localhost, so the savings reported here are
+the TCP setup cost only; against api.openai.com the TLS handshake makes the
+per-call client considerably slower still.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from benchmarks.stub_server import StubServer
+from http_client import KB_SEARCH, HttpClientConfig, SharedHttpClient
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _run(label: str, call, calls: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    print(
+        f"{label:<12} p50={statistics.median(latencies):7.2f}ms "
+        f"p99={_percentile(latencies, 99):7.2f}ms max={max(latencies):7.2f}ms"
+    )
+
+
+async def main(calls: int, concurrency: int) -> None:
+    stub = StubServer()
+    base_url = await stub.start()
+    url = f"{base_url}/api/knowledge-base/search"
+    params = {"q": "what are your hours"}
+
+    async def per_call_client() -> None:
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            await client.get(url, params=params)
+
+    shared = SharedHttpClient(HttpClientConfig())
+
+    async def shared_client() -> None:
+        await shared.get(url, endpoint=KB_SEARCH, params=params)
+
+    try:
+        await _run("per-call", per_call_client, calls, concurrency)
+        await _run("shared", shared_client, calls, concurrency)
+    finally:
+        await shared.aclose()
+        await stub.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.concurrency))
@@ -0,0 +1,70 @@
+"""
+Latency and backend round trips for compound questions: one
+check_knowledge_base call per sub-question (what the LLM does without the
+batch tool) versus a single check_knowledge_base_batch call.
+
+Usage (from livekit-voice-agent/):
+    uv run python -m benchmarks.bench_kb_batch --kb-delay 0.08 --llm-delay 0.6
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import tool
+from benchmarks.seed_data import load_seed_kb
+from benchmarks.stub_server import StubServer
+
+# Compound questions as the LLM would split them; the last part of each
+# misses tier 1 and needs tag extraction
+COMPOUND_QUESTIONS = [
+    ["how much is a haircut", "what are your hours"],
+    ["do you do balayage", "what are your hours", "what do you charge for a trim"],
+    ["where are you located", "do you take walk-ins", "how do I cancel an appointment", "what do you charge for a trim"],
+]
+
+
+async def _sequential(parts: list[str]) -> int:
+    results = [await tool.check_knowledge_base(part) for part in parts]
+    return sum(r != "not_found" for r in results)
+
+
+async def _batch(parts: list[str]) -> int:
+    result = await tool.check_knowledge_base_batch(parts)
+    return 0 if result == "not_found" else sum(a["found"] for a in json.loads(result)["answers"])
+
+
+async def main(kb_delay: float, llm_delay: float, rounds: int) -> None:
+    stub = StubServer(kb_delay=kb_delay, llm_delay=llm_delay, kb_entries=load_seed_kb())
+    base_url = await stub.start()
+
+    tool.API_BASE_URL = base_url
+    tool.OPENAI_BASE_URL = f"{base_url}/v1"
+    tool.OPENAI_API_KEY = "stub"
+    tool.get_kb_cache().max_entries = 0  # measure the network path, not the cache
+
+    try:
+        for parts in COMPOUND_QUESTIONS:
+            for mode, check in (("sequential", _sequential), ("batch", _batch)):
+                before = stub.counters["kb_search"] + stub.counters["kb_search_batch"]
+                latencies, found = [], 0
+                for _ in range(rounds):
+                    start = time.perf_counter()
+                    found = await check(parts)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                requests = (stub.counters["kb_search"] + stub.counters["kb_search_batch"] - before) / rounds
+                print(f"{len(parts)} parts  {mode:<10} p50={statistics.median(latencies):7.1f}ms "
+                      f"max={max(latencies):7.1f}ms  kb requests/call={requests:.1f}  answered={found}/{len(parts)}")
+    finally:
+        await tool.get_http_client().aclose()
+        await stub.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kb-delay", type=float, default=0.08)
+    parser.add_argument("--llm-delay", type=float, default=0.6)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.kb_delay, args.llm_delay, args.rounds))
@@ -0,0 +1,107 @@
+"""
+Startup and first-answer latency of N sequential simulated jobs in one worker
+process, loading the speech models per job (the old entrypoint behaviour)
+versus through the model registry in eager and lazy mode.
+
+"startup" is the time a job spends obtaining its VAD and noise cancellation
+instances. "first answer" adds the first VAD inference over 100ms of audio,
+the first model work on the path to a reply. The turn detector is left out:
+it needs the job's inference executor, so it is built per job in every mode.
+
+Usage (from livekit-voice-agent/):
+    uv run python -m benchmarks.bench_model_registry --jobs 1 10 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import psutil
+from livekit import rtc
+from livekit.agents.vad import VADEventType
+
+import model_registry
+from model_registry import EAGER, LAZY, ModelRegistry
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = SAMPLE_RATE // 100  # 10ms
+
+
+async def _first_vad_inference(vad) -> None:
+    stream = vad.stream()
+    silence = bytes(FRAME_SAMPLES * 2)
+    for _ in range(10):
+        stream.push_frame(rtc.AudioFrame(silence, SAMPLE_RATE, 1, FRAME_SAMPLES))
+    stream.end_input()
+    async for event in stream:
+        if event.type == VADEventType.INFERENCE_DONE:
+            break
+    await stream.aclose()
+
+
+def _per_job_models() -> dict:
+    return {
+        "vad": model_registry._load_vad(),
+        "noise_cancellation": model_registry._load_noise_cancellation(),
+    }
+
+
+def _registry(mode: str) -> ModelRegistry:
+    registry = ModelRegistry(mode=mode)
+    registry.register("vad", model_registry._load_vad)
+    registry.register("noise_cancellation", model_registry._load_noise_cancellation)
+    return registry
+
+
+async def _run(mode: str, jobs: int) -> dict:
+    rss_before = psutil.Process().memory_info().rss
+    prewarm_ms = 0.0
+    registry = None
+    if mode != "per-job":
+        start = time.perf_counter()
+        registry = _registry(mode)
+        if mode == EAGER:
+            registry.load_all()
+        prewarm_ms = (time.perf_counter() - start) * 1000
+
+    startup, first_answer = [], []
+    for _ in range(jobs):
+        start = time.perf_counter()
+        if registry is None:
+            models = _per_job_models()
+        else:
+            models = {name: registry.get(name) for name in ("vad", "noise_cancellation")}
+        startup.append((time.perf_counter() - start) * 1000)
+        await _first_vad_inference(models["vad"])
+        first_answer.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "mode": mode,
+        "jobs": jobs,
+        "prewarm_ms": round(prewarm_ms, 1),
+        "startup_p50_ms": round(statistics.median(startup), 1),
+        "startup_max_ms": round(max(startup), 1),
+        "first_answer_p50_ms": round(statistics.median(first_answer), 1),
+        "first_answer_max_ms": round(max(first_answer), 1),
+        "rss_growth_mb": round((psutil.Process().memory_info().rss - rss_before) / (1024 * 1024), 1),
+        "models": registry.stats()["models"] if registry else None,
+    }
+
+
+async def main(job_counts: list[int]) -> None:
+    for jobs in job_counts:
+        for mode in ("per-job", EAGER, LAZY):
+            result = await _run(mode, jobs)
+            models = result.pop("models")
+            print("  ".join(f"{k}={v}" for k, v in result.items()))
+            if models and jobs == job_counts[0] and mode == EAGER:
+                for name, stats in models.items():
+                    print(f"    {name}: load {stats['load_ms']}ms, +{stats['rss_delta_mb']}MB RSS")
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+    asyncio.run(main(args.jobs))
@@ -0,0 +1,118 @@
+"""
+check_knowledge_base latency with and without the transcript prefetch
+(kb_prefetch.py), and the prefetch hit rate, over simulated caller turns.
+
+Each labelled caller question is "spoken" word by word: an interim
+transcript per word, then the final transcript. After the end-of-turn
+delay and the LLM's time to first token, the tool is called with the
+question the LLM would write (the knowledge base question the caller's
+words map to). The tool latency after the LLM asks is what the caller hears
+as silence, so the difference between the two modes is the end-of-turn to
+audio latency the prefetch saves. Both modes are also scored on whether
+the top answer is the labelled one, since a reused prefetch answers the
+caller's words rather than the LLM's question.
+
+Usage (from livekit-voice-agent/):
+    uv run python -m benchmarks.bench_prefetch --kb-delay 0.08 --llm-delay 0.6 --extractor llm
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import kb_prefetch
+import tool
+from benchmarks.seed_data import LABELED_QUESTIONS, load_seed_kb
+from benchmarks.stub_server import StubServer
+from tag_extractor import init_tag_extractor
+
+FILLERS = ("", "hi um I wanted to ask ", "yeah so ")
+
+# Prefetcher stats of every prefetching turn
+prefetch_stats: list[dict] = []
+
+
+def _top_answer(response: str) -> str | None:
+    if response == "not_found":
+        return None
+    results = json.loads(response).get("results") or []
+    return results[0]["answer"] if results else None
+
+
+async def _turn(utterance: str, question: str, args, prefetch: bool) -> tuple[float, str]:
+    """Speak one turn and return (tool latency ms, tool response)."""
+    prefetcher = kb_prefetch.start_prefetching(tool.prefetch_knowledge_base) if prefetch else None
+    words = utterance.split()
+    for i in range(1, len(words) + 1):
+        if prefetcher is not None:
+            prefetcher.on_transcript(" ".join(words[:i]), is_final=False)
+        await asyncio.sleep(args.word_interval)
+    if prefetcher is not None:
+        prefetcher.on_transcript(utterance, is_final=True)
+
+    # Turn detector decides the caller is done, then the LLM decides to call the tool
+    await asyncio.sleep(args.eou_delay + args.llm_first_token)
+    start = time.perf_counter()
+    response = await tool.check_knowledge_base(question)
+    latency = (time.perf_counter() - start) * 1000
+    if prefetcher is not None:
+        await prefetcher.aclose()
+        prefetch_stats.append(prefetcher.stats())
+    return latency, response
+
+
+async def main(args) -> None:
+    stub = StubServer(kb_delay=args.kb_delay, llm_delay=args.llm_delay, kb_entries=load_seed_kb())
+    base_url = await stub.start()
+    tool.API_BASE_URL = base_url
+    tool.OPENAI_BASE_URL = f"{base_url}/v1"
+    tool.OPENAI_API_KEY = "stub"
+    tool.get_kb_cache().max_entries = 0  # every lookup pays for the backend, as on a first call
+
+    os.environ["TAG_EXTRACTOR"] = args.extractor
+    os.environ["TAG_MEMO"] = "false"
+    init_tag_extractor(load_seed_kb(), llm_extract=tool.extract_query_tags_llm)
+
+    answers = {row["question_pattern"]: row["answer"] for row in load_seed_kb()}
+    turns = [(FILLERS[i % len(FILLERS)] + utterance, question) for i, (utterance, question) in enumerate(LABELED_QUESTIONS)]
+    latencies = {False: [], True: []}
+    correct = {False: 0, True: 0}
+    try:
+        for utterance, question in turns:
+            # Each turn in its own task, so its prefetcher does not leak into the next
+            off, off_response = await asyncio.create_task(_turn(utterance, question, args, prefetch=False))
+            on, on_response = await asyncio.create_task(_turn(utterance, question, args, prefetch=True))
+            latencies[False].append(off)
+            latencies[True].append(on)
+            correct[False] += _top_answer(off_response) == answers[question]
+            correct[True] += _top_answer(on_response) == answers[question]
+    finally:
+        await tool.get_http_client().aclose()
+        await stub.stop()
+
+    hits = sum(s["hits"] for s in prefetch_stats)
+    cancelled = sum(s["cancelled"] for s in prefetch_stats)
+    started = sum(s["started"] for s in prefetch_stats)
+    print(f"{len(turns)} turns, extractor={args.extractor}, kb_delay={args.kb_delay * 1000:.0f}ms, "
+          f"llm_delay={args.llm_delay * 1000:.0f}ms, {args.word_interval * 1000:.0f}ms/word\n")
+    for prefetch in (False, True):
+        values = sorted(latencies[prefetch])
+        print(f"prefetch {'on ' if prefetch else 'off'}  tool latency p50={statistics.median(values):7.1f}ms "
+              f"p95={values[int(0.95 * (len(values) - 1))]:7.1f}ms mean={statistics.fmean(values):7.1f}ms "
+              f"correct top answer {correct[prefetch] / len(turns):.1%}")
+    saved = statistics.fmean(latencies[False]) - statistics.fmean(latencies[True])
+    print(f"\nhit rate {hits / len(turns):.1%}, "
+          f"lookups started {started} ({cancelled} stale cancelled), mean saved {saved:.1f}ms per turn")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kb-delay", type=float, default=0.08)
+    parser.add_argument("--llm-delay", type=float, default=0.6, help="OpenAI tag extraction latency")
+    parser.add_argument("--extractor", default="local", choices=("local", "llm", "local+llm"))
+    parser.add_argument("--word-interval", type=float, default=0.15, help="seconds between interim transcripts")
+    parser.add_argument("--eou-delay", type=float, default=0.3, help="end-of-turn detection delay")
+    parser.add_argument("--llm-first-token", type=float, default=0.4, help="LLM time to the tool call")
+    asyncio.run(main(parser.parse_args()))
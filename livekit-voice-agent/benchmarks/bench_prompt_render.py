@@ -0,0 +1,80 @@
+"""
+Render cost of the per-call agent instructions, and a prefix-stability check.
+
+The check fails (exit 1) if the rendered instructions for different times,
+open/closed states or callers, or in a fresh interpreter, do not all start
+with the same static_instructions(tenant) bytes, since provider prompt
+caching depends on that. Renders are for the default tenant.
+
+Usage (from livekit-voice-agent/):
+    uv run python -m benchmarks.bench_prompt_render --renders 100000
+"""
+import argparse
+import hashlib
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import prompt
+from tenant import DEFAULT_TENANT
+
+_FRESH_PROCESS_HASH = (
+    "import hashlib, prompt, tenant; "
+    "print(hashlib.sha256(prompt.static_instructions(tenant.DEFAULT_TENANT).encode()).hexdigest())"
+)
+
+
+def check_prefix_stability() -> list[str]:
+    failures = []
+    prefix = prompt.static_instructions(DEFAULT_TENANT)
+    start = DEFAULT_TENANT.tz.localize(datetime(2026, 1, 5, 8, 0))  # a Monday
+    for hours in range(0, 24 * 7, 5):
+        now = start + timedelta(hours=hours, minutes=hours % 60)
+        for caller in (None, "+15550100", "+919800000000"):
+            rendered = prompt.render_instructions(now=now, caller_phone=caller, tenant=DEFAULT_TENANT)
+            if not rendered.startswith(prefix):
+                failures.append(f"prefix changed at {now} for caller {caller}")
+            if now.strftime("%I:%M %p") not in rendered[len(prefix):]:
+                failures.append(f"time missing from context at {now}")
+
+    local_hash = hashlib.sha256(prefix.encode()).hexdigest()
+    fresh_hash = subprocess.run(
+        [sys.executable, "-c", _FRESH_PROCESS_HASH], capture_output=True, text=True, check=True
+    ).stdout.strip()
+    if fresh_hash != local_hash:
+        failures.append(f"prefix differs in a fresh process: {fresh_hash} != {local_hash}")
+    return failures
+
+
+def bench(renders: int) -> None:
+    now = datetime.now(DEFAULT_TENANT.tz)
+
+    prompt._render.cache_clear()
+    start = time.perf_counter()
+    for i in range(renders):
+        prompt.render_instructions(now=now + timedelta(minutes=i), caller_phone="+15550100", tenant=DEFAULT_TENANT)
+    uncached = (time.perf_counter() - start) / renders * 1e6
+
+    start = time.perf_counter()
+    for _ in range(renders):
+        prompt.render_instructions(now=now, caller_phone="+15550100", tenant=DEFAULT_TENANT)
+    cached = (time.perf_counter() - start) / renders * 1e6
+
+    size = len(prompt.render_instructions(now=now, tenant=DEFAULT_TENANT).encode())
+    print(f"instructions: {size} bytes ({len(prompt.static_instructions(DEFAULT_TENANT).encode())} static)")
+    print(f"render, new minute:  {uncached:.2f}us")
+    print(f"render, same minute: {cached:.2f}us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=100000)
+    args = parser.parse_args()
+
+    bench(args.renders)
+    failures = check_prefix_stability()
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("prefix stable" if not failures else f"{len(failures)} prefix stability failures")
+    sys.exit(1 if failures else 0)
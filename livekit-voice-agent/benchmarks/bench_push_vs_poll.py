@@ -0,0 +1,218 @@
+"""
+Database query load of the supervisor dashboard, polling every 30 seconds
+versus refetching on changes pushed over GET /api/events, with 50 dashboards
+open, and how stale each dashboard is after a change.
+
+The dashboards are spread over the five UI pages (home: request and KB stats,
+pending, history, knowledge base, learned answers); every page load is one
+SQL query per API call, as in the backend services. Callers escalate at
+`--escalations-per-hour`, and a supervisor answers each one after
+`--answer-delay` minutes, which resolves the request and adds a knowledge
+base entry in one transaction (two notifications). Push dashboards behave
+like ui/lib/api.js subscribeToChanges: they refetch once per burst of
+changes (250ms window) and on every (re)connect.
+
+An agent worker's ChangeFeed (change_feed.py) is subscribed as well, to time
+how long a pushed knowledge base change takes to reach its KB cache, against
+KB_VERSION_POLL_INTERVAL polling.
+
+Simulated time runs `--time-scale` times faster than the wall clock: the
+workload and the poll interval are scaled down, and a polling page's wait
+for its next poll is scaled back up. Event delivery, the refetch window and
+the page loads themselves take real time. The stub backend and all 50
+dashboards share one event loop, so a burst of refetches queues behind
+itself and push staleness is an upper bound.
+
+Usage (from livekit-voice-agent/):
+    uv run python -m benchmarks.bench_push_vs_poll --dashboards 50 --minutes 60 --time-scale 60
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+import httpx
+
+from benchmarks.stub_server import StubServer
+from change_feed import ChangeFeed, iter_sse
+from tenant import DEFAULT_TENANT
+
+# Page -> (API paths loaded, topics it subscribes to), as in ui/app
+PAGES = {
+    "home": (["/api/help-requests/stats", "/api/knowledge-base/stats"], ["help_requests", "knowledge_base"]),
+    "pending": (["/api/help-requests?status=pending"], ["help_requests"]),
+    "history": (["/api/help-requests"], ["help_requests"]),
+    "knowledge": (["/api/knowledge-base?active_only=true"], ["knowledge_base"]),
+    "learned": (["/api/knowledge-base?active_only=true"], ["knowledge_base"]),
+}
+POLL_INTERVAL = 30.0
+COALESCE = 0.25
+VERSION_POLL_INTERVAL = 15.0
+
+
+class Dashboard:
+    def __init__(self, page: str, client: httpx.AsyncClient, base_url: str, scale: float, poll: bool) -> None:
+        self.page = page
+        self.paths, self.topics = PAGES[page]
+        self.client = client
+        self.base_url = base_url
+        self.scale = scale
+        # Waiting for the next poll runs on the scaled clock; pushed events arrive in real time
+        self.wait_scale = scale if poll else 1.0
+        self.loads: list[tuple[float, float]] = []  # (started, finished), wall clock
+
+    async def load(self) -> None:
+        started = time.perf_counter()
+        await asyncio.gather(*(self.client.get(f"{self.base_url}{path}") for path in self.paths))
+        self.loads.append((started, time.perf_counter()))
+
+    async def poll(self) -> None:
+        await self.load()
+        await asyncio.sleep(random.uniform(0, POLL_INTERVAL) / self.scale)  # pages were opened at different times
+        while True:
+            await self.load()
+            await asyncio.sleep(POLL_INTERVAL / self.scale)
+
+    async def subscribe(self) -> None:
+        await self.load()
+        timer: asyncio.Task | None = None
+
+        async def _refetch() -> None:
+            await asyncio.sleep(COALESCE)
+            await self.load()
+
+        url = f"{self.base_url}/api/events?topics={','.join(self.topics)}"
+        async with self.client.stream("GET", url, timeout=None) as response:
+            async for _event in iter_sse(response.aiter_lines()):
+                if timer is not None and not timer.done():
+                    timer.cancel()
+                timer = asyncio.create_task(_refetch())
+
+    def staleness(self, changed_at: float) -> float | None:
+        """Simulated seconds from a change until a load that saw it finished."""
+        return next(
+            ((started - changed_at) * self.wait_scale + finished - started
+             for started, finished in self.loads if started >= changed_at),
+            None,
+        )
+
+
+async def workload(stub: StubServer, args, changes: list[tuple[float, str]]) -> None:
+    """Escalations and supervisor answers, published like the migration 011 triggers."""
+    rng = random.Random(args.seed)
+    scale = args.time_scale
+    pending: list[tuple[float, dict]] = []
+    end = time.perf_counter() + args.minutes * 60 / scale
+    next_escalation = time.perf_counter() + rng.expovariate(args.escalations_per_hour / 3600) / scale
+
+    while time.perf_counter() < end:
+        now = time.perf_counter()
+        if now >= next_escalation:
+            record = {"id": str(uuid.uuid4()), "status": "pending", "question": "Do you do keratin treatments?",
+                      "call_id": f"call-{len(stub.help_requests)}", "customer_phone": "+15550100"}
+            stub.help_requests.append(record)
+            stub.publish("help_requests", {"op": "INSERT", "id": record["id"], "status": "pending"})
+            changes.append((now, "help_requests"))
+            pending.append((now + args.answer_delay * 60 / scale, record))
+            next_escalation = now + rng.expovariate(args.escalations_per_hour / 3600) / scale
+        while pending and pending[0][0] <= now:
+            _, record = pending.pop(0)
+            record.update(status="resolved", supervisor_response="Yes, keratin starts at 4000 rupees.")
+            entry = {"id": str(uuid.uuid4()), "question_pattern": record["question"],
+                     "answer": record["supervisor_response"], "tags": ["keratin"]}
+            stub.kb_entries.append(entry)
+            # One transaction: both notifications are delivered at commit
+            stub.publish("help_requests", {"op": "UPDATE", "id": record["id"], "status": "resolved"})
+            stub.publish("knowledge_base", {"op": "INSERT", "id": entry["id"]})
+            changes.append((now, "help_requests"))
+            changes.append((now, "knowledge_base"))
+        await asyncio.sleep(0.01)
+
+
+async def run(mode: str, args) -> dict:
+    stub = StubServer(kb_delay=args.query_delay)
+    base_url = await stub.start()
+    client = httpx.AsyncClient(limits=httpx.Limits(max_connections=4 * args.dashboards), timeout=30)
+    pages = list(PAGES)
+    dashboards = [Dashboard(pages[i % len(pages)], client, base_url, args.time_scale, mode == "poll")
+                  for i in range(args.dashboards)]
+    changes: list[tuple[float, str]] = []
+
+    # Agent worker: KB cache invalidations pushed by its ChangeFeed
+    invalidations: list[float] = []
+    feed = ChangeFeed(base_url, on_kb_change=lambda tenant_id: invalidations.append(time.perf_counter()))
+    if mode == "push":
+        feed.subscribe(DEFAULT_TENANT.id)
+
+    tasks = [asyncio.create_task(d.poll() if mode == "poll" else d.subscribe()) for d in dashboards]
+    await asyncio.sleep(0.5)  # every dashboard loaded and subscribed
+    queries_before = stub.counters["dashboard_query"]
+    started = time.perf_counter()
+    try:
+        await workload(stub, args, changes)
+        elapsed = time.perf_counter() - started
+        queries = stub.counters["dashboard_query"] - queries_before
+        await asyncio.sleep(POLL_INTERVAL / args.time_scale + 0.5)  # let the last changes reach every page
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await feed.aclose()
+        await client.aclose()
+        await stub.stop()
+
+    staleness = []
+    for changed_at, table in changes:
+        for dashboard in dashboards:
+            if table in dashboard.topics:
+                value = dashboard.staleness(changed_at)
+                if value is not None:
+                    staleness.append(value)
+
+    if mode == "push":
+        agent_staleness = [
+            (next(t for t in invalidations if t >= changed_at) - changed_at) * 1000
+            for changed_at, table in changes if table == "knowledge_base" and any(t >= changed_at for t in invalidations)
+        ]
+    else:
+        agent_staleness = [VERSION_POLL_INTERVAL / 2 * 1000]  # mean wait for the next version poll
+    return {
+        "queries": queries,
+        "queries_per_min": queries / (elapsed * args.time_scale / 60),
+        "changes": len(changes),
+        "staleness": sorted(staleness),
+        "agent_staleness_ms": statistics.fmean(agent_staleness) if agent_staleness else float("nan"),
+        "event_streams": stub.counters["event_stream"],
+    }
+
+
+async def main(args) -> None:
+    random.seed(args.seed)
+    print(f"{args.dashboards} dashboards over {len(PAGES)} pages, {args.minutes} simulated minutes "
+          f"(x{args.time_scale:g}), {args.escalations_per_hour:g} escalations/hour answered after "
+          f"{args.answer_delay:g} min\n")
+    results = {mode: await run(mode, args) for mode in ("poll", "push")}
+    for mode, r in results.items():
+        values = r["staleness"]
+        extra = f", {r['event_streams']} event streams + 1 LISTEN connection" if mode == "push" else ""
+        print(f"{mode:4}  dashboard queries {r['queries']:6d} ({r['queries_per_min']:7.1f}/min){extra}")
+        print(f"      staleness after a change p50={statistics.median(values):5.1f}s "
+              f"p95={values[int(0.95 * (len(values) - 1))]:5.1f}s max={values[-1]:5.1f}s "
+              f"({r['changes']} changes)")
+        print(f"      agent KB cache stale for {r['agent_staleness_ms']:.0f}ms mean after a knowledge base change\n")
+    ratio = results["poll"]["queries"] / max(1, results["push"]["queries"])
+    print(f"push issues {ratio:.1f}x fewer dashboard queries than polling")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dashboards", type=int, default=50)
+    parser.add_argument("--minutes", type=float, default=60, help="simulated duration")
+    parser.add_argument("--time-scale", type=float, default=60)
+    parser.add_argument("--escalations-per-hour", type=float, default=20)
+    parser.add_argument("--answer-delay", type=float, default=3, help="minutes until the supervisor answers")
+    parser.add_argument("--query-delay", type=float, default=0.002, help="stub latency per query (seconds)")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
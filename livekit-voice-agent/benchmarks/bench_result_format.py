@@ -0,0 +1,100 @@
+"""
+Prompt tokens added to the LLM context by check_knowledge_base responses,
+full versus compact format (kb_format.py), across the seed knowledge base.
+
+Every labelled caller question and past help request question goes through
+the same two-tier search as the tool. Tier 1 runs on the local KnowledgeIndex.
+Tier 2 runs with the local tag extractor. Both the full and the compact
+response are rendered for every question. Tokens are counted with tiktoken
+(o200k_base, the gpt-4o family encoding) when it is installed, otherwise
+estimated at 4 characters per token.
+
+Usage (from livekit-voice-agent/):
+    uv run python -m benchmarks.bench_result_format
+"""
+import asyncio
+import statistics
+from collections import defaultdict
+
+import kb_format
+from benchmarks.seed_data import HISTORICAL_HELP_REQUESTS, LABELED_QUESTIONS, load_seed_kb
+from kb_index import KnowledgeIndex
+from tag_extractor import LocalTagExtractor
+from tool import format_kb_results
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("o200k_base")
+
+    def count_tokens(text: str) -> int:
+        return len(_encoding.encode(text))
+
+    TOKENIZER = "tiktoken o200k_base"
+except ImportError:
+    def count_tokens(text: str) -> int:
+        return max(1, round(len(text) / 4))
+
+    TOKENIZER = "estimate (4 chars/token, install tiktoken for exact counts)"
+
+
+async def _search(index: KnowledgeIndex, extractor: LocalTagExtractor, question: str) -> tuple[str, list[dict]] | None:
+    """(tier, formatted results) as check_knowledge_base would produce them, or None for not_found."""
+    results = index.search(question)[:5]
+    if results:
+        tier, _, formatted_results = format_kb_results(results)
+        if formatted_results:
+            return tier, formatted_results
+
+    tags = await extractor.extract(question)
+    results = index.search(question, extracted_tags=tags)[:5] if tags else []
+    if results:
+        tier, _, formatted_results = format_kb_results(results)
+        if formatted_results:
+            return tier, formatted_results
+    return None
+
+
+async def main() -> None:
+    rows = load_seed_kb()
+    index = KnowledgeIndex()
+    index.apply_changes(rows)
+    extractor = LocalTagExtractor().train(rows)
+
+    questions = [q for q, _ in LABELED_QUESTIONS] + HISTORICAL_HELP_REQUESTS
+    tokens: dict[str, dict[str, list[int]]] = defaultdict(lambda: defaultdict(list))  # tier -> format -> tokens
+    results_dropped: dict[str, list[int]] = defaultdict(list)
+    for question in questions:
+        found = await _search(index, extractor, question)
+        if found is None:
+            for fmt in (kb_format.FULL, kb_format.COMPACT):
+                tokens["not_found"][fmt].append(count_tokens("not_found"))
+            continue
+        tier, formatted_results = found
+        for fmt in (kb_format.FULL, kb_format.COMPACT):
+            payload = kb_format.kb_payload(formatted_results, tier, result_format=fmt)
+            tokens[tier][fmt].append(count_tokens(kb_format.dumps(payload, result_format=fmt)))
+        results_dropped[tier].append(len(formatted_results) - len(kb_format.shape_results(formatted_results, tier)))
+
+    print(f"{len(questions)} questions, {len(rows)} KB entries, tokenizer: {TOKENIZER}\n")
+    print(f"{'tier':<10} {'n':>4} {'full avg':>9} {'compact avg':>12} {'saved/turn':>11} {'saved':>7} {'results dropped':>16}")
+    total = {kb_format.FULL: 0, kb_format.COMPACT: 0}
+    for tier in ("high", "medium", "low", "not_found"):
+        if tier not in tokens:
+            continue
+        full, compact = tokens[tier][kb_format.FULL], tokens[tier][kb_format.COMPACT]
+        total[kb_format.FULL] += sum(full)
+        total[kb_format.COMPACT] += sum(compact)
+        dropped = statistics.fmean(results_dropped[tier]) if results_dropped[tier] else 0.0
+        saved = statistics.fmean(full) - statistics.fmean(compact)
+        print(f"{tier:<10} {len(full):>4} {statistics.fmean(full):>9.1f} {statistics.fmean(compact):>12.1f} "
+              f"{saved:>11.1f} {saved / statistics.fmean(full):>7.0%} {dropped:>16.1f}")
+
+    saved = total[kb_format.FULL] - total[kb_format.COMPACT]
+    print(f"\nall        {len(questions):>4} {total[kb_format.FULL] / len(questions):>9.1f} "
+          f"{total[kb_format.COMPACT] / len(questions):>12.1f} {saved / len(questions):>11.1f} "
+          f"{saved / total[kb_format.FULL]:>7.0%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+"""
+Latency of check_knowledge_base in sequential vs speculative mode against a
+mock backend and a mock LLM with configurable delays.
+
+Usage (from livekit-voice-agent/):
+    uv run python -m benchmarks.bench_speculative --kb-delay 0.08 --llm-delay 0.6 --budget 3.0
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import tool
+from benchmarks.seed_data import load_seed_kb
+from benchmarks.stub_server import StubServer
+
+# Tier 1 hit (a query word is a KB tag) and tier 1 miss (needs tag extraction)
+QUESTIONS = {
+    "tier1-hit": "what are your hours",
+    "tier1-miss": "can I leave my car nearby",
+}
+
+
+async def _measure(question: str, rounds: int) -> list[float]:
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await tool.check_knowledge_base(question)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def main(kb_delay: float, llm_delay: float, budget: float, rounds: int) -> None:
+    stub = StubServer(kb_delay=kb_delay, llm_delay=llm_delay, kb_entries=load_seed_kb())
+    base_url = await stub.start()
+
+    tool.API_BASE_URL = base_url
+    tool.OPENAI_BASE_URL = f"{base_url}/v1"
+    tool.OPENAI_API_KEY = "stub"
+    tool.KB_LATENCY_BUDGET = budget
+    tool.get_kb_cache().max_entries = 0  # measure the network path, not the cache
+
+    try:
+        for mode in ("sequential", "speculative"):
+            tool.KB_SPECULATIVE = mode == "speculative"
+            for label, question in QUESTIONS.items():
+                latencies = await _measure(question, rounds)
+                print(f"{mode:<12} {label:<11} p50={statistics.median(latencies):7.1f}ms max={max(latencies):7.1f}ms")
+    finally:
+        await stub.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kb-delay", type=float, default=0.08)
+    parser.add_argument("--llm-delay", type=float, default=0.6)
+    parser.add_argument("--budget", type=float, default=3.0)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.kb_delay, args.llm_delay, args.budget, args.rounds))
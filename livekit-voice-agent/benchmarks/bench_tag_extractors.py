@@ -0,0 +1,66 @@
+"""
+Accuracy and latency of the tag extractors on the labelled seed questions.
+
+Accuracy is measured the way tier 2 uses the tags: the extracted tags are
+passed to the local knowledge base index and the question counts as correct
+when the top result is the labelled entry.
+
+Usage (from livekit-voice-agent/):
+    uv run python -m benchmarks.bench_tag_extractors
+    OPENAI_API_KEY=... uv run python -m benchmarks.bench_tag_extractors --llm
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import tool
+from benchmarks.seed_data import LABELED_QUESTIONS, load_seed_kb
+from kb_index import KnowledgeIndex
+from tag_extractor import LLMTagExtractor, LocalTagExtractor, TagExtractor
+
+
+async def evaluate(extractor: TagExtractor, index: KnowledgeIndex) -> None:
+    correct = 0
+    latencies = []
+    for question, expected in LABELED_QUESTIONS:
+        start = time.perf_counter()
+        tags = await extractor.extract(question)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        results = index.search(question, extracted_tags=tags)
+        if results and results[0]["question_pattern"] == expected:
+            correct += 1
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{extractor.name:<6} accuracy={correct}/{len(LABELED_QUESTIONS)} ({correct / len(LABELED_QUESTIONS):.0%}) "
+        f"p50={statistics.median(latencies):.3f}ms p99={p99:.3f}ms"
+    )
+
+
+async def main(with_llm: bool) -> None:
+    rows = load_seed_kb()
+    index = KnowledgeIndex()
+    index.apply_changes(rows)
+
+    baseline = sum(
+        1 for question, expected in LABELED_QUESTIONS
+        if (results := index.search(question)) and results[0]["question_pattern"] == expected
+    )
+    print(f"no-tags accuracy={baseline}/{len(LABELED_QUESTIONS)} (tier 1 only)")
+
+    await evaluate(LocalTagExtractor().train(rows), index)
+    if with_llm:
+        if not tool.OPENAI_API_KEY:
+            print("llm    skipped: OPENAI_API_KEY is not set")
+        else:
+            await evaluate(LLMTagExtractor(tool.extract_query_tags_llm), index)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm", action="store_true", help="also evaluate the OpenAI extractor")
+    args = parser.parse_args()
+    asyncio.run(main(args.llm))
@@ -0,0 +1,210 @@
+"""
+Multi-tenant agent state at 1, 100 and 1000 tenants on one worker process.
+
+For each tenant count:
+  - cache isolation: a stream of KB lookups in which tenant 0 is a large
+    salon sending half of all traffic, spread over tens of thousands of
+    distinct questions, while every other tenant's callers keep asking its
+    own handful of hot questions (Zipf, over tenants and questions). Hit rate
+    of the lookups of the other tenants, one shared LRU cache versus per-tenant
+    caches (TenantCaches) holding the same total number of entries
+  - memory held by the per-tenant caches and rendered static prompts (tracemalloc)
+  - instructions render time per tenant, first render and cached
+  - tenant resolution through TenantDirectory against the stub backend, the
+    first call of a tenant versus later calls
+
+Usage (from livekit-voice-agent/):
+    uv run python -m benchmarks.bench_tenants --lookups 200000 --kb-delay 0.02
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from itertools import accumulate
+
+import prompt
+import tool
+from benchmarks.seed_data import load_seed_kb
+from benchmarks.stub_server import StubServer
+from kb_cache import KnowledgeCache, TenantCaches
+from tenant import DEFAULT_TENANT, WEEKDAYS, Tenant, TenantDirectory
+
+TENANT_COUNTS = (1, 100, 1000)
+HOT_QUESTIONS = 30  # distinct questions a small salon's callers ask
+LARGE_TENANT_QUESTIONS = 50_000
+LARGE_TENANT_SHARE = 0.5
+
+
+def tenant_row(i: int) -> dict:
+    """A /api/tenants row for the i-th synthetic salon (0 is the default tenant)."""
+    if i == 0:
+        tenant = DEFAULT_TENANT
+        hours = {day: list(h) if h else None for day, h in zip(WEEKDAYS, tenant.business_hours)}
+        return {"id": tenant.id, "slug": tenant.slug, "business_name": tenant.business_name,
+                "assistant_name": tenant.assistant_name, "services": list(tenant.services),
+                "timezone": tenant.timezone, "business_hours": hours, "phone_numbers": ["+15550000000"]}
+    return {
+        "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"tenant-{i}")),
+        "slug": f"salon-{i}",
+        "business_name": f"SALON NUMBER {i}",
+        "assistant_name": ("Asha", "Maya", "Nina", "Priya")[i % 4],
+        "services": ["Hair Services", "Nail Services", "Skin Care"][: 1 + i % 3],
+        "timezone": ("Asia/Kolkata", "America/New_York", "Europe/London")[i % 3],
+        "business_hours": {day: None if day == "mon" else [9 + i % 2, 18 + i % 3] for day in WEEKDAYS},
+        "phone_numbers": [f"+1555{i:07d}"],
+    }
+
+
+def zipf_cum_weights(n: int, s: float = 1.1) -> list[float]:
+    return list(accumulate(1 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def simulate(tenants: int, lookups: int, per_tenant: int, max_tenants: int, seed: int) -> dict:
+    """Hit rates of a shared LRU cache and of per-tenant caches over the same lookup stream."""
+    rng = random.Random(seed)
+    tenant_weights = zipf_cum_weights(max(1, tenants - 1))
+    question_weights = zipf_cum_weights(HOT_QUESTIONS)
+    results = [{"id": "x", "answer": "cached answer", "similarity_score": 0.85}]
+
+    shared = KnowledgeCache(max_entries=per_tenant * min(tenants, max_tenants), ttl=float("inf"))
+    isolated = TenantCaches(max_tenants=max_tenants, max_entries=per_tenant, ttl=float("inf"))
+    hits = {"shared": {"large": 0, "small": 0}, "per_tenant": {"large": 0, "small": 0}}
+    counts = {"large": 0, "small": 0}
+
+    for _ in range(lookups):
+        if tenants == 1 or rng.random() < LARGE_TENANT_SHARE:
+            tenant, kind = 0, "large"
+            question = f"question {rng.randrange(LARGE_TENANT_QUESTIONS)}"
+        else:
+            tenant, kind = 1 + rng.choices(range(tenants - 1), cum_weights=tenant_weights)[0], "small"
+            question = f"question {rng.choices(range(HOT_QUESTIONS), cum_weights=question_weights)[0]}"
+        counts[kind] += 1
+
+        shared_question = f"{tenant} {question}"  # tenants' questions never share a key
+        if shared.get(shared_question) is not None:
+            hits["shared"][kind] += 1
+        else:
+            shared.put(shared_question, None, results)
+
+        cache = isolated.get(str(tenant))
+        if cache.get(question) is not None:
+            hits["per_tenant"][kind] += 1
+        else:
+            cache.put(question, None, results)
+
+    def rate(strategy: str, kind: str) -> float | None:
+        return hits[strategy][kind] / counts[kind] if counts[kind] else None
+
+    return {
+        "shared": {kind: rate("shared", kind) for kind in counts},
+        "per_tenant": {kind: rate("per_tenant", kind) for kind in counts},
+        "tenant_evictions": isolated.tenant_evictions,
+    }
+
+
+def measure_memory(tenants: list[Tenant], per_tenant: int, max_tenants: int, kb_rows: list[dict]) -> tuple[int, int]:
+    """Bytes allocated by full per-tenant caches, and by every tenant's rendered static prompt."""
+    prompt.static_instructions.cache_clear()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    caches = TenantCaches(max_tenants=max_tenants, max_entries=per_tenant)
+    for tenant in tenants:
+        cache = caches.get(tenant.id)
+        for q in range(per_tenant):
+            cache.put(f"question {q}", None, [dict(row) for row in kb_rows[q % len(kb_rows):][:5]])
+    after_caches = tracemalloc.get_traced_memory()[0]
+    for tenant in tenants:
+        prompt.static_instructions(tenant)
+    after_prompts = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after_caches - before, after_prompts - after_caches
+
+
+def measure_render(tenants: list[Tenant]) -> tuple[float, float]:
+    """Mean microseconds per tenant for the first instructions render and a cached one."""
+    prompt.static_instructions.cache_clear()
+    prompt._render.cache_clear()
+    nows = [datetime.now(tenant.tz) for tenant in tenants]
+
+    start = time.perf_counter()
+    for tenant, now in zip(tenants, nows):
+        prompt.render_instructions(now=now, caller_phone="+15550100", tenant=tenant)
+    first = (time.perf_counter() - start) / len(tenants) * 1e6
+
+    start = time.perf_counter()
+    for tenant, now in zip(tenants, nows):
+        prompt.render_instructions(now=now, caller_phone="+15550100", tenant=tenant)
+    cached = (time.perf_counter() - start) / len(tenants) * 1e6
+    return first, cached
+
+
+async def measure_resolve(rows: list[dict], stub: StubServer) -> tuple[list[float], list[float]]:
+    """Latencies (ms) of resolving every tenant by dialed number, first call and second call."""
+    stub.tenants = rows
+    directory = TenantDirectory()
+    semaphore = asyncio.Semaphore(10)  # below the shared client's connection limit
+    latencies: dict[int, list[float]] = {0: [], 1: []}
+
+    async def _resolve(row: dict, attempt: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            tenant = await directory.resolve(tool.fetch_tenant, phone=row["phone_numbers"][0])
+            latencies[attempt].append((time.perf_counter() - start) * 1000)
+            assert tenant.id == row["id"], f"resolved {tenant.id} for {row['id']}"
+
+    for attempt in (0, 1):
+        await asyncio.gather(*(_resolve(row, attempt) for row in rows))
+    return latencies[0], latencies[1]
+
+
+def _pct(value: float | None) -> str:
+    return f"{value:.1%}" if value is not None else "-"
+
+
+async def main(lookups: int, per_tenant: int, max_tenants: int, kb_delay: float, seed: int) -> None:
+    kb_rows = load_seed_kb()
+    stub = StubServer(kb_delay=kb_delay)
+    tool.API_BASE_URL = await stub.start()
+
+    print(f"{lookups} lookups per run, {per_tenant} cache entries per tenant, "
+          f"{max_tenants} tenant caches kept, large tenant share {LARGE_TENANT_SHARE:.0%}\n")
+    try:
+        for count in TENANT_COUNTS:
+            rows = [tenant_row(i) for i in range(count)]
+            tenants = [Tenant.from_row(row) for row in rows]
+
+            sim = simulate(count, lookups, per_tenant, max_tenants, seed)
+            cache_bytes, prompt_bytes = measure_memory(tenants, per_tenant, max_tenants, kb_rows)
+            first_render, cached_render = measure_render(tenants)
+            first_resolve, repeat_resolve = await measure_resolve(rows, stub)
+
+            print(f"== {count} tenant(s)")
+            print(f"  small-tenant hit rate: shared LRU {_pct(sim['shared']['small'])}, "
+                  f"per-tenant {_pct(sim['per_tenant']['small'])}")
+            print(f"  large-tenant hit rate: shared LRU {_pct(sim['shared']['large'])}, "
+                  f"per-tenant {_pct(sim['per_tenant']['large'])}")
+            print(f"  tenant cache evictions: {sim['tenant_evictions']}")
+            print(f"  memory: caches {cache_bytes / 1024:.0f} KiB "
+                  f"({cache_bytes / min(count, max_tenants) / 1024:.1f} KiB/tenant), "
+                  f"static prompts {prompt_bytes / 1024:.0f} KiB ({prompt_bytes / count / 1024:.1f} KiB/tenant)")
+            print(f"  render: first {first_render:.1f}us/tenant, cached {cached_render:.2f}us/tenant")
+            print(f"  resolve: first p50 {statistics.median(first_resolve):.1f}ms, "
+                  f"repeat p50 {statistics.median(repeat_resolve) * 1000:.1f}us\n")
+    finally:
+        await tool.get_http_client().aclose()
+        await stub.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--per-tenant", type=int, default=64, help="KB cache entries per tenant")
+    parser.add_argument("--max-tenants", type=int, default=1024, help="tenant caches kept (KB_CACHE_MAX_TENANTS)")
+    parser.add_argument("--kb-delay", type=float, default=0.02, help="stub backend latency (seconds)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(main(args.lookups, args.per_tenant, args.max_tenants, args.kb_delay, args.seed))
@@ -0,0 +1,102 @@
+"""
+Fault-injection check for the backend and OpenAI circuit breakers.
+
+Phases, against StubServer:
+  1. healthy           warm the KB cache
+  2. backend down      500s trip the backend breaker; later lookups fail fast,
+                       serving stale cached answers where there are any
+  3. backend recovers  after BREAKER_OPEN_SECONDS a half-open probe closes it
+  4. OpenAI slow       slow tag extraction trips the OpenAI breaker; tier 2
+                       keeps working with the local tag classifier
+
+Usage (from livekit-voice-agent/):
+    uv run python -m benchmarks.circuit_breaker_check
+"""
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("BREAKER_MIN_REQUESTS", "5")
+os.environ.setdefault("BREAKER_OPEN_SECONDS", "1")
+os.environ.setdefault("BREAKER_SLOW_CALL_SECONDS", "0.5")
+os.environ["TAG_EXTRACTOR"] = "llm"
+os.environ["TAG_MEMO"] = "false"
+
+import circuit_breaker  # noqa: E402
+import tag_extractor  # noqa: E402
+import tool  # noqa: E402
+from benchmarks.seed_data import LABELED_QUESTIONS, load_seed_kb  # noqa: E402
+from benchmarks.stub_server import StubServer  # noqa: E402
+
+CACHED_QUESTION = "what are your hours"
+UNCACHED_QUESTION = "how much is a haircut"
+TIER1_MISS_QUESTION = "what do you charge for a trim"
+
+
+def _check(name: str, ok: bool, detail: str) -> bool:
+    print(f"{'PASS' if ok else 'FAIL'}  {name}: {detail}")
+    return ok
+
+
+async def _timed(question: str) -> tuple[str, float]:
+    start = time.perf_counter()
+    result = await tool.check_knowledge_base(question)
+    return result, (time.perf_counter() - start) * 1000
+
+
+async def main() -> int:
+    kb_entries = load_seed_kb()
+    stub = StubServer(kb_delay=0.05, llm_delay=0.05, kb_entries=kb_entries)
+    base_url = await stub.start()
+    tool.API_BASE_URL = base_url
+    tool.OPENAI_BASE_URL = f"{base_url}/v1"
+    tool.OPENAI_API_KEY = "stub"
+    tag_extractor.init_tag_extractor(kb_entries, tool.extract_query_tags_llm)
+    backend, openai = circuit_breaker.backend_breaker, circuit_breaker.openai_breaker
+    ok = True
+
+    # 1. Healthy: cache one answer, then let it expire
+    await tool.check_knowledge_base(CACHED_QUESTION)
+    tool.get_kb_cache().ttl = 0
+
+    # 2. Backend down
+    stub.error_rates["kb_search"] = 1.0
+    for question, _ in LABELED_QUESTIONS[:5]:
+        await tool.check_knowledge_base(question)
+    ok &= _check("backend breaker opens", backend.is_open, f"{backend.stats()}")
+
+    searches = stub.counters["kb_search"]
+    result, elapsed = await _timed(UNCACHED_QUESTION)
+    ok &= _check("fail fast while open", result == "not_found" and elapsed < 50 and stub.counters["kb_search"] == searches,
+                 f"{elapsed:.1f}ms, {stub.counters['kb_search'] - searches} upstream requests")
+    result, elapsed = await _timed(CACHED_QUESTION)
+    ok &= _check("stale cache fallback", result != "not_found" and elapsed < 50, f"{elapsed:.1f}ms, found={result != 'not_found'}")
+
+    # 3. Backend recovers: half-open probe closes the breaker
+    stub.error_rates["kb_search"] = 0.0
+    await asyncio.sleep(backend.open_seconds + 0.1)
+    result, _ = await _timed(UNCACHED_QUESTION)
+    ok &= _check("half-open probe closes breaker", backend.state == circuit_breaker.CLOSED and result != "not_found",
+                 f"{backend.stats()}")
+
+    # 4. OpenAI slow: breaker opens on slow calls, tier 2 falls back to the local classifier
+    stub.llm_delay = backend.slow_call_seconds + 0.2
+    tool.get_kb_cache().max_entries = 0
+    for i in range(openai.min_requests):
+        await tool.extract_query_tags(f"{TIER1_MISS_QUESTION} {i}")
+    ok &= _check("OpenAI breaker opens on slow calls", openai.is_open, f"{openai.stats()}")
+
+    extractions = stub.counters["tag_extraction"]
+    result, elapsed = await _timed(TIER1_MISS_QUESTION)
+    ok &= _check("local tag fallback", result != "not_found" and stub.counters["tag_extraction"] == extractions
+                 and elapsed < stub.llm_delay * 1000, f"{elapsed:.1f}ms, found={result != 'not_found'}")
+
+    print(circuit_breaker.render_prometheus())
+    await tool.get_http_client().aclose()
+    await stub.stop()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
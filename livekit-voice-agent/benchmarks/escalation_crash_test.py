@@ -0,0 +1,95 @@
+"""
+Kill/restart check for the escalation queue.
+
+A worker process queues escalations while the stub backend is failing half
+of its requests, and is SIGKILLed before it can deliver them all. A second
+worker starts with the same spool directory and the backend healthy; every
+escalation must reach the backend exactly once.
+
+Usage (from livekit-voice-agent/):
+    uv run python -m benchmarks.escalation_crash_test --escalations 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import tempfile
+
+from benchmarks.stub_server import StubServer
+
+
+async def _worker(count: int, recover_only: bool) -> None:
+    import tool
+    from escalation_queue import init_escalation_queue
+
+    queue = init_escalation_queue()
+    queue.base_backoff = 0.05
+    queue.max_backoff = 0.2
+    queue.start(tool.post_help_requests)
+
+    if recover_only:
+        await queue.drain(timeout=30)
+        print(json.dumps(queue.stats()), flush=True)
+        return
+
+    for i in range(count):
+        await queue.enqueue(customer_phone="+15550100", question=f"Question number {i}?", call_id=f"call-{i % 10}")
+        # A caller repeating themselves must not create a second request
+        await queue.enqueue(customer_phone="+15550100", question=f"Question number {i}?", call_id=f"call-{i % 10}")
+    print("ENQUEUED", flush=True)
+    await asyncio.sleep(3600)
+
+
+async def _spawn(spool_dir: str, base_url: str, args: list[str]) -> asyncio.subprocess.Process:
+    env = {**os.environ, "ESCALATION_SPOOL_DIR": spool_dir, "API_BASE_URL": base_url, "ESCALATION_BATCH_SIZE": "5"}
+    return await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "benchmarks.escalation_crash_test", *args,
+        env=env, stdout=asyncio.subprocess.PIPE,
+    )
+
+
+async def main(escalations: int, kill_after: float) -> int:
+    stub = StubServer(error_rate=0.5, help_request_delay=0.02)
+    base_url = await stub.start()
+    spool_dir = tempfile.mkdtemp(prefix="escalation_spool_")
+
+    worker = await _spawn(spool_dir, base_url, ["--worker", "--escalations", str(escalations)])
+    assert (await worker.stdout.readline()).strip() == b"ENQUEUED"
+    await asyncio.sleep(kill_after)
+    worker.send_signal(signal.SIGKILL)
+    await worker.wait()
+    delivered_before_kill = len(stub.help_requests)
+    print(f"worker 1 killed: {delivered_before_kill}/{escalations} delivered before the kill")
+
+    stub.error_rate = 0.0
+    worker = await _spawn(spool_dir, base_url, ["--worker", "--recover"])
+    stats = json.loads((await worker.stdout.readline()).decode())
+    await worker.wait()
+    print(f"worker 2 recovered and delivered: {stats}")
+
+    questions = [r["question"] for r in stub.help_requests]
+    missing = escalations - len(set(questions))
+    duplicated = len(questions) - len(set(questions))
+    print(f"backend: {len(set(questions))}/{escalations} escalations, {missing} missing, {duplicated} duplicated, "
+          f"{stub.counters['help_request_duplicate']} redeliveries absorbed by (call_id, question) dedup")
+
+    await stub.stop()
+    ok = missing == 0 and duplicated == 0
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escalations", type=int, default=50)
+    parser.add_argument("--kill-after", type=float, default=0.2, help="seconds between enqueue and SIGKILL")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--recover", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        asyncio.run(_worker(args.escalations, args.recover))
+    else:
+        sys.exit(asyncio.run(main(args.escalations, args.kill_after)))
@@ -0,0 +1,97 @@
+"""
+Compare local KnowledgeIndex rankings with the SQL search path.
+
+Requires a running backend seeded with backend/db/seeds/seed.js. The index is
+loaded through the same /api/knowledge-base/sync endpoint the agent uses, then
+every query is run through both the index and /api/knowledge-base/search.
+
+Usage (from livekit-voice-agent/):
+    uv run python -m benchmarks.kb_index_parity --api-base-url http://localhost:3000
+
+Note that /search increments times_used on the top hit, which is the
+tie-breaker for equal scores; run against a freshly seeded database for
+stable results.
+"""
+import argparse
+import sys
+import time
+
+import httpx
+
+from benchmarks.seed_data import load_seed_kb
+from kb_index import KnowledgeIndex, fetch_kb_snapshot
+
+PARAPHRASES = [
+    ("what are your hours", None),
+    ("when do you open on sunday", None),
+    ("how much is a haircut", None),
+    ("where is the salon", None),
+    ("can i just walk in", None),
+    ("do you do eyebrow threading", None),
+    ("how much for bridal makeup", None),
+    ("are you open monday", None),
+    ("what is the address", ["location", "address", "directions"]),
+    ("how much does it cost to get my hair colored", ["pricing", "cost", "coloring"]),
+    ("can I cancel my appointment", ["policies", "cancellation", "appointments"]),
+    ("who does the hair there", ["staff", "stylist", "team"]),
+]
+
+
+def build_queries() -> list[tuple[str, list[str] | None]]:
+    queries = []
+    for entry in load_seed_kb():
+        pattern = entry["question_pattern"]
+        queries.append((pattern, None))
+        queries.append((pattern.lower().rstrip("?"), None))
+    return queries + PARAPHRASES
+
+
+def main(api_base_url: str, min_top1: float) -> int:
+    snapshot = fetch_kb_snapshot(api_base_url)
+    if snapshot is None:
+        return 1
+    index = KnowledgeIndex()
+    index.apply_changes(snapshot["data"], snapshot.get("server_time"))
+
+    queries = build_queries()
+    top1_agree = 0
+    max_score_diff = 0.0
+    local_time = 0.0
+
+    with httpx.Client(timeout=10.0) as client:
+        for question, tags in queries:
+            params = {"q": question}
+            if tags:
+                params["extracted_tags"] = ",".join(tags)
+            sql_results = client.get(f"{api_base_url}/api/knowledge-base/search", params=params).json().get("data", [])
+
+            start = time.perf_counter()
+            local_results = index.search(question, extracted_tags=tags)
+            local_time += time.perf_counter() - start
+
+            sql_ids = [r["id"] for r in sql_results]
+            local_ids = [r["id"] for r in local_results]
+            if sql_ids[:1] == local_ids[:1]:
+                top1_agree += 1
+            else:
+                print(f"MISMATCH {question!r} tags={tags}")
+                print(f"  sql:   {[(r['question_pattern'], round(float(r['similarity_score']), 3)) for r in sql_results]}")
+                print(f"  local: {[(r['question_pattern'], round(r['similarity_score'], 3)) for r in local_results]}")
+
+            scores = {r["id"]: float(r["similarity_score"]) for r in sql_results}
+            for r in local_results:
+                if r["id"] in scores:
+                    max_score_diff = max(max_score_diff, abs(scores[r["id"]] - r["similarity_score"]))
+
+    agreement = top1_agree / len(queries)
+    print(f"queries={len(queries)} top1_agreement={agreement:.3f} max_score_diff={max_score_diff:.4f} "
+          f"local_avg={local_time / len(queries) * 1e6:.1f}us")
+    return 0 if agreement >= min_top1 else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api-base-url", default="http://localhost:3000")
+    parser.add_argument("--min-top1", type=float, default=0.9)
+    args = parser.parse_args()
+    sys.exit(main(args.api_base_url, args.min_top1))
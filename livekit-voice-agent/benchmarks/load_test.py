@@ -0,0 +1,247 @@
+"""
+Concurrent-call load test for the agent tools.
+
+Each simulated call asks one to three questions with check_knowledge_base.
+A share of calls then escalate with create_help_request, and every call
+ends with end_call. The question mix is paraphrased seed KB questions plus
+past help request questions. The calls run against StubServer, which stands
+in for the Node backend, the OpenAI endpoint and the LiveKit RoomService.
+Each has its own latency and error rate.
+
+For every concurrency level the harness reports throughput, per-tool
+p50/p95/p99 latency, error counts and event-loop lag, and writes all levels
+to a JSON results file. Pass --baseline with an earlier results file to
+fail (exit 1) when a tool's p95 at any level regresses by more than
+--tolerance.
+
+Usage (from livekit-voice-agent/):
+    uv run python -m benchmarks.load_test --concurrency 10 50 200 --duration 20 \
+        --kb-delay 0.03 --llm-delay 0.4 --room-delay 0.05 --kb-error-rate 0.01
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+
+from livekit import api
+from livekit.agents.job import _JobContextVar
+
+import escalation_queue
+import tool
+from benchmarks.seed_data import HISTORICAL_HELP_REQUESTS, LABELED_QUESTIONS, load_seed_kb
+from benchmarks.stub_server import StubServer
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+@dataclass
+class LevelStats:
+    latencies: dict[str, list[float]] = field(default_factory=dict)
+    errors: dict[str, int] = field(default_factory=dict)
+    loop_lag: list[float] = field(default_factory=list)
+    calls: int = 0
+
+    def record(self, name: str, seconds: float, result: str) -> None:
+        self.latencies.setdefault(name, []).append(seconds * 1000)
+        if result == "error":
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+
+class FakeJobContext:
+    """What the tools read from get_job_context(): the room and the LiveKit API client."""
+
+    def __init__(self, room_name: str, phone: str, lk_api: api.LiveKitAPI) -> None:
+        participant = SimpleNamespace(identity=f"sip_{phone}")
+        self.room = SimpleNamespace(name=room_name, remote_participants={participant.identity: participant})
+        self.api = lk_api
+
+
+def _percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(p * len(values)))], 2)
+
+
+async def _monitor_loop_lag(stats: LevelStats, stop: asyncio.Event, interval: float = 0.01) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stats.loop_lag.append((time.perf_counter() - start - interval) * 1000)
+
+
+async def _timed(stats: LevelStats, name: str, call) -> str:
+    start = time.perf_counter()
+    try:
+        result = await call
+    except Exception:
+        result = "error"
+    stats.record(name, time.perf_counter() - start, result)
+    return result
+
+
+async def _simulate_call(stats: LevelStats, lk_api: api.LiveKitAPI, escalation_rate: float) -> None:
+    call_number = stats.calls
+    stats.calls += 1
+    _JobContextVar.set(FakeJobContext(f"load-{call_number}", f"+1555{call_number:07d}", lk_api))
+
+    for _ in range(random.randint(1, 3)):
+        question = random.choice(LABELED_QUESTIONS)[0]
+        await _timed(stats, "check_knowledge_base", tool.check_knowledge_base(question))
+
+    if random.random() < escalation_rate:
+        question = random.choice(HISTORICAL_HELP_REQUESTS)
+        await _timed(stats, "check_knowledge_base", tool.check_knowledge_base(question))
+        await _timed(stats, "create_help_request", tool.create_help_request(question))
+
+    await _timed(stats, "end_call", tool.end_call(None))
+
+
+async def _caller(stats: LevelStats, lk_api: api.LiveKitAPI, deadline: float, escalation_rate: float) -> None:
+    while time.perf_counter() < deadline:
+        await asyncio.create_task(_simulate_call(stats, lk_api, escalation_rate))
+
+
+async def run_level(concurrency: int, duration: float, lk_api: api.LiveKitAPI, escalation_rate: float) -> dict:
+    stats = LevelStats()
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_monitor_loop_lag(stats, stop))
+
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(_caller(stats, lk_api, deadline, escalation_rate) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "calls": stats.calls,
+        "calls_per_s": round(stats.calls / elapsed, 2),
+        "tool_calls_per_s": round(sum(len(v) for v in stats.latencies.values()) / elapsed, 2),
+        "tools": {
+            name: {
+                "count": len(values),
+                "errors": stats.errors.get(name, 0),
+                "p50_ms": _percentile(values, 0.50),
+                "p95_ms": _percentile(values, 0.95),
+                "p99_ms": _percentile(values, 0.99),
+                "mean_ms": round(statistics.fmean(values), 2),
+            }
+            for name, values in sorted(stats.latencies.items())
+        },
+        "loop_lag_ms": {
+            "p50": _percentile(stats.loop_lag, 0.50),
+            "p99": _percentile(stats.loop_lag, 0.99),
+            "max": round(max(stats.loop_lag), 2),
+        },
+    }
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """p95 regressions beyond `tolerance` (fraction) for levels and tools present in both runs."""
+    regressions = []
+    previous = {level["concurrency"]: level for level in baseline["levels"]}
+    for level in results["levels"]:
+        before = previous.get(level["concurrency"])
+        if before is None:
+            continue
+        for name, now in level["tools"].items():
+            then = before["tools"].get(name)
+            if then and now["p95_ms"] > then["p95_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{name} @ {level['concurrency']} concurrent: p95 {then['p95_ms']}ms -> {now['p95_ms']}ms"
+                )
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    stub = StubServer(
+        kb_delay=args.kb_delay,
+        llm_delay=args.llm_delay,
+        help_request_delay=args.help_request_delay,
+        room_delay=args.room_delay,
+        error_rates={
+            "kb_search": args.kb_error_rate,
+            "tag_extraction": args.llm_error_rate,
+            "help_request": args.help_request_error_rate,
+            "delete_room": args.room_error_rate,
+        },
+        kb_entries=load_seed_kb(),
+    )
+    base_url = await stub.start()
+    tool.API_BASE_URL = base_url
+    tool.OPENAI_BASE_URL = f"{base_url}/v1"
+    tool.OPENAI_API_KEY = "stub"
+    tool.get_kb_cache().max_entries = 0 if args.no_cache else tool.get_kb_cache().max_entries
+
+    os.environ.setdefault("ESCALATION_SPOOL_DIR", tempfile.mkdtemp(prefix="load_test_spool_"))
+    queue = escalation_queue.init_escalation_queue()
+    queue.start(tool.post_help_requests)
+
+    lk_api = api.LiveKitAPI(url=base_url, api_key="stub", api_secret="stub-secret-for-load-testing-only-000")
+
+    levels = []
+    for concurrency in args.concurrency:
+        level = await run_level(concurrency, args.duration, lk_api, args.escalation_rate)
+        levels.append(level)
+        kb = level["tools"].get("check_knowledge_base", {})
+        print(f"{concurrency:>5} concurrent: {level['calls_per_s']} calls/s, "
+              f"check_knowledge_base p50/p95/p99 {kb.get('p50_ms')}/{kb.get('p95_ms')}/{kb.get('p99_ms')}ms, "
+              f"loop lag p99 {level['loop_lag_ms']['p99']}ms")
+
+    await queue.drain(timeout=10)
+    results = {
+        "benchmark": "load_test",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "levels": levels,
+        "escalation_queue": queue.stats(),
+        "stub_counters": stub.counters,
+    }
+
+    await queue.stop()
+    await lk_api.aclose()
+    await tool.get_http_client().aclose()
+    await stub.stop()
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"load_test_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"results written to {output}")
+
+    if args.baseline:
+        regressions = compare_to_baseline(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    parser.add_argument("--escalation-rate", type=float, default=0.2)
+    parser.add_argument("--kb-delay", type=float, default=0.03)
+    parser.add_argument("--llm-delay", type=float, default=0.4)
+    parser.add_argument("--help-request-delay", type=float, default=0.05)
+    parser.add_argument("--room-delay", type=float, default=0.05)
+    parser.add_argument("--kb-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--help-request-error-rate", type=float, default=0.0)
+    parser.add_argument("--room-error-rate", type=float, default=0.0)
+    parser.add_argument("--no-cache", action="store_true", help="disable the KB result cache")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/load_test_<time>.json)")
+    parser.add_argument("--baseline", help="earlier results file to check p95 regressions against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main(args)))
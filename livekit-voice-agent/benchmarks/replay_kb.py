@@ -0,0 +1,358 @@
+"""
+Offline replay of recorded caller questions through check_knowledge_base's
+two-tier lookup: a regression check for retrieval quality and speed.
+
+A corpus is a JSON file with the knowledge base rows and the caller
+questions. Each question lists the ids of the entries that answer it;
+an empty list means nothing answers it and the agent should escalate:
+
+    {"knowledge_base": [{"id": ..., "question_pattern": ..., "answer": ..., "tags": [...]}],
+     "questions": [{"question": "...", "expected": ["<kb id>"], "source": "seed"}]}
+
+Without --corpus, the corpus is built from the seed knowledge base. It has
+the labelled caller phrasings of seed questions and past help request
+questions that no seed entry answers (benchmarks/seed_data.py).
+--export-corpus builds one from a running backend instead. It takes the
+tenant's active knowledge base and, for each learned entry, the question
+of the help request it was learned from, expecting that entry. Unresolved
+help requests are added expecting an escalation.
+
+Each question runs through tool.lookup_knowledge_base against local
+stand-ins. That is the tier 1 search, then tag extraction and a tier 2
+search if tier 1 has nothing usable. The run is repeated for each source:
+  backend  /api/knowledge-base/search on the stub backend, through the KB
+           cache. The stub scores with KnowledgeIndex, the Python port of
+           searchKnowledgeBase's SQL (kept in step by kb_index_parity.py).
+  index    the tenant's in-process KnowledgeIndex (KB_LOCAL_INDEX)
+  embeddings  the in-process index with the embedding search between tier 1
+           and tag matching (KB_EMBEDDINGS). Needs the embedding model
+           (download-files, or KB_EMBEDDING_TOKENIZER/KB_EMBEDDING_WEIGHTS
+           set to local files) and is skipped without it.
+Each source gets a cold pass with empty caches, then a warm pass that
+asks everything again. Runs are repeated (--repeats) and latencies are the
+median over the runs.
+
+Reported:
+  - recall@k: how often an expected entry is among the first k results
+    returned to the LLM, and how often it is the top result in the high
+    confidence tier (the LLM answers those without hedging)
+  - escalation rate per tier: tier 1 = passed on to tag matching,
+    tier 2 = of those, escalated
+  - wrong escalations (answerable questions escalated) and false matches
+    (unanswerable questions given results, which the LLM then has to see
+    through)
+  - warm passes whose top answer differs from the cold pass
+  - per-query latency
+
+The run fails (exit 1) when wrong escalations or false matches exceed
+their absolute limits (--max-wrong-escalation, --max-false-match), whatever
+the baseline says. With --baseline, it also fails when a gated metric is
+worse than the baseline file beyond its tolerance. --update-baseline
+writes the file instead. Latency depends on the machine, so record the
+baseline on the machine the check runs on.
+
+Usage (from livekit-voice-agent/):
+    uv run python -m benchmarks.replay_kb --baseline benchmarks/replay_baseline.json
+    uv run python -m benchmarks.replay_kb --export-corpus corpus.json --api-base-url http://localhost:3000
+    uv run python -m benchmarks.replay_kb --corpus corpus.json --baseline corpus_baseline.json --update-baseline
+    uv run python -m benchmarks.replay_kb --extractor llm --llm-delay 0.4
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+
+import tool
+from benchmarks.seed_data import HISTORICAL_HELP_REQUESTS, LABELED_QUESTIONS, load_seed_kb
+from benchmarks.stub_server import StubServer
+import kb_index
+from kb_embeddings import init_kb_embeddings
+from kb_index import KnowledgeIndex, init_kb_index
+from tag_extractor import init_tag_extractor
+from tenant import DEFAULT_TENANT, tenant_headers
+from tracing import start_call_tracing
+
+# The index source loads the tenant's local index, which then serves every later lookup
+SOURCES = ("backend", "index", "embeddings")
+RECALL_AT = (1, 3)
+
+# Gated metrics and whether higher is better. Tier escalation rates are only
+# reported: fewer escalations is not better when a question has no answer.
+QUALITY_GATES = {"recall@1": True, "recall@3": True, "high_confidence@1": True, "wrong_escalation": False, "false_match": False,
+                 "warm_mismatch": False}
+LATENCY_GATES = ("cold_p50_ms", "cold_p95_ms", "warm_p50_ms", "warm_p95_ms")
+# Default ceilings on the error rates. The baseline only compares a run with
+# an earlier run, so on its own it would keep accepting any rate once recorded
+LIMITS = {"wrong_escalation": 0.05, "false_match": 0.25}
+# Latency differences below this are noise, whatever the relative change
+LATENCY_SLACK_MS = 0.5
+
+
+def seed_corpus() -> dict:
+    rows = load_seed_kb()
+    ids = {row["question_pattern"]: row["id"] for row in rows}
+    questions = [{"question": q, "expected": [ids[pattern]], "source": "seed"} for q, pattern in LABELED_QUESTIONS]
+    questions += [{"question": q, "expected": [], "source": "help_request"} for q in HISTORICAL_HELP_REQUESTS]
+    return {"knowledge_base": rows, "questions": questions}
+
+
+def _paged(client: httpx.Client, path: str, params: dict, page_size: int = 100) -> list[dict]:
+    rows, offset = [], 0
+    while True:
+        response = client.get(path, params={**params, "limit": page_size, "offset": offset})
+        response.raise_for_status()
+        page = response.json().get("data", [])
+        rows += page
+        if len(page) < page_size:
+            return rows
+        offset += page_size
+
+
+def export_corpus(api_base_url: str, tenant_id: str) -> dict:
+    """Corpus of a tenant's knowledge base and help requests on a running backend."""
+    with httpx.Client(base_url=api_base_url, headers=tenant_headers(tenant_id), timeout=30.0) as client:
+        entries = _paged(client, "/api/knowledge-base", {"active_only": "true"})
+        unresolved = _paged(client, "/api/help-requests", {"status": "unresolved"})
+
+    questions = [{"question": entry["learned_from_request"]["question"], "expected": [entry["id"]],
+                  "source": "help_request"}
+                 for entry in entries if entry.get("learned_from_request")]
+    questions += [{"question": r["question"], "expected": [], "source": "help_request"} for r in unresolved]
+    rows = [{key: entry.get(key) for key in ("id", "question_pattern", "normalized_question", "answer", "tags",
+                                             "is_active", "times_used")}
+            for entry in entries]
+    return {"knowledge_base": rows, "questions": questions}
+
+
+async def _lookup(question: str) -> tuple[str, float, bool]:
+    """(tool response, latency ms, whether tier 2 ran). Run as its own task so it gets its own tracer."""
+    tracer = start_call_tracing("replay")
+    start = time.perf_counter()
+    response = await tool.lookup_knowledge_base(question)
+    latency = (time.perf_counter() - start) * 1000
+    return response, latency, any(span.name == "kb.tag_extraction" for span in tracer.spans)
+
+
+def _answered_ids(response: str, ids_by_pattern: dict[str, str]) -> list[str]:
+    if response == "not_found":
+        return []
+    return [ids_by_pattern.get(r["question"], "?") for r in json.loads(response).get("results", [])]
+
+
+def _pct(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def replay(source: str, corpus: dict, args) -> tuple[dict, list[dict]]:
+    """Metrics of one source, and the cold pass outcome of every question."""
+    # Copies: the local index bumps times_used (its tie-breaker) on the rows it serves
+    rows = [dict(row) for row in corpus["knowledge_base"]]
+    ids_by_pattern = {row["question_pattern"]: row["id"] for row in rows}
+    init_tag_extractor(rows, llm_extract=tool.extract_query_tags_llm)
+
+    backend_index = KnowledgeIndex()
+    backend_index.apply_changes([dict(row) for row in rows])
+    stub = StubServer(kb_delay=args.kb_delay, llm_delay=args.llm_delay, kb_entries=rows,
+                      search=lambda question, tags: backend_index.search(question, extracted_tags=tags or None))
+    base_url = await stub.start()
+    tool.API_BASE_URL = base_url
+    tool.OPENAI_BASE_URL = f"{base_url}/v1"
+    tool.OPENAI_API_KEY = "stub"
+    tool.get_kb_cache().invalidate(reason="replay")
+    kb_index._indexes.clear()  # a fresh tenant index, with vectors only for the embeddings source
+    os.environ["KB_EMBEDDINGS"] = str(source == "embeddings").lower()
+    os.environ["KB_EMBEDDINGS_DIR"] = tempfile.mkdtemp(prefix="replay-embeddings-")
+    init_kb_embeddings()
+    if source in ("index", "embeddings"):
+        init_kb_index({"data": rows})
+
+    outcomes = []
+    try:
+        for item in corpus["questions"]:
+            response, latency, tier2 = await asyncio.create_task(_lookup(item["question"]))
+            outcomes.append({**item, "answered": _answered_ids(response, ids_by_pattern), "tier2": tier2,
+                             "confidence": json.loads(response)["confidence_tier"] if response != "not_found" else None,
+                             "cold_ms": latency})
+        for outcome in outcomes:
+            response, latency, _ = await asyncio.create_task(_lookup(outcome["question"]))
+            outcome["warm_ms"] = latency
+            outcome["warm_mismatch"] = _answered_ids(response, ids_by_pattern)[:1] != outcome["answered"][:1]
+    finally:
+        await asyncio.gather(*tool._background_tasks, return_exceptions=True)  # times_used updates
+        await tool.get_http_client().aclose()
+        await stub.stop()
+
+    answerable = [o for o in outcomes if o["expected"]]
+    unanswerable = [o for o in outcomes if not o["expected"]]
+    tier2 = [o for o in outcomes if o["tier2"]]
+    metrics = {
+        f"recall@{k}": sum(bool(set(o["answered"][:k]) & set(o["expected"])) for o in answerable) / len(answerable)
+        for k in RECALL_AT
+    } if answerable else {}
+    metrics.update({
+        "high_confidence@1": sum(bool(o["answered"]) and o["answered"][0] in o["expected"] and o["confidence"] == "high"
+                                 for o in answerable) / len(answerable) if answerable else 0.0,
+        "tier1_escalation": len(tier2) / len(outcomes),
+        "tier2_escalation": sum(not o["answered"] for o in tier2) / len(tier2) if tier2 else 0.0,
+        "wrong_escalation": sum(not o["answered"] for o in answerable) / len(answerable) if answerable else 0.0,
+        "false_match": sum(bool(o["answered"]) for o in unanswerable) / len(unanswerable) if unanswerable else 0.0,
+        "warm_mismatch": sum(o["warm_mismatch"] for o in outcomes) / len(outcomes),
+    })
+    for run in ("cold", "warm"):
+        latencies = [o[f"{run}_ms"] for o in outcomes]
+        metrics[f"{run}_p50_ms"] = _pct(latencies, 0.5)
+        metrics[f"{run}_p95_ms"] = _pct(latencies, 0.95)
+        metrics[f"{run}_max_ms"] = max(latencies)
+    return {name: round(value, 4) for name, value in metrics.items()}, outcomes
+
+
+def regressions(results: dict, baseline: dict, quality_tolerance: float, latency_tolerance: float) -> list[str]:
+    """Gated metrics worse than the baseline beyond tolerance, as printable lines."""
+    found = []
+    for source, metrics in results.items():
+        base = baseline.get("sources", {}).get(source)
+        if base is None:
+            continue
+        for name, higher_is_better in QUALITY_GATES.items():
+            if name not in metrics or name not in base:
+                continue
+            change = metrics[name] - base[name]
+            if (-change if higher_is_better else change) > quality_tolerance + 1e-9:
+                found.append(f"{source} {name}: {base[name]:.3f} -> {metrics[name]:.3f}")
+        for name in LATENCY_GATES:
+            if name not in base:
+                continue
+            if (metrics[name] > base[name] * (1 + latency_tolerance)
+                    and metrics[name] - base[name] > LATENCY_SLACK_MS):
+                found.append(f"{source} {name}: {base[name]:.2f}ms -> {metrics[name]:.2f}ms")
+    return found
+
+
+def over_limits(results: dict, limits: dict[str, float]) -> list[str]:
+    """Metrics above their absolute limit, as printable lines."""
+    return [f"{source} {name}: {metrics[name]:.3f} > {limit:.3f}"
+            for source, metrics in results.items()
+            for name, limit in limits.items()
+            if name in metrics and metrics[name] > limit + 1e-9]
+
+
+def _print_source(source: str, metrics: dict, outcomes: list[dict], verbose: bool) -> None:
+    answered = [o for o in outcomes if o["answered"]]
+    confidence = {c: sum(o["confidence"] == c for o in answered) for c in ("high", "medium", "low")}
+    print(f"== {source}")
+    print("  " + "  ".join(f"recall@{k} {metrics[f'recall@{k}']:.3f}" for k in RECALL_AT if f"recall@{k}" in metrics)
+          + f"  high confidence@1 {metrics['high_confidence@1']:.3f}")
+    print(f"  escalation  tier 1 {metrics['tier1_escalation']:.1%} passed to tag matching, "
+          f"tier 2 {metrics['tier2_escalation']:.1%} of those escalated")
+    print(f"  wrong       escalations {metrics['wrong_escalation']:.1%} of answerable, "
+          f"false matches {metrics['false_match']:.1%} of unanswerable, warm top answer changed {metrics['warm_mismatch']:.1%}")
+    print(f"  answered    {len(answered)}/{len(outcomes)} "
+          f"(high {confidence['high']}, medium {confidence['medium']}, low {confidence['low']})")
+    for run in ("cold", "warm"):
+        print(f"  {run:<11} p50={metrics[f'{run}_p50_ms']:7.2f}ms p95={metrics[f'{run}_p95_ms']:7.2f}ms "
+              f"max={metrics[f'{run}_max_ms']:7.2f}ms")
+    if verbose:
+        for o in outcomes:
+            if o["expected"] and not set(o["answered"]) & set(o["expected"]):
+                print(f"  MISS   {o['question']!r} -> {'escalated' if not o['answered'] else o['answered'][:1]}")
+            elif not o["expected"] and o["answered"]:
+                print(f"  FALSE  {o['question']!r} -> {o['answered'][:1]} ({o['confidence']})")
+    print()
+
+
+async def main(args) -> int:
+    if args.export_corpus:
+        corpus = export_corpus(args.api_base_url, args.tenant)
+        with open(args.export_corpus, "w") as f:
+            json.dump(corpus, f, indent=2)
+        print(f"Wrote {len(corpus['questions'])} questions over {len(corpus['knowledge_base'])} "
+              f"knowledge base entries to {args.export_corpus}")
+        return 0
+
+    if args.corpus:
+        with open(args.corpus) as f:
+            corpus = json.load(f)
+    else:
+        corpus = seed_corpus()
+
+    # Sequential lookups (the default), so tier 2 ran exactly when tag extraction did
+    tool.KB_SPECULATIVE = False
+    os.environ["TAG_EXTRACTOR"] = args.extractor
+    os.environ["TAG_MEMO"] = "false"  # the memo is on disk and would make cold passes warm
+    logging.getLogger("priya-salon-assistant").setLevel(logging.WARNING)
+
+    answerable = sum(bool(q["expected"]) for q in corpus["questions"])
+    print(f"{len(corpus['questions'])} questions ({answerable} answerable) over {len(corpus['knowledge_base'])} "
+          f"knowledge base entries, extractor={args.extractor}, kb_delay={args.kb_delay * 1000:.0f}ms, "
+          f"llm_delay={args.llm_delay * 1000:.0f}ms\n")
+    results = {}
+    for source in args.sources:
+        os.environ["KB_EMBEDDINGS"] = "true"
+        if source == "embeddings" and init_kb_embeddings() is None:
+            print(f"== {source}\n  skipped: embedding model not available\n")
+            continue
+        runs = [await replay(source, corpus, args) for _ in range(args.repeats)]
+        results[source], outcomes = runs[0]
+        for name in results[source]:
+            if name.endswith("_ms"):
+                results[source][name] = round(statistics.median(metrics[name] for metrics, _ in runs), 4)
+        _print_source(source, results[source], outcomes, args.verbose)
+
+    over = over_limits(results, {"wrong_escalation": args.max_wrong_escalation, "false_match": args.max_false_match})
+    for line in over:
+        print(f"OVER LIMIT {line}")
+    if over:
+        print(f"{len(over)} metrics over their limits")
+
+    if not args.baseline:
+        return 1 if over else 0
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"extractor": args.extractor, "kb_delay": args.kb_delay, "llm_delay": args.llm_delay,
+                       "sources": results}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 1 if over else 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    settings = {"extractor": args.extractor, "kb_delay": args.kb_delay, "llm_delay": args.llm_delay}
+    if any(baseline.get(name) != value for name, value in settings.items()):
+        print(f"Note: the baseline was recorded with different settings "
+              f"({', '.join(f'{name}={baseline.get(name)}' for name in settings)})")
+    found = regressions(results, baseline, args.quality_tolerance, args.latency_tolerance)
+    for line in found:
+        print(f"REGRESSION {line}")
+    print(f"{len(found)} regressions against {args.baseline}")
+    return 1 if found or over else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="corpus JSON file (default: built from the seed knowledge base)")
+    parser.add_argument("--export-corpus", metavar="FILE", help="build a corpus from --api-base-url and exit")
+    parser.add_argument("--api-base-url", default="http://localhost:3000")
+    parser.add_argument("--tenant", default=DEFAULT_TENANT.id, help="tenant id or slug to export")
+    parser.add_argument("--sources", nargs="+", default=list(SOURCES), choices=SOURCES)
+    parser.add_argument("--extractor", default="local", choices=("local", "llm", "local+llm"))
+    parser.add_argument("--kb-delay", type=float, default=0.0, help="stub backend search latency (seconds)")
+    parser.add_argument("--llm-delay", type=float, default=0.0, help="stub OpenAI tag extraction latency (seconds)")
+    parser.add_argument("--repeats", type=int, default=3, help="runs per source; latencies are their median")
+    parser.add_argument("--baseline", help="baseline JSON file to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="write --baseline from this run")
+    parser.add_argument("--quality-tolerance", type=float, default=0.0, help="allowed absolute drop in quality rates")
+    parser.add_argument("--latency-tolerance", type=float, default=0.5, help="allowed relative latency increase")
+    parser.add_argument("--max-wrong-escalation", type=float, default=LIMITS["wrong_escalation"],
+                        help="highest allowed share of answerable questions escalated")
+    parser.add_argument("--max-false-match", type=float, default=LIMITS["false_match"],
+                        help="highest allowed share of unanswerable questions given results")
+    parser.add_argument("--verbose", action="store_true", help="list missed and wrongly answered questions")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,86 @@
+"""Seed knowledge base shared with backend/db/seeds/seed.js."""
+import json
+import uuid
+from pathlib import Path
+
+SEED_FILE = Path(__file__).resolve().parents[2] / "backend" / "db" / "seeds" / "knowledge_base.json"
+
+
+def load_seed_kb() -> list[dict]:
+    """Seed entries shaped like knowledge_base rows, with stable generated ids."""
+    entries = json.loads(SEED_FILE.read_text())
+    return [
+        {
+            "id": str(uuid.uuid5(uuid.NAMESPACE_URL, entry["question_pattern"])),
+            "question_pattern": entry["question_pattern"],
+            "answer": entry["answer"],
+            "tags": entry["tags"],
+            "is_active": True,
+            "times_used": 0,
+        }
+        for entry in entries
+    ]
+
+
+# Caller phrasings of seed questions, labelled with the entry that answers them
+LABELED_QUESTIONS = [
+    ("what time do you open", "What are your business hours?"),
+    ("when do you close on saturday", "What are your business hours?"),
+    ("how late are you open today", "What are your business hours?"),
+    ("how much is a haircut", "How much does a haircut cost?"),
+    ("what do you charge for a trim", "How much does a haircut cost?"),
+    ("can I just walk in without booking", "Do you take walk-ins?"),
+    ("do I need an appointment or can I drop by", "Do you take walk-ins?"),
+    ("what kind of treatments do you do", "What services do you offer?"),
+    ("what's on your menu of services", "What services do you offer?"),
+    ("where is the salon", "Where are you located?"),
+    ("what's your address", "Where are you located?"),
+    ("is there parking near you", "Where are you located?"),
+    ("can I schedule online through your website", "Can I book an appointment online?"),
+    ("how do I make a reservation on the internet", "Can I book an appointment online?"),
+    ("what happens if I cancel last minute", "What is your cancellation policy?"),
+    ("is there a fee for a no-show", "What is your cancellation policy?"),
+    ("do you do wedding packages for brides", "Do you offer bridal services?"),
+    ("I'm getting married, can you do my bridal look", "Do you offer bridal services?"),
+    ("what number can I call you on", "What is your phone number?"),
+    ("how can I reach you by telephone", "What is your phone number?"),
+    ("can I email you", "What is your email address?"),
+    ("what's your email", "What is your email address?"),
+    ("how much for party makeup", "How much does makeup cost?"),
+    ("what are your makeup prices", "How much does makeup cost?"),
+    ("do you have anti-aging facials", "What facial treatments do you offer?"),
+    ("I have acne, what skin treatments do you have", "What facial treatments do you offer?"),
+    ("can you shape my eyebrows with thread", "Do you do threading?"),
+    ("do you do brow threading", "Do you do threading?"),
+    ("do you wax legs", "What waxing services do you have?"),
+    ("can I get my upper lip waxed", "What waxing services do you have?"),
+    ("can I get my nails done", "Do you do manicures and nails?"),
+    ("do you do nail art", "Do you do manicures and nails?"),
+    ("do you apply mehndi designs", "Do you offer henna or mehndi?"),
+    ("can I get henna for a function", "Do you offer henna or mehndi?"),
+    ("is there wifi while I wait", "Do you have WiFi or a waiting area?"),
+    ("do you have a lounge to wait in", "Do you have WiFi or a waiting area?"),
+    ("are you closed on monday", "Are you open on Mondays?"),
+    ("can I come in monday", "Are you open on Mondays?"),
+    ("who will cut my hair", "Who are the stylists?"),
+    ("tell me about your team", "Who are the stylists?"),
+    ("how much to dye my hair", "How much does hair coloring cost?"),
+    ("what do highlights cost", "How much does hair coloring cost?"),
+]
+
+# Questions callers escalated in the past (help_requests.question), none of
+# which the seed knowledge base answers
+HISTORICAL_HELP_REQUESTS = [
+    "Do you offer keratin treatments for children under 10?",
+    "Can you do a henna design from a photo I bring in?",
+    "Is there a discount for a bridal party of eight?",
+    "Do you use ammonia-free color for pregnant clients?",
+    "Can I bring my own hair extensions?",
+    "Do you have a stylist who speaks Tamil?",
+    "Can you open early on a Sunday for a wedding?",
+    "Do you treat scalp psoriasis?",
+    "Is the salon wheelchair accessible?",
+    "Can I buy a gift card over the phone?",
+    "Do you do lash lifts for sensitive eyes?",
+    "Can my daughter and I book side-by-side pedicures?",
+]
@@ -0,0 +1,84 @@
+"""
+Concurrency check for single-flight coalescing in tool.py.
+
+N callers ask the same tier-1-miss question at once (slow backend, slow
+OpenAI, KB cache off). They must produce exactly one tier 1 search, one tag
+extraction and one tier 2 search upstream. It then checks that callers
+hanging up mid-flight do not disturb the others. Once every caller has hung
+up, the shared request must be cancelled.
+
+Usage (from livekit-voice-agent/):
+    uv run python -m benchmarks.single_flight_check --callers 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+os.environ["TAG_EXTRACTOR"] = "llm"
+os.environ["TAG_MEMO"] = "false"
+
+import tag_extractor  # noqa: E402
+import tool  # noqa: E402
+from benchmarks.seed_data import load_seed_kb  # noqa: E402
+from benchmarks.stub_server import StubServer  # noqa: E402
+
+QUESTION = "can I leave my car nearby"
+
+
+def _check(name: str, ok: bool, detail: str) -> bool:
+    print(f"{'PASS' if ok else 'FAIL'}  {name}: {detail}")
+    return ok
+
+
+async def main(callers: int) -> int:
+    stub = StubServer(kb_delay=0.2, llm_delay=0.3, kb_entries=load_seed_kb())
+    base_url = await stub.start()
+    tool.API_BASE_URL = base_url
+    tool.OPENAI_BASE_URL = f"{base_url}/v1"
+    tool.OPENAI_API_KEY = "stub"
+    tool.get_kb_cache().max_entries = 0
+    tag_extractor.init_tag_extractor([], tool.extract_query_tags_llm)
+    ok = True
+
+    # 1. N identical concurrent lookups -> one upstream request per leg
+    results = await asyncio.gather(*(tool.check_knowledge_base(QUESTION) for _ in range(callers)))
+    ok &= _check("identical results", len(set(results)) == 1, f"{len(set(results))} distinct responses")
+    ok &= _check("tier 1 + tier 2 searches", stub.counters["kb_search"] == 2, f"{stub.counters['kb_search']} upstream (expected 2)")
+    ok &= _check("tag extractions", stub.counters["tag_extraction"] == 1, f"{stub.counters['tag_extraction']} upstream (expected 1)")
+
+    # 2. Half the callers hang up mid-flight; the rest still get an answer from one request
+    before = dict(stub.counters)
+    tasks = [asyncio.create_task(tool.search_knowledge_base(f"{QUESTION}?")) for _ in range(callers)]
+    await asyncio.sleep(0.05)
+    for task in tasks[: callers // 2]:
+        task.cancel()
+    done = await asyncio.gather(*tasks, return_exceptions=True)
+    survivors = [r for r in done if not isinstance(r, BaseException)]
+    ok &= _check("survivors answered", len(survivors) == callers - callers // 2, f"{len(survivors)} of {callers - callers // 2}")
+    ok &= _check("one search despite hang-ups", stub.counters["kb_search"] - before["kb_search"] == 1,
+                 f"{stub.counters['kb_search'] - before['kb_search']} upstream")
+
+    # 3. Everybody hangs up -> the shared request is cancelled and forgotten
+    abandoned = tool.kb_search_flight.abandoned
+    tasks = [asyncio.create_task(tool.search_knowledge_base("where do I park")) for _ in range(callers)]
+    await asyncio.sleep(0.05)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    ok &= _check("abandoned request cancelled", tool.kb_search_flight.abandoned == abandoned + 1
+                 and "where do i park" not in {k[0] for k in tool.kb_search_flight._calls},
+                 f"abandoned={tool.kb_search_flight.abandoned - abandoned}, in_flight={len(tool.kb_search_flight._calls)}")
+
+    print(f"kb_search: {tool.kb_search_flight.stats()}")
+    print(f"tag_extraction: {tool.tag_extraction_flight.stats()}")
+    await tool.get_http_client().aclose()
+    await stub.stop()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=50)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.callers)))
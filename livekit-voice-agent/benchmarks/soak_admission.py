@@ -0,0 +1,290 @@
+"""
+Multi-process soak test of worker admission (admission.py): reply latency
+and rejected calls as the offered load goes past capacity.
+
+Each simulated worker node is its own OS process running its calls on one
+event loop, like a job process. A call burns CPU for audio every 100ms and
+for each caller turn, which also waits on an in-flight tool/LLM request;
+the reply latency of a turn is end of speech to reply, so it grows with
+event loop lag once the CPUs are oversubscribed. The main process plays
+the LiveKit server: it offers each call to the available worker with the
+lowest reported load (reports every 0.5s), moving on to the next one when
+a worker rejects it, and counts the call as turned away when none takes it.
+
+Admission modes:
+  none       accept everything (LiveKit dev mode: no load threshold)
+  cpu        LiveKit's default: 5s average CPU as the load, full at 0.7
+  admission  AdmissionController.load and .request (sessions, loop lag,
+             in-flight requests, RSS, CPU)
+
+Usage (from livekit-voice-agent/):
+    uv run python -m benchmarks.soak_admission --nodes 3 --max-sessions 10 --step-seconds 20
+"""
+import argparse
+import asyncio
+import logging
+import math
+import multiprocessing as mp
+import random
+import statistics
+import tempfile
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import psutil
+
+from admission import AdmissionController, AdmissionLimits, LoadReporter
+
+MODES = ("none", "cpu", "admission")
+LOAD_INTERVAL = 0.5
+CPU_THRESHOLD = 0.7  # LiveKit's production default load_threshold
+
+
+def burn(ms: float) -> None:
+    end = time.perf_counter() + ms / 1000
+    while time.perf_counter() < end:
+        pass
+
+
+class _JobRequest:
+    def __init__(self, job_id: str) -> None:
+        self.id = job_id
+        self.accepted: bool | None = None
+
+    async def accept(self) -> None:
+        self.accepted = True
+
+    async def reject(self) -> None:
+        self.accepted = False
+
+
+async def _node(node_id: int, conn, mode: str, args) -> None:
+    loop = asyncio.get_running_loop()
+    sessions: dict[str, asyncio.Task] = {}
+    latencies: list[tuple[float, float]] = []
+    in_flight = 0
+
+    limits = AdmissionLimits(max_sessions=args.max_sessions, max_loop_lag_ms=args.max_loop_lag_ms,
+                             load_threshold=args.load_threshold)
+    directory = tempfile.mkdtemp(prefix=f"soak-node{node_id}-")
+    controller = AdmissionController(limits, directory)
+    reporter = LoadReporter(directory, in_flight=lambda: in_flight, interval=LOAD_INTERVAL)
+    reporter.start()
+    cpu_samples: deque[float] = deque(maxlen=int(5 / LOAD_INTERVAL))
+
+    def worker():
+        return SimpleNamespace(active_jobs=[SimpleNamespace(job=SimpleNamespace(id=cid)) for cid in sessions])
+
+    async def session(call_id: str, duration: float) -> None:
+        nonlocal in_flight
+        rng = random.Random(call_id)
+        end = time.time() + duration
+
+        async def audio() -> None:
+            while True:
+                burn(args.frame_cpu_ms)
+                await asyncio.sleep(0.1)
+
+        audio_task = asyncio.create_task(audio())
+        try:
+            while True:
+                await asyncio.sleep(rng.expovariate(1 / args.turn_interval))
+                if time.time() >= end:
+                    break
+                spoke_at = time.time()
+                burn(args.turn_cpu_ms)  # final transcript, turn detector, prompt
+                in_flight += 1
+                try:
+                    await asyncio.sleep(args.io_delay)  # LLM / knowledge base
+                finally:
+                    in_flight -= 1
+                burn(args.turn_cpu_ms / 2)  # first TTS audio
+                latencies.append((spoke_at, time.time() - spoke_at))
+        finally:
+            audio_task.cancel()
+            sessions.pop(call_id, None)
+
+    async def report_load() -> None:
+        while True:
+            if mode == "admission":
+                load = controller.load(worker())
+            elif mode == "cpu":
+                cpu_samples.append(psutil.cpu_percent(None) / 100)
+                load = statistics.fmean(cpu_samples)
+            else:
+                load = 0.0
+            conn.send(("load", node_id, load, len(sessions)))
+            await asyncio.sleep(LOAD_INTERVAL)
+
+    async def offer(call_id: str, duration: float) -> None:
+        request = _JobRequest(call_id)
+        if mode == "admission":
+            await controller.request(request)
+        else:
+            await request.accept()
+        if request.accepted:
+            sessions[call_id] = asyncio.create_task(session(call_id, duration))
+        conn.send(("offer", node_id, call_id, request.accepted))
+
+    messages: asyncio.Queue = asyncio.Queue()
+
+    def on_message() -> None:
+        try:
+            messages.put_nowait(conn.recv())
+        except EOFError:  # the dispatcher went away
+            loop.remove_reader(conn.fileno())
+            messages.put_nowait(("stop",))
+
+    loop.add_reader(conn.fileno(), on_message)
+    reporter_task = asyncio.create_task(report_load())
+    while True:
+        message = await messages.get()
+        if message[0] == "offer":
+            await offer(*message[1:])
+        elif message[0] == "stop":
+            break
+
+    loop.remove_reader(conn.fileno())
+    reporter_task.cancel()
+    for task in list(sessions.values()):
+        task.cancel()
+    await reporter.aclose()
+    conn.send(("latencies", node_id, latencies))
+
+
+def node_main(node_id: int, conn, mode: str, args) -> None:
+    logging.getLogger("priya-salon-assistant").setLevel(logging.ERROR)  # one warning per rejected call
+    asyncio.run(_node(node_id, conn, mode, args))
+
+
+async def dispatcher(mode: str, args) -> list[dict]:
+    """Run every load step against fresh worker processes; one result per step."""
+    ctx = mp.get_context("spawn")
+    conns, processes = [], []
+    for node_id in range(args.nodes):
+        parent, child = ctx.Pipe()
+        process = ctx.Process(target=node_main, args=(node_id, child, mode, args), daemon=True)
+        process.start()
+        conns.append(parent)
+        processes.append(process)
+
+    loop = asyncio.get_running_loop()
+    loads = [0.0] * args.nodes
+    active = [0] * args.nodes
+    answers: dict[str, asyncio.Future] = {}
+    node_latencies: dict[int, list] = {}
+    done = asyncio.Event()
+    threshold = {"none": math.inf, "cpu": CPU_THRESHOLD, "admission": args.load_threshold}[mode]
+
+    def on_message(conn) -> None:
+        try:
+            message = conn.recv()
+        except EOFError:  # the worker exited
+            loop.remove_reader(conn.fileno())
+            return
+        if message[0] == "load":
+            _, node_id, loads[node_id], active[node_id] = message
+        elif message[0] == "offer":
+            _, node_id, call_id, accepted = message
+            answers.pop(call_id).set_result(accepted)
+        elif message[0] == "latencies":
+            loop.remove_reader(conn.fileno())
+            node_latencies[message[1]] = message[2]
+            if len(node_latencies) == args.nodes:
+                done.set()
+
+    for conn in conns:
+        loop.add_reader(conn.fileno(), on_message, conn)
+    await asyncio.sleep(3)  # spawn, imports, first load reports
+
+    capacity = admission_capacity(args)
+    rng = random.Random(args.seed)
+    calls = 0
+
+    async def place_call() -> bool:
+        nonlocal calls
+        calls += 1
+        call_id = f"{mode}-{calls}"
+        for node_id in sorted((n for n in range(args.nodes) if loads[n] < threshold), key=lambda n: loads[n]):
+            answers[call_id] = loop.create_future()
+            conns[node_id].send(("offer", call_id, args.call_duration))
+            if await answers[call_id]:
+                return True
+        return False
+
+    steps = []
+    for multiple in args.steps:
+        concurrency = multiple * capacity
+        rate = concurrency / args.call_duration
+        placed: list[asyncio.Task] = []
+        active_samples = []
+        started = time.time()
+        next_sample = started
+        while time.time() - started < args.step_seconds:
+            await asyncio.sleep(rng.expovariate(rate))
+            placed.append(asyncio.create_task(place_call()))
+            if time.time() >= next_sample:
+                active_samples.append(sum(active))
+                next_sample += 1.0
+        admitted = await asyncio.gather(*placed)
+        steps.append({"multiple": multiple, "offered": concurrency, "started": started, "ended": time.time(),
+                      "calls": len(admitted), "rejected": admitted.count(False),
+                      "active": statistics.fmean(active_samples) if active_samples else 0.0})
+
+    for conn in conns:
+        conn.send(("stop",))
+    await asyncio.wait_for(done.wait(), timeout=30)
+    for process in processes:
+        process.join(timeout=5)
+
+    samples = [sample for latencies in node_latencies.values() for sample in latencies]
+    for step in steps:
+        # Skip the first quarter of each step: calls from the previous step are still winding down
+        warm = step["started"] + (step["ended"] - step["started"]) / 4
+        step["latencies"] = sorted(latency * 1000 for at, latency in samples if warm <= at < step["ended"])
+    return steps
+
+
+def admission_capacity(args) -> int:
+    """Calls the workers hold when each is filled up to the load threshold by sessions alone."""
+    return args.nodes * math.floor(args.load_threshold * args.max_sessions + 1e-9)
+
+
+def _pct(values: list[float], q: float) -> float:
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+async def main(args) -> None:
+    capacity = admission_capacity(args)
+    print(f"{args.nodes} worker processes on {psutil.cpu_count()} CPU(s), admission capacity {capacity} calls "
+          f"({args.max_sessions} max sessions/worker at threshold {args.load_threshold:g}), {args.call_duration:g}s calls, turn every {args.turn_interval:g}s, "
+          f"{args.frame_cpu_ms:g}ms CPU per 100ms audio, {args.turn_cpu_ms:g}ms CPU + "
+          f"{args.io_delay * 1000:.0f}ms I/O per turn\n")
+    for mode in args.modes:
+        print(f"== {mode}")
+        print("  offered   active  turned away   reply p50    p99")
+        for step in await dispatcher(mode, args):
+            values = step["latencies"]
+            print(f"  {step['multiple']:4.2f}x   {step['active']:6.1f}  {step['rejected'] / max(1, step['calls']):10.1%}"
+                  f"  {_pct(values, 0.5):8.0f}ms {_pct(values, 0.99):6.0f}ms  ({len(values)} turns)")
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--max-sessions", type=int, default=10, help="ADMISSION_MAX_SESSIONS per worker")
+    parser.add_argument("--max-loop-lag-ms", type=float, default=100)
+    parser.add_argument("--load-threshold", type=float, default=0.8)
+    parser.add_argument("--steps", type=float, nargs="+", default=[0.5, 1.0, 1.5, 2.0],
+                        help="offered concurrency as multiples of admission capacity")
+    parser.add_argument("--step-seconds", type=float, default=20)
+    parser.add_argument("--call-duration", type=float, default=8)
+    parser.add_argument("--turn-interval", type=float, default=2.0)
+    parser.add_argument("--frame-cpu-ms", type=float, default=1.5)
+    parser.add_argument("--turn-cpu-ms", type=float, default=20)
+    parser.add_argument("--io-delay", type=float, default=0.25)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
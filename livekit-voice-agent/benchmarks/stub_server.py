@@ -0,0 +1,261 @@
+"""
+Local stand-ins for the services the agent tools talk to.
+
+StubServer serves the Node backend routes used by tool.py and the dashboard,
+the /api/events change stream, the OpenAI chat completions route used for tag
+extraction and the LiveKit RoomService DeleteRoom call made by end_call, with
+injectable latency and error rates so benchmarks can run without Postgres,
+OpenAI or LiveKit.
+"""
+import asyncio
+import json
+import random
+import uuid
+from datetime import datetime, timezone
+from typing import Callable
+
+from aiohttp import web
+
+
+class StubServer:
+    def __init__(
+        self,
+        kb_delay: float = 0.0,
+        llm_delay: float = 0.0,
+        help_request_delay: float = 0.0,
+        room_delay: float = 0.0,
+        error_rate: float = 0.0,
+        error_rates: dict[str, float] | None = None,
+        kb_entries: list[dict] | None = None,
+        tenants: list[dict] | None = None,
+        search: Callable[[str, list[str]], list[dict]] | None = None,
+    ) -> None:
+        self.kb_delay = kb_delay
+        self.llm_delay = llm_delay
+        self.help_request_delay = help_request_delay
+        self.room_delay = room_delay
+        self.error_rate = error_rate
+        # Per-route overrides of error_rate, keyed like `counters`
+        self.error_rates = error_rates or {}
+        self.kb_entries = kb_entries or [
+            {
+                "id": str(uuid.uuid4()),
+                "question_pattern": "What are your business hours?",
+                "answer": "We are open Tuesday through Sunday. We are closed on Mondays.",
+                "tags": ["hours", "schedule", "open", "closed"],
+            }
+        ]
+        # Rows as returned by /api/tenants; the first one is the default tenant
+        self.tenants = tenants or []
+        # (question, extracted tags) -> ranked rows for the search routes; defaults to keyword-in-tags
+        # matching, pass KnowledgeIndex.search for the backend's SQL scoring
+        self.search = search or self._search
+        self.counters: dict[str, int] = {"kb_search": 0, "kb_search_batch": 0, "tag_extraction": 0, "help_request": 0,
+                                         "help_request_duplicate": 0, "delete_room": 0, "tenant_resolve": 0,
+                                         "dashboard_query": 0, "event_stream": 0}
+        self.help_requests: list[dict] = []
+        self.kb_version = 1
+        # Open /api/events streams: (topics, queue of (event, data))
+        self._event_streams: list[tuple[set[str], asyncio.Queue]] = []
+        self._runner: web.AppRunner | None = None
+        self.base_url = ""
+
+    def _fail(self, route: str) -> bool:
+        rate = self.error_rates.get(route, self.error_rate)
+        return rate > 0 and random.random() < rate
+
+    async def _kb_search(self, request: web.Request) -> web.Response:
+        self.counters["kb_search"] += 1
+        await asyncio.sleep(self.kb_delay)
+        if self._fail("kb_search"):
+            return web.json_response({"success": False, "error": "injected failure"}, status=500)
+
+        tags = [t for t in request.query.get("extracted_tags", "").split(",") if t]
+        results = self.search(request.query.get("q", ""), tags)
+        return web.json_response({
+            "success": True,
+            "found": bool(results),
+            "count": len(results),
+            "data": results[:5],
+        })
+
+    async def _kb_search_batch(self, request: web.Request) -> web.Response:
+        self.counters["kb_search_batch"] += 1
+        await asyncio.sleep(self.kb_delay)
+        if self._fail("kb_search"):
+            return web.json_response({"success": False, "error": "injected failure"}, status=500)
+
+        queries = (await request.json())["queries"]
+        data = []
+        for item in queries:
+            results = self.search(item["q"], item.get("extracted_tags") or [])
+            data.append({"q": item["q"], "found": bool(results), "count": len(results[:5]), "data": results[:5]})
+        return web.json_response({"success": True, "count": len(data), "data": data})
+
+    def _search(self, question: str, tags: list[str]) -> list[dict]:
+        words = set(question.lower().replace("?", "").split())
+        results = []
+        for entry in self.kb_entries:
+            overlap = len(set(entry["tags"]) & set(tags))
+            if overlap:
+                score = min(0.9, 0.7 + overlap * 0.05)
+            elif words & set(entry["tags"]):
+                score = 0.85
+            else:
+                continue
+            results.append({**entry, "similarity_score": score, "exact_tag_match": overlap == 0})
+        results.sort(key=lambda r: r["similarity_score"], reverse=True)
+        return results
+
+    async def _kb_version(self, request: web.Request) -> web.Response:
+        return web.json_response({"success": True, "data": {"version": str(self.kb_version)}})
+
+    async def _kb_sync(self, request: web.Request) -> web.Response:
+        # Full snapshot whatever `since` is: enough for the loaders, which upsert by id
+        return web.json_response({"success": True, "count": len(self.kb_entries), "data": self.kb_entries,
+                                  "server_time": datetime.now(timezone.utc).isoformat()})
+
+    async def _tenant_resolve(self, request: web.Request) -> web.Response:
+        self.counters["tenant_resolve"] += 1
+        await asyncio.sleep(self.kb_delay)
+        tenant_id, phone = request.query.get("tenant_id"), request.query.get("phone")
+        for tenant in self.tenants:
+            if tenant_id in (tenant["id"], tenant["slug"]) or (phone and phone in tenant["phone_numbers"]):
+                return web.json_response({"success": True, "data": tenant})
+        if not self.tenants:
+            return web.json_response({"success": False, "error": "No tenant found"}, status=404)
+        return web.json_response({"success": True, "data": self.tenants[0]})
+
+    async def _dashboard_query(self, data) -> web.Response:
+        # Each dashboard route runs one SQL query in the Node services
+        self.counters["dashboard_query"] += 1
+        await asyncio.sleep(self.kb_delay)
+        return web.json_response({"success": True, "data": data})
+
+    async def _help_request_list(self, request: web.Request) -> web.Response:
+        status = request.query.get("status")
+        return await self._dashboard_query([r for r in self.help_requests if status in (None, r["status"])])
+
+    async def _help_request_stats(self, request: web.Request) -> web.Response:
+        statuses = [r["status"] for r in self.help_requests]
+        return await self._dashboard_query({s + "_count": statuses.count(s) for s in ("pending", "resolved", "unresolved")})
+
+    async def _help_request_get(self, request: web.Request) -> web.Response:
+        for record in self.help_requests:
+            if record["id"] == request.match_info["id"]:
+                return await self._dashboard_query(record)
+        return web.json_response({"success": False, "error": "Help request not found"}, status=404)
+
+    async def _kb_list(self, request: web.Request) -> web.Response:
+        return await self._dashboard_query(self.kb_entries)
+
+    async def _kb_stats(self, request: web.Request) -> web.Response:
+        return await self._dashboard_query({"active_count": len(self.kb_entries)})
+
+    def publish(self, table: str, change: dict) -> None:
+        """Push a change to the open /api/events streams of `table`, as a committed NOTIFY would."""
+        for topics, queue in self._event_streams:
+            if table in topics:
+                queue.put_nowait((table, {"table": table, **change}))
+
+    async def _events(self, request: web.Request) -> web.StreamResponse:
+        self.counters["event_stream"] += 1
+        topics = set(request.query.get("topics", "help_requests,knowledge_base").split(","))
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        stream = (topics, asyncio.Queue())
+        self._event_streams.append(stream)
+        try:
+            await response.write(b"retry: 3000\n\n")
+            item = ("ready", {"topics": sorted(topics)})
+            while item is not None:  # None: server stopping
+                event, data = item
+                await response.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode())
+                item = await stream[1].get()
+        finally:
+            self._event_streams.remove(stream)
+        return response
+
+    def _store_help_request(self, body: dict) -> dict:
+        # Same (call_id, question) idempotency as helpRequest.service.js
+        for record in self.help_requests:
+            if body.get("call_id") and record["call_id"] == body["call_id"] and record["question"] == body["question"]:
+                self.counters["help_request_duplicate"] += 1
+                return record
+        record = {"id": str(uuid.uuid4()), "status": "pending", **body}
+        self.help_requests.append(record)
+        return record
+
+    async def _help_request(self, request: web.Request) -> web.Response:
+        self.counters["help_request"] += 1
+        body = await request.json()
+        await asyncio.sleep(self.help_request_delay)
+        if self._fail("help_request"):
+            return web.json_response({"success": False, "error": "injected failure"}, status=500)
+
+        return web.json_response({"success": True, "data": self._store_help_request(body)}, status=201)
+
+    async def _help_request_batch(self, request: web.Request) -> web.Response:
+        self.counters["help_request"] += 1
+        body = await request.json()
+        await asyncio.sleep(self.help_request_delay)
+        if self._fail("help_request"):
+            return web.json_response({"success": False, "error": "injected failure"}, status=500)
+
+        records = [self._store_help_request(r) for r in body["requests"]]
+        return web.json_response({"success": True, "count": len(records), "data": records}, status=201)
+
+    async def _chat_completions(self, request: web.Request) -> web.Response:
+        self.counters["tag_extraction"] += 1
+        body = await request.json()
+        await asyncio.sleep(self.llm_delay)
+        if self._fail("tag_extraction"):
+            return web.json_response({"error": {"message": "injected failure"}}, status=500)
+
+        question = body["messages"][-1]["content"].lower()
+        tags = [t for entry in self.kb_entries for t in entry["tags"] if t in question] or ["services"]
+        return web.json_response({
+            "choices": [{"message": {"role": "assistant", "content": json.dumps(tags[:6])}}]
+        })
+
+    async def _delete_room(self, request: web.Request) -> web.Response:
+        # Twirp endpoint used by livekit.api.LiveKitAPI().room.delete_room
+        self.counters["delete_room"] += 1
+        await request.read()
+        await asyncio.sleep(self.room_delay)
+        if self._fail("delete_room"):
+            return web.json_response({"code": "internal", "msg": "injected failure"}, status=500)
+        return web.Response(body=b"", content_type="application/protobuf")
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_get("/api/knowledge-base/search", self._kb_search)
+        app.router.add_post("/api/knowledge-base/search/batch", self._kb_search_batch)
+        app.router.add_get("/api/knowledge-base/version", self._kb_version)
+        app.router.add_get("/api/knowledge-base/sync", self._kb_sync)
+        app.router.add_get("/api/tenants/resolve", self._tenant_resolve)
+        app.router.add_post("/api/help-requests", self._help_request)
+        app.router.add_get("/api/help-requests", self._help_request_list)
+        app.router.add_get("/api/help-requests/stats", self._help_request_stats)
+        app.router.add_get("/api/help-requests/{id}", self._help_request_get)
+        app.router.add_get("/api/knowledge-base", self._kb_list)
+        app.router.add_get("/api/knowledge-base/stats", self._kb_stats)
+        app.router.add_get("/api/events", self._events)
+        app.router.add_post("/api/help-requests/batch", self._help_request_batch)
+        app.router.add_post("/v1/chat/completions", self._chat_completions)
+        app.router.add_post("/twirp/livekit.RoomService/DeleteRoom", self._delete_room)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{bound_port}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        for _, queue in self._event_streams:
+            queue.put_nowait(None)
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
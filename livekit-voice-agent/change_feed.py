@@ -0,0 +1,180 @@
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable
+
+import httpx
+
+from tenant import tenant_headers
+
+logger = logging.getLogger("priya-salon-assistant")
+
+# Subscribe to the backend's change stream (GET /api/events); version polling and delta sync stay as the fallback
+CHANGE_FEED = os.getenv("CHANGE_FEED", "true").lower() in ("1", "true", "yes")
+
+# Called with (event, data) for every event of a tenant's stream
+ChangeHandler = Callable[[str, dict], None]
+
+
+async def iter_sse(lines: AsyncIterator[str]) -> AsyncIterator[tuple[str, dict]]:
+    """Parse server-sent event lines into (event, data) pairs. Comments (heartbeats) and data-less blocks are skipped."""
+    event, data = "message", []
+    async for line in lines:
+        if not line:
+            if data:
+                try:
+                    payload = json.loads("\n".join(data))
+                except ValueError:
+                    payload = {}
+                yield event, payload
+            event, data = "message", []
+        elif not line.startswith(":"):
+            name, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if name == "event":
+                event = value
+            elif name == "data":
+                data.append(value)
+
+
+@dataclass
+class _TenantStream:
+    task: asyncio.Task
+    handlers: set = field(default_factory=set)
+
+
+class ChangeFeed:
+    """
+    The backend's push channel of knowledge base and help request changes,
+    one stream per tenant this worker has served.
+
+    A tenant's stream opens with its first call and stays open between
+    calls (up to `max_tenants`, least recently used first out, never one
+    with a live call), so its KB cache survives from call to call and is
+    dropped only when the knowledge base actually changes. Every change,
+    and every (re)connect since changes may have been missed meanwhile,
+    calls `on_kb_change(tenant_id)`. Calls add handlers to hear about their
+    own help requests being answered.
+
+    Streams use their own HTTP client: they are long-lived, must not hold
+    connections of the shared pool, and outlive the jobs that close it.
+    """
+
+    def __init__(
+        self,
+        api_base_url: str,
+        on_kb_change: Callable[[str], None],
+        max_tenants: int = 64,
+        read_timeout: float = 45.0,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+    ) -> None:
+        self.api_base_url = api_base_url
+        self.on_kb_change = on_kb_change
+        self.max_tenants = max_tenants
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.events = 0
+        self.kb_changes = 0
+        self.reconnects = 0
+        self.tenant_evictions = 0
+        # Heartbeats arrive every 15s, so a read timeout means the stream is dead
+        self._client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=read_timeout))
+        self._streams: OrderedDict[str, _TenantStream] = OrderedDict()
+
+    def subscribe(self, tenant_id: str, on_change: ChangeHandler | None = None) -> Callable[[], None]:
+        """Make sure the tenant's stream is open and add `on_change`; returns a function removing it."""
+        stream = self._streams.get(tenant_id)
+        if stream is None or stream.task.done():
+            stream = _TenantStream(task=asyncio.create_task(self._run(tenant_id)))
+            self._streams[tenant_id] = stream
+        self._streams.move_to_end(tenant_id)
+        if on_change is not None:
+            stream.handlers.add(on_change)
+        self._evict()
+
+        def unsubscribe() -> None:
+            stream.handlers.discard(on_change)
+
+        return unsubscribe
+
+    def _evict(self) -> None:
+        idle = [tenant_id for tenant_id, stream in self._streams.items() if not stream.handlers]
+        for tenant_id in idle[:max(0, len(self._streams) - self.max_tenants)]:
+            self._streams.pop(tenant_id).task.cancel()
+            self.tenant_evictions += 1
+
+    async def _run(self, tenant_id: str) -> None:
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with self._client.stream(
+                    "GET", f"{self.api_base_url}/api/events", headers=tenant_headers(tenant_id)
+                ) as response:
+                    response.raise_for_status()
+                    async for event, data in iter_sse(response.aiter_lines()):
+                        delay = self.reconnect_delay
+                        self._dispatch(tenant_id, event, data)
+                logger.info(f"[Change Feed] Stream for tenant {tenant_id} ended")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[Change Feed] Stream for tenant {tenant_id} failed: {e}")
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _dispatch(self, tenant_id: str, event: str, data: dict) -> None:
+        self.events += 1
+        if event in ("ready", "resync", "knowledge_base"):
+            self.kb_changes += 1
+            try:
+                self.on_kb_change(tenant_id)
+            except Exception as e:
+                logger.warning(f"[Change Feed] Applying knowledge base change for tenant {tenant_id} failed: {e}")
+
+        stream = self._streams.get(tenant_id)
+        for handler in list(stream.handlers) if stream else ():
+            try:
+                handler(event, data)
+            except Exception as e:
+                logger.warning(f"[Change Feed] Handler for {event} failed: {e}")
+
+    async def aclose(self) -> None:
+        streams = list(self._streams.values())
+        self._streams.clear()
+        for stream in streams:
+            stream.task.cancel()
+        await asyncio.gather(*(s.task for s in streams), return_exceptions=True)
+        await self._client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "tenants": len(self._streams),
+            "events": self.events,
+            "kb_changes": self.kb_changes,
+            "reconnects": self.reconnects,
+            "tenant_evictions": self.tenant_evictions,
+        }
+
+
+_feed: ChangeFeed | None = None
+
+
+def init_change_feed(api_base_url: str, on_kb_change: Callable[[str], None]) -> ChangeFeed:
+    """Create the process-wide feed. Called from `prewarm`."""
+    global _feed
+    _feed = ChangeFeed(
+        api_base_url,
+        on_kb_change,
+        max_tenants=int(os.getenv("CHANGE_FEED_MAX_TENANTS", "64")),
+        read_timeout=float(os.getenv("CHANGE_FEED_READ_TIMEOUT", "45")),
+    )
+    return _feed
+
+
+def get_change_feed() -> ChangeFeed | None:
+    return _feed
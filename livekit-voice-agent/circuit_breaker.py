@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+from tracing import PROMETHEUS_RENDERERS
+
+logger = logging.getLogger("priya-salon-assistant")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Per-dependency circuit breaker over a rolling time window.
+
+    The breaker opens when, over the last `window` seconds and at least
+    `min_requests` calls, the share of failed calls reaches
+    `error_threshold` or the share of calls slower than `slow_call_seconds`
+    reaches `slow_call_threshold`. While open, calls fail immediately with
+    CircuitOpenError. After `open_seconds` a single probe call is let through
+    (half-open): success closes the breaker, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: float = 30.0,
+        min_requests: int = 5,
+        error_threshold: float = 0.5,
+        slow_call_seconds: float = 2.0,
+        slow_call_threshold: float = 0.8,
+        open_seconds: float = 10.0,
+    ) -> None:
+        self.name = name
+        self.window = window
+        self.min_requests = min_requests
+        self.error_threshold = error_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_threshold = slow_call_threshold
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.successes = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejected = 0
+        self.transitions = 0
+        self._calls: deque[tuple[float, bool, bool]] = deque()  # (finished at, failed, slow)
+        self._probe_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN and time.monotonic() - self.opened_at < self.open_seconds
+
+    def _transition(self, state: str, reason: str) -> None:
+        if state == self.state:
+            return
+        log = logger.warning if state == OPEN else logger.info
+        log(f"[Breaker] {self.name}: {self.state} -> {state} ({reason})")
+        self.state = state
+        self.transitions += 1
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        if state == CLOSED:
+            self._calls.clear()
+
+    def _allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                return False
+            self._transition(HALF_OPEN, f"probing after {self.open_seconds:.0f}s")
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def _record(self, failed: bool, elapsed: float, probe: bool) -> None:
+        now = time.monotonic()
+        slow = elapsed >= self.slow_call_seconds
+        self.failures += failed
+        self.successes += not failed
+        self.slow_calls += slow
+
+        if probe:
+            self._probe_in_flight = False
+            if failed or slow:
+                self._transition(OPEN, "probe failed" if failed else f"probe took {elapsed:.1f}s")
+            else:
+                self._transition(CLOSED, "probe succeeded")
+            return
+
+        self._calls.append((now, failed, slow))
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+        if self.state != CLOSED or len(self._calls) < self.min_requests:
+            return
+
+        error_rate = sum(f for _, f, _ in self._calls) / len(self._calls)
+        slow_rate = sum(s for _, _, s in self._calls) / len(self._calls)
+        if error_rate >= self.error_threshold:
+            self._transition(OPEN, f"{error_rate:.0%} errors over {len(self._calls)} calls")
+        elif slow_rate >= self.slow_call_threshold:
+            self._transition(OPEN, f"{slow_rate:.0%} calls slower than {self.slow_call_seconds:.1f}s")
+
+    async def call(self, fn: Callable[[], Awaitable[Any]], is_failure: Callable[[Any], bool] | None = None) -> Any:
+        """
+        Run `fn()` through the breaker. Exceptions count as failures, and so
+        do results for which `is_failure(result)` is true (e.g. HTTP 5xx).
+        """
+        if not self._allow():
+            self.rejected += 1
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+        probe = self.state == HALF_OPEN
+        start = time.monotonic()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            if probe:
+                self._probe_in_flight = False
+            raise
+        except Exception:
+            self._record(True, time.monotonic() - start, probe)
+            raise
+        self._record(bool(is_failure and is_failure(result)), time.monotonic() - start, probe)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "state": OPEN if self.is_open else (HALF_OPEN if self.state != CLOSED else CLOSED),
+            "successes": self.successes,
+            "failures": self.failures,
+            "slow_calls": self.slow_calls,
+            "rejected": self.rejected,
+            "transitions": self.transitions,
+        }
+
+
+def _breaker_from_env(name: str) -> CircuitBreaker:
+    return CircuitBreaker(
+        name,
+        window=float(os.getenv("BREAKER_WINDOW_SECONDS", "30")),
+        min_requests=int(os.getenv("BREAKER_MIN_REQUESTS", "5")),
+        error_threshold=float(os.getenv("BREAKER_ERROR_THRESHOLD", "0.5")),
+        slow_call_seconds=float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "2.0")),
+        slow_call_threshold=float(os.getenv("BREAKER_SLOW_CALL_THRESHOLD", "0.8")),
+        open_seconds=float(os.getenv("BREAKER_OPEN_SECONDS", "10")),
+    )
+
+
+# One breaker per upstream dependency, shared by every job in the process
+backend_breaker = _breaker_from_env("backend")
+openai_breaker = _breaker_from_env("openai")
+BREAKERS = (backend_breaker, openai_breaker)
+
+
+def render_prometheus() -> str:
+    lines = [
+        "# HELP priya_circuit_breaker_state Circuit breaker state (0 closed, 1 half-open, 2 open)",
+        "# TYPE priya_circuit_breaker_state gauge",
+    ]
+    for breaker in BREAKERS:
+        stats = breaker.stats()
+        lines.append(f'priya_circuit_breaker_state{{dependency="{breaker.name}"}} {_STATE_CODES[stats["state"]]}')
+    lines += [
+        "# HELP priya_circuit_breaker_calls_total Calls seen by each circuit breaker, by outcome",
+        "# TYPE priya_circuit_breaker_calls_total counter",
+    ]
+    for breaker in BREAKERS:
+        for outcome in ("successes", "failures", "slow_calls", "rejected"):
+            lines.append(f'priya_circuit_breaker_calls_total{{dependency="{breaker.name}",outcome="{outcome}"}} {getattr(breaker, outcome)}')
+    return "\n".join(lines) + "\n"
+
+
+PROMETHEUS_RENDERERS.append(render_prometheus)
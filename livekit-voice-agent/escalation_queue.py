@@ -0,0 +1,391 @@
+import asyncio
+import glob
+import hashlib
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Awaitable, Callable
+
+logger = logging.getLogger("priya-salon-assistant")
+
+
+class PermanentDeliveryError(Exception):
+    """The backend rejected the batch (4xx); retrying it unchanged will not help."""
+
+
+@dataclass
+class Escalation:
+    customer_phone: str
+    question: str
+    call_id: str
+    tenant_id: str | None = None
+    key: str = ""
+    enqueued_at: float = field(default_factory=time.time)
+    attempts: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.key:
+            self.key = escalation_key(self.call_id, self.question)
+
+    def payload(self) -> dict:
+        payload = {"customer_phone": self.customer_phone, "question": self.question, "call_id": self.call_id}
+        if self.tenant_id:
+            payload["tenant_id"] = self.tenant_id
+        return payload
+
+
+def validation_error(customer_phone: str, question: str, call_id: str) -> str | None:
+    """What is wrong with an escalation (the backend needs phone and question, dedup needs call_id), or None."""
+    missing = [name for name, value in (("customer_phone", customer_phone), ("question", question), ("call_id", call_id))
+               if not isinstance(value, str) or not value.strip()]
+    return f"missing {', '.join(missing)}" if missing else None
+
+
+def escalation_key(call_id: str, question: str) -> str:
+    return hashlib.sha1(f"{call_id}\n{question.strip()}".encode()).hexdigest()[:16]
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Spool:
+    """
+    Append-only JSONL journal of `add` and `done` records, one file per
+    worker process. Each `add` is fsynced before the tool returns, so an
+    escalation survives the process being killed. Spools left behind by dead
+    processes are adopted by the next process that starts.
+
+    Escalations the backend rejects are appended to a shared
+    `dead-letter.jsonl` with the rejection, for someone to look at, rather
+    than being retried forever or lost.
+    """
+
+    def __init__(self, directory: str, compact_after: int = 200) -> None:
+        self.directory = directory
+        self.path = os.path.join(directory, f"escalations-{os.getpid()}.jsonl")
+        self.dead_letter_path = os.path.join(directory, "dead-letter.jsonl")
+        self.compact_after = compact_after
+        self._done_since_compact = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def replay(path: str) -> "OrderedDict[str, dict]":
+        pending: OrderedDict[str, dict] = OrderedDict()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn final line from a crash mid-write
+                if record.get("op") == "add":
+                    pending[record["key"]] = record["item"]
+                elif record.get("op") == "done":
+                    pending.pop(record["key"], None)
+        return pending
+
+    def recover(self) -> list[Escalation]:
+        """Replay this process's spool plus any orphaned ones, and rewrite them as ours."""
+        pending: OrderedDict[str, dict] = OrderedDict()
+        adopted = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "escalations-*.jsonl"))):
+            try:
+                pid = int(os.path.basename(path)[len("escalations-"):-len(".jsonl")])
+            except ValueError:
+                continue
+            if path != self.path and _pid_alive(pid):
+                continue
+            claimed = f"{path}.{os.getpid()}.claim"
+            try:
+                os.rename(path, claimed)  # atomic: only one process adopts a given orphan
+            except FileNotFoundError:
+                continue
+            pending.update(self.replay(claimed))
+            adopted.append(claimed)
+
+        items = [Escalation(**item) for item in pending.values()]
+        self.rewrite(items)
+        for claimed in adopted:
+            os.remove(claimed)
+        return items
+
+    def _append(self, records: list[dict], path: str | None = None) -> None:
+        with open(path or self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r) + "\n" for r in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def add(self, item: Escalation) -> None:
+        self._append([{"op": "add", "key": item.key, "item": asdict(item)}])
+
+    def done(self, keys: list[str]) -> None:
+        self._append([{"op": "done", "key": key} for key in keys])
+        self._done_since_compact += len(keys)
+
+    def dead_letter(self, item: Escalation, reason: str) -> None:
+        self._append([{"item": asdict(item), "reason": reason, "at": time.time()}], self.dead_letter_path)
+
+    def needs_compaction(self) -> bool:
+        return self._done_since_compact >= self.compact_after
+
+    def rewrite(self, items: list[Escalation]) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("".join(json.dumps({"op": "add", "key": i.key, "item": asdict(i)}) + "\n" for i in items))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._done_since_compact = 0
+
+
+class EscalationQueue:
+    """
+    Background delivery of help requests so `create_help_request` never waits
+    on the backend.
+
+    Escalations are journaled to the spool, deduplicated on (call_id,
+    question) and delivered by a single worker task in batches of up to
+    `batch_size` escalations of one tenant (the backend scopes a batch by
+    its X-Tenant-Id header), retrying with capped exponential backoff and jitter. At most
+    `max_in_memory` escalations are held in memory; the rest wait in the
+    spool and are reloaded as the queue drains.
+
+    A rejected batch is not dropped: its escalations are sent again one at a
+    time, so only the ones the backend rejects on their own are
+    dead-lettered.
+    """
+
+    def __init__(
+        self,
+        spool: Spool,
+        max_in_memory: int = 1000,
+        batch_size: int = 20,
+        base_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+    ) -> None:
+        self.spool = spool
+        self.max_in_memory = max_in_memory
+        self.batch_size = batch_size
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.enqueued = 0
+        self.delivered = 0
+        self.deduplicated = 0
+        self.retries = 0
+        self.dead_lettered = 0
+        self.batches = 0
+        self._latencies: list[float] = []
+        self._pending: OrderedDict[str, Escalation] = OrderedDict()
+        self._spilled: set[str] = set()
+        self._recent: OrderedDict[str, None] = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._worker: asyncio.Task | None = None
+        self._one_by_one = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending) + len(self._spilled)
+
+    def _remember_delivered(self, key: str) -> None:
+        self._recent[key] = None
+        while len(self._recent) > 4 * self.max_in_memory:
+            self._recent.popitem(last=False)
+
+    def _hold(self, item: Escalation) -> None:
+        if len(self._pending) < self.max_in_memory:
+            self._pending[item.key] = item
+        else:
+            self._spilled.add(item.key)
+
+    def recover(self) -> int:
+        items = self.spool.recover()
+        for item in items:
+            self._hold(item)
+        if items:
+            logger.info(f"[Escalations] Recovered {len(items)} undelivered escalations from spool")
+            self._idle.clear()
+            self._wakeup.set()
+        return len(items)
+
+    async def enqueue(self, customer_phone: str, question: str, call_id: str, tenant_id: str | None = None) -> str:
+        """
+        Journal the escalation and return its key; delivery happens in the
+        background. Raises ValueError for an escalation the backend would
+        reject, so the caller hears about it instead of it failing later.
+        """
+        error = validation_error(customer_phone, question, call_id)
+        if error:
+            raise ValueError(f"Invalid escalation: {error}")
+        item = Escalation(customer_phone=customer_phone, question=question, call_id=call_id, tenant_id=tenant_id)
+        if item.key in self._pending or item.key in self._spilled or item.key in self._recent:
+            self.deduplicated += 1
+            return item.key
+
+        await asyncio.to_thread(self.spool.add, item)
+        self._hold(item)
+        self.enqueued += 1
+        self._idle.clear()
+        self._wakeup.set()
+        return item.key
+
+    def _refill(self) -> None:
+        if not self._spilled or len(self._pending) >= self.max_in_memory:
+            return
+        for item in self.spool.replay(self.spool.path).values():
+            if item["key"] in self._spilled and len(self._pending) < self.max_in_memory:
+                self._spilled.discard(item["key"])
+                self._pending[item["key"]] = Escalation(**item)
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def start(self, send_batch: Callable[[list[dict]], Awaitable[None]]) -> None:
+        """
+        Start the delivery worker. `send_batch` posts a list of help request
+        payloads, all of one tenant, raising PermanentDeliveryError when the backend rejects them
+        and anything else on a retryable failure. Only one worker runs per
+        process.
+        """
+        if self._worker is not None and not self._worker.done():
+            return
+        self._worker = asyncio.create_task(self._run(send_batch))
+
+    async def _run(self, send_batch) -> None:
+        while True:
+            if not self._pending:
+                self._refill()
+            if not self._pending:
+                self._idle.set()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            batch = self._next_batch(1 if self._one_by_one else self.batch_size)
+            try:
+                await send_batch([item.payload() for item in batch])
+            except PermanentDeliveryError as e:
+                if len(batch) > 1:
+                    # One bad escalation fails the whole batch: find it by sending them singly
+                    logger.warning(f"[Escalations] Backend rejected a batch of {len(batch)}, "
+                                   f"delivering them one at a time: {e}")
+                    self._one_by_one = len(batch)
+                    continue
+                logger.error(f"[Escalations] Backend rejected escalation {batch[0].key}, "
+                             f"dead-lettered to {self.spool.dead_letter_path}: {e}")
+                self.dead_lettered += 1
+                await asyncio.to_thread(self.spool.dead_letter, batch[0], str(e))
+                await self._complete(batch, delivered=False)
+            except Exception as e:
+                attempts = max(item.attempts for item in batch) + 1
+                for item in batch:
+                    item.attempts += 1
+                self.retries += 1
+                delay = self._backoff(attempts)
+                logger.warning(f"[Escalations] Delivery of {len(batch)} failed (attempt {attempts}), retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+            else:
+                self.batches += 1
+                await self._complete(batch, delivered=True)
+
+    def _next_batch(self, size: int) -> list[Escalation]:
+        """The oldest pending escalations of the oldest one's tenant, at most `size`."""
+        tenant_id = next(iter(self._pending.values())).tenant_id
+        batch = []
+        for item in self._pending.values():
+            if item.tenant_id == tenant_id:
+                batch.append(item)
+                if len(batch) == size:
+                    break
+        return batch
+
+    async def _complete(self, batch: list[Escalation], delivered: bool) -> None:
+        self._one_by_one = max(0, self._one_by_one - len(batch))
+        keys = [item.key for item in batch]
+        now = time.time()
+        for item in batch:
+            self._pending.pop(item.key, None)
+            self._remember_delivered(item.key)
+            if delivered:
+                self.delivered += 1
+                self._latencies.append(now - item.enqueued_at)
+        self._latencies = self._latencies[-1000:]
+        await asyncio.to_thread(self.spool.done, keys)
+        if self.spool.needs_compaction() and not self._spilled:
+            await asyncio.to_thread(self.spool.rewrite, list(self._pending.values()))
+
+    async def drain(self, timeout: float = 5.0) -> bool:
+        """Wait up to `timeout` seconds for the queue to empty. Undelivered items stay spooled."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"[Escalations] {self.depth} escalations still pending, left in {self.spool.path}")
+            return False
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+
+        def pct(p: float) -> float | None:
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else None
+
+        oldest = min((item.enqueued_at for item in self._pending.values()), default=None)
+        return {
+            "depth": self.depth,
+            "in_memory": len(self._pending),
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "deduplicated": self.deduplicated,
+            "dead_lettered": self.dead_lettered,
+            "retries": self.retries,
+            "batches": self.batches,
+            "delivery_p50_ms": pct(0.5),
+            "delivery_p95_ms": pct(0.95),
+            "oldest_pending_s": round(time.time() - oldest, 1) if oldest else None,
+        }
+
+
+_queue: EscalationQueue | None = None
+
+
+def init_escalation_queue() -> EscalationQueue:
+    """
+    Create the process-wide queue from ESCALATION_* env vars and replay any
+    spooled escalations. Called from `prewarm`.
+    """
+    global _queue
+    spool_dir = os.getenv("ESCALATION_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "priya_escalations"))
+    _queue = EscalationQueue(
+        Spool(spool_dir),
+        max_in_memory=int(os.getenv("ESCALATION_MAX_IN_MEMORY", "1000")),
+        batch_size=int(os.getenv("ESCALATION_BATCH_SIZE", "20")),
+        max_backoff=float(os.getenv("ESCALATION_MAX_BACKOFF", "30")),
+    )
+    _queue.recover()
+    return _queue
+
+
+def get_escalation_queue() -> EscalationQueue | None:
+    return _queue
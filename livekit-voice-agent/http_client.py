@@ -0,0 +1,152 @@
+import logging
+import os
+from dataclasses import dataclass
+
+import httpx
+
+logger = logging.getLogger("priya-salon-assistant")
+
+# Endpoint names used to pick a per-endpoint timeout
+KB_SEARCH = "kb_search"
+TAG_EXTRACTION = "tag_extraction"
+HELP_REQUEST = "help_request"
+TRACE_EXPORT = "trace_export"
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        logger.warning(f"Invalid value for {name}, using default {default}")
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        logger.warning(f"Invalid value for {name}, using default {default}")
+        return default
+
+
+@dataclass(frozen=True)
+class HttpClientConfig:
+    """
+    Connection pool limits and per-endpoint timeouts for the shared HTTP client.
+    All values can be overridden with HTTP_* environment variables.
+    """
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 2.0
+    kb_search_timeout: float = 5.0
+    tag_extraction_timeout: float = 5.0
+    help_request_timeout: float = 10.0
+
+    @classmethod
+    def from_env(cls) -> "HttpClientConfig":
+        return cls(
+            max_connections=_env_int("HTTP_MAX_CONNECTIONS", cls.max_connections),
+            max_keepalive_connections=_env_int("HTTP_MAX_KEEPALIVE_CONNECTIONS", cls.max_keepalive_connections),
+            keepalive_expiry=_env_float("HTTP_KEEPALIVE_EXPIRY", cls.keepalive_expiry),
+            connect_timeout=_env_float("HTTP_CONNECT_TIMEOUT", cls.connect_timeout),
+            kb_search_timeout=_env_float("HTTP_KB_SEARCH_TIMEOUT", cls.kb_search_timeout),
+            tag_extraction_timeout=_env_float("HTTP_TAG_EXTRACTION_TIMEOUT", cls.tag_extraction_timeout),
+            help_request_timeout=_env_float("HTTP_HELP_REQUEST_TIMEOUT", cls.help_request_timeout),
+        )
+
+    def timeout_for(self, endpoint: str) -> httpx.Timeout:
+        total = {
+            KB_SEARCH: self.kb_search_timeout,
+            TAG_EXTRACTION: self.tag_extraction_timeout,
+            HELP_REQUEST: self.help_request_timeout,
+        }.get(endpoint, self.kb_search_timeout)
+        return httpx.Timeout(total, connect=min(self.connect_timeout, total))
+
+
+class SharedHttpClient:
+    """
+    Process-wide keep-alive HTTP client shared by all agent tools.
+
+    Connections to the backend API and to OpenAI are pooled and reused across
+    tool calls and jobs, so a voice turn no longer pays for a new TCP/TLS
+    handshake. Jobs hold it with `acquire_http_client` and
+    `release_http_client`; it is closed when the last job of the process ends.
+    """
+
+    def __init__(self, config: HttpClientConfig | None = None) -> None:
+        self.config = config or HttpClientConfig()
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.config.max_connections,
+                max_keepalive_connections=self.config.max_keepalive_connections,
+                keepalive_expiry=self.config.keepalive_expiry,
+            ),
+            timeout=self.config.timeout_for(KB_SEARCH),
+        )
+
+    @property
+    def is_closed(self) -> bool:
+        return self._client.is_closed
+
+    async def get(self, url: str, *, endpoint: str, **kwargs) -> httpx.Response:
+        return await self._request("GET", url, endpoint, **kwargs)
+
+    async def post(self, url: str, *, endpoint: str, **kwargs) -> httpx.Response:
+        return await self._request("POST", url, endpoint, **kwargs)
+
+    async def _request(self, method: str, url: str, endpoint: str, **kwargs) -> httpx.Response:
+        global _in_flight
+        _in_flight += 1
+        try:
+            return await self._client.request(method, url, timeout=self.config.timeout_for(endpoint), **kwargs)
+        finally:
+            _in_flight -= 1
+
+    async def aclose(self) -> None:
+        if not self._client.is_closed:
+            await self._client.aclose()
+
+
+_client: SharedHttpClient | None = None
+
+# Requests in flight through any shared client of this process (reported to the worker's load_fnc)
+_in_flight = 0
+
+# Jobs of this process holding the client
+_holders = 0
+
+
+def init_http_client(config: HttpClientConfig | None = None) -> SharedHttpClient:
+    """Create the process-wide client. Called from `prewarm`."""
+    global _client
+    _client = SharedHttpClient(config or HttpClientConfig.from_env())
+    logger.info(f"Shared HTTP client initialized: {_client.config}")
+    return _client
+
+
+def get_http_client() -> SharedHttpClient:
+    """Return the process-wide client, creating it if prewarm did not run or it was closed."""
+    if _client is None or _client.is_closed:
+        return init_http_client()
+    return _client
+
+
+def acquire_http_client() -> SharedHttpClient:
+    """Hold the process-wide client for a job. Paired with `release_http_client` at the job's shutdown."""
+    global _holders
+    _holders += 1
+    return get_http_client()
+
+
+async def release_http_client() -> None:
+    """Release a job's hold on the client; pooled connections are closed when the process's last job ends."""
+    global _holders
+    _holders = max(0, _holders - 1)
+    if _holders == 0 and _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("Shared HTTP client closed")
+
+
+def in_flight_requests() -> int:
+    return _in_flight
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+
+from tenant import current_tenant
+
+logger = logging.getLogger("priya-salon-assistant")
+
+_PUNCTUATION = re.compile(r"[^\w\s'-]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivial variants share a key."""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", question.lower())).strip()
+
+
+class KnowledgeCache:
+    """
+    In-process cache of knowledge base search results.
+
+    Entries are keyed on the normalized question plus the (sorted) extracted
+    tags, evicted least-recently-used beyond `max_entries` and expired after
+    `ttl` seconds. The whole cache is dropped whenever the backend reports a
+    new knowledge base version, so supervisor-learned answers show up without
+    restarting the worker.
+
+    Each invalidation starts a new `generation`. A search reads the
+    generation before going to the backend and passes it to `put`, which
+    drops results fetched before an invalidation instead of caching answers
+    the change made stale.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 300.0) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version: str | None = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+        self.generation = 0
+        self._entries: OrderedDict[tuple, tuple[float, list[dict]]] = OrderedDict()
+        self._poll_task: asyncio.Task | None = None
+        self._pollers = 0
+
+    @staticmethod
+    def make_key(question: str, tags: list[str] | None = None) -> tuple:
+        return (normalize_question(question), tuple(sorted(tags or [])))
+
+    def get(self, question: str, tags: list[str] | None = None, allow_stale: bool = False) -> list[dict] | None:
+        """
+        Cached results for the question, or None. Expired entries are kept
+        (until evicted or invalidated) so `allow_stale=True` can still serve
+        them while the backend is unavailable.
+        """
+        key = self.make_key(question, tags)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        stored_at, results = entry
+        if time.monotonic() - stored_at > self.ttl and not allow_stale:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return results
+
+    def put(self, question: str, tags: list[str] | None, results: list[dict], generation: int | None = None) -> None:
+        """Cache results fetched under `generation` (default: the current one); dropped if invalidated since."""
+        if generation is not None and generation != self.generation:
+            self.stale_puts += 1
+            return
+        key = self.make_key(question, tags)
+        self._entries[key] = (time.monotonic(), results)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, reason: str = "manual") -> None:
+        """Drop every cached result. Hook for version changes and backend pushes."""
+        if self._entries:
+            logger.info(f"[KB Cache] Invalidating {len(self._entries)} entries ({reason})")
+        self._entries.clear()
+        self.generation += 1
+        self.invalidations += 1
+
+    def observe_version(self, version: str | None) -> None:
+        """Record the backend knowledge base version, invalidating if it changed."""
+        if version is None:
+            return
+        if self.version is not None and version != self.version:
+            self.invalidate(reason=f"version {self.version} -> {version}")
+        self.version = version
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_puts": self.stale_puts,
+            "version": self.version,
+        }
+
+    def start_version_polling(self, fetch_version, interval: float) -> None:
+        """
+        Poll `fetch_version` (an async callable returning the backend version
+        string or None) every `interval` seconds. Called once per job of the
+        tenant and paired with `stop_version_polling`: the cache outlives the
+        job, so one poller runs per process for as long as any job of the
+        tenant does.
+        """
+        self._pollers += 1
+        if interval <= 0 or (self._poll_task is not None and not self._poll_task.done()):
+            return
+
+        async def _poll() -> None:
+            while True:
+                try:
+                    self.observe_version(await fetch_version())
+                except Exception as e:
+                    logger.warning(f"[KB Cache] Version check failed: {e}")
+                await asyncio.sleep(interval)
+
+        self._poll_task = asyncio.create_task(_poll())
+
+    async def stop_version_polling(self) -> None:
+        """Release this job's hold on the poller; it stops when the tenant's last job does."""
+        self._pollers = max(0, self._pollers - 1)
+        if self._pollers == 0 and self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+
+
+class TenantCaches:
+    """
+    One KnowledgeCache per tenant, so a large tenant's traffic can only evict
+    its own entries and never another tenant's hot answers. The caches of the
+    `max_tenants` most recently served tenants are kept; evicting a tenant's
+    cache stops its version poller unless a job of the tenant still holds it.
+    """
+
+    def __init__(self, max_tenants: int = 1024, max_entries: int = 512, ttl: float = 300.0) -> None:
+        self.max_tenants = max_tenants
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.tenant_evictions = 0
+        self._caches: OrderedDict[str, KnowledgeCache] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._caches)
+
+    def get(self, tenant_id: str) -> KnowledgeCache:
+        cache = self._caches.get(tenant_id)
+        if cache is None:
+            cache = self._caches[tenant_id] = KnowledgeCache(max_entries=self.max_entries, ttl=self.ttl)
+            while len(self._caches) > self.max_tenants:
+                _, evicted = self._caches.popitem(last=False)
+                if evicted._poll_task is not None and evicted._pollers == 0:
+                    evicted._poll_task.cancel()
+                self.tenant_evictions += 1
+        self._caches.move_to_end(tenant_id)
+        return cache
+
+    def stats(self) -> dict:
+        return {
+            "tenants": len(self._caches),
+            "tenant_evictions": self.tenant_evictions,
+            "size": sum(len(cache._entries) for cache in self._caches.values()),
+        }
+
+
+_caches: TenantCaches | None = None
+
+
+def init_kb_cache() -> TenantCaches:
+    """Create the process-wide per-tenant caches from KB_CACHE_* env vars. Called from `prewarm`."""
+    global _caches
+    _caches = TenantCaches(
+        max_tenants=int(os.getenv("KB_CACHE_MAX_TENANTS", "1024")),
+        max_entries=int(os.getenv("KB_CACHE_MAX_ENTRIES", "512")),
+        ttl=float(os.getenv("KB_CACHE_TTL", "300")),
+    )
+    return _caches
+
+
+def get_kb_cache(tenant_id: str | None = None) -> KnowledgeCache:
+    """The cache of `tenant_id` (default: the current call's tenant)."""
+    caches = _caches if _caches is not None else init_kb_cache()
+    return caches.get(tenant_id or current_tenant().id)
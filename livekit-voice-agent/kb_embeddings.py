@@ -0,0 +1,255 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+from livekit.agents import Plugin
+
+logger = logging.getLogger("priya-salon-assistant")
+
+# Static word embeddings (WordLlama, 256 dimensions): a token -> vector table,
+# so embedding a question is a lookup and a mean, with no network to run
+DEFAULT_REPO = "dleemiller/word-llama-l2-supercat"
+DEFAULT_TOKENIZER = "l2_supercat_tokenizer_config.json"
+DEFAULT_WEIGHTS = "l2_supercat_256.safetensors"
+DEFAULT_TENSOR = "embedding.weight"
+
+
+def embeddings_enabled() -> bool:
+    return os.getenv("KB_EMBEDDINGS", "false").lower() in ("1", "true", "yes")
+
+
+def entry_text(row: dict) -> str:
+    """What an entry is embedded from: its question pattern and tags."""
+    return " ".join([row["question_pattern"], *(str(tag) for tag in row.get("tags") or [])])
+
+
+class StaticEmbedder:
+    """
+    Sentence embeddings from a static embedding table: the text is
+    tokenized, the rows of its tokens are averaged and the mean is
+    L2-normalized, so a dot product of two embeddings is their cosine
+    similarity. Embedding a question takes tens of microseconds on one core.
+    """
+
+    def __init__(self, tokenizer, weights: np.ndarray, name: str) -> None:
+        self.tokenizer = tokenizer
+        self.weights = weights
+        self.name = name
+        self.dim = weights.shape[1]
+
+    @classmethod
+    def load(cls, tokenizer_path: str, weights_path: str, tensor: str = DEFAULT_TENSOR) -> "StaticEmbedder":
+        from safetensors import safe_open
+        from tokenizers import Tokenizer
+
+        tokenizer = Tokenizer.from_file(tokenizer_path)
+        with safe_open(weights_path, framework="np") as f:
+            weights = f.get_tensor(tensor)
+        return cls(tokenizer, weights, name=os.path.splitext(os.path.basename(weights_path))[0])
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """(len(texts), dim) float32 unit vectors; all zeros for text with no tokens."""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, encoding in enumerate(self.tokenizer.encode_batch(texts, add_special_tokens=False)):
+            if encoding.ids:
+                vector = self.weights[encoding.ids].mean(axis=0, dtype=np.float32)
+                norm = np.linalg.norm(vector)
+                if norm > 0:
+                    vectors[i] = vector / norm
+        return vectors
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+class VectorIndex:
+    """
+    Embeddings of one tenant's active knowledge base entries, searched by
+    cosine similarity: a flat (rows x dim) float32 matrix times the query
+    vector, which for a few thousand entries is a single BLAS call.
+
+    The matrix is a read-only memory-mapped .npy file, shared through the
+    page cache by every job process on the host. Files are named after a
+    digest of their contents and never modified; a `<tenant>.json` manifest
+    points at the current one and lists the entry id and text digest of
+    each row. `apply_changes` re-embeds only new and edited entries, reusing
+    the rows of the others, writes the result as a new file and swaps it in.
+    A process starting up reuses whatever the manifest already has.
+    """
+
+    def __init__(self, embedder: StaticEmbedder, directory: str, tenant_id: str, min_similarity: float = 0.5) -> None:
+        self.embedder = embedder
+        self.directory = directory
+        self.min_similarity = min_similarity
+        self.manifest_path = os.path.join(directory, f"{tenant_id}.json")
+        self._rows: dict[str, dict] = {}
+        self._ids: list[str] = []
+        self._digests: list[str] = []
+        self._matrix = np.zeros((0, embedder.dim), dtype=np.float32)
+        self.path: str | None = None
+        os.makedirs(directory, exist_ok=True)
+        self._open_manifest()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _open_manifest(self) -> None:
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            path = os.path.join(self.directory, manifest["file"])
+            matrix = np.load(path, mmap_mode="r")
+        except (OSError, ValueError, KeyError):
+            return
+        if matrix.shape != (len(manifest["ids"]), self.embedder.dim):
+            return
+        self._ids, self._digests, self._matrix, self.path = manifest["ids"], manifest["digests"], matrix, path
+
+    def apply_changes(self, rows: list[dict]) -> int:
+        """Upsert active rows and drop inactive ones. Returns the number of entries (re)embedded."""
+        for row in rows:
+            self._rows.pop(row["id"], None)
+            if row.get("is_active", True):
+                self._rows[row["id"]] = row
+
+        ids = list(self._rows)
+        texts = [entry_text(self._rows[entry_id]) for entry_id in ids]
+        digests = [_digest(text) for text in texts]
+        if ids == self._ids and digests == self._digests:
+            return 0
+
+        previous = {(entry_id, digest): i for i, (entry_id, digest) in enumerate(zip(self._ids, self._digests))}
+        matrix = np.empty((len(ids), self.embedder.dim), dtype=np.float32)
+        stale = []
+        for i, key in enumerate(zip(ids, digests)):
+            if key in previous:
+                matrix[i] = self._matrix[previous[key]]
+            else:
+                stale.append(i)
+        if stale:
+            matrix[stale] = self.embedder.embed([texts[i] for i in stale])
+
+        self._write(ids, digests, matrix)
+        return len(stale)
+
+    def _write(self, ids: list[str], digests: list[str], matrix: np.ndarray) -> None:
+        name = f"{_digest(self.embedder.name + ''.join(ids) + ''.join(digests))}.npy"
+        path = os.path.join(self.directory, name)
+        try:
+            if not os.path.exists(path):
+                fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".npy.tmp")
+                with os.fdopen(fd, "wb") as f:
+                    np.save(f, matrix)
+                os.replace(tmp, path)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".json.tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"file": name, "ids": ids, "digests": digests}, f)
+            os.replace(tmp, self.manifest_path)
+            mapped = np.load(path, mmap_mode="r")
+        except OSError as e:
+            # Serve from memory until a later change manages to write
+            logger.warning(f"[KB Embeddings] Writing {path} failed: {e}")
+            mapped, path = matrix, None
+
+        previous_path = self.path
+        self._ids, self._digests, self._matrix, self.path = ids, digests, mapped, path
+        if previous_path is not None and previous_path != path:
+            try:
+                os.remove(previous_path)  # processes still mapping it keep their copy until they swap
+            except OSError:
+                pass
+
+    def search(self, question: str, limit: int = 5) -> list[dict]:
+        """Entries at least `min_similarity` similar to the question, most similar first."""
+        if not question or not question.strip() or not self._rows:
+            return []
+
+        scores = self._matrix @ self.embedder.embed([question.strip()])[0]
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        return [
+            {**self._rows[self._ids[i]], "similarity_score": float(scores[i]), "vector_similarity": float(scores[i])}
+            for i in sorted(top, key=lambda i: scores[i], reverse=True)
+            if scores[i] >= self.min_similarity
+        ]
+
+
+def model_files(local_files_only: bool = True) -> tuple[str, str]:
+    """
+    Paths of the tokenizer and weights. KB_EMBEDDING_TOKENIZER and
+    KB_EMBEDDING_WEIGHTS are local files or file names in the Hugging Face
+    repo KB_EMBEDDING_REPO, which are taken from the Hub cache (filled by
+    `python agent.py download-files`) unless `local_files_only` is False.
+    """
+    from huggingface_hub import hf_hub_download
+
+    repo = os.getenv("KB_EMBEDDING_REPO", DEFAULT_REPO)
+    paths = []
+    for name in (os.getenv("KB_EMBEDDING_TOKENIZER", DEFAULT_TOKENIZER), os.getenv("KB_EMBEDDING_WEIGHTS", DEFAULT_WEIGHTS)):
+        if os.path.isfile(name):
+            paths.append(name)
+        else:
+            paths.append(hf_hub_download(repo, name, local_files_only=local_files_only))
+    return paths[0], paths[1]
+
+
+class EmbeddingModelPlugin(Plugin):
+    """Lets `download-files` fetch the embedding model along with the speech models."""
+
+    def __init__(self) -> None:
+        super().__init__("kb_embeddings", "1.0.0", __name__, logger)
+
+    def download_files(self) -> None:
+        model_files(local_files_only=False)
+
+
+Plugin.register_plugin(EmbeddingModelPlugin())
+
+_embedder: StaticEmbedder | None = None
+
+
+def init_kb_embeddings() -> StaticEmbedder | None:
+    """
+    Load the embedding model when KB_EMBEDDINGS is set. Called from `prewarm`
+    before the knowledge base indexes are created, since each index gets its
+    vectors on creation. Returns None (and the embedding tier stays off) if
+    it is disabled or the model files are missing.
+    """
+    global _embedder
+    if not embeddings_enabled():
+        _embedder = None
+        return None
+
+    start = time.perf_counter()
+    try:
+        tokenizer_path, weights_path = model_files()
+        _embedder = StaticEmbedder.load(tokenizer_path, weights_path, os.getenv("KB_EMBEDDING_TENSOR", DEFAULT_TENSOR))
+    except Exception as e:
+        logger.error(f"[KB Embeddings] Failed to load the embedding model (run `python agent.py download-files`): {e}")
+        _embedder = None
+        return None
+    logger.info(f"[KB Embeddings] Loaded {_embedder.name} ({_embedder.weights.shape[0]} tokens x {_embedder.dim}) "
+                f"in {(time.perf_counter() - start) * 1000:.0f}ms")
+    return _embedder
+
+
+def get_kb_embedder() -> StaticEmbedder | None:
+    return _embedder
+
+
+def new_vector_index(tenant_id: str) -> VectorIndex | None:
+    """An empty vector index for a new tenant knowledge base index, or None when embeddings are off."""
+    if _embedder is None:
+        return None
+    directory = os.getenv("KB_EMBEDDINGS_DIR", os.path.join(tempfile.gettempdir(), "priya_kb_embeddings"))
+    return VectorIndex(
+        _embedder,
+        os.path.join(directory, _embedder.name),
+        tenant_id,
+        min_similarity=float(os.getenv("KB_EMBEDDING_MIN_SIMILARITY", "0.5")),
+    )
@@ -0,0 +1,90 @@
+import json
+import os
+import re
+
+# KB_RESULT_FORMAT=full keeps the original response (every qualifying result,
+# every field). compact (default) shapes it for the LLM context, see shape_results.
+FULL = "full"
+COMPACT = "compact"
+
+KB_RESULT_FORMAT = os.getenv("KB_RESULT_FORMAT", COMPACT).lower()
+KB_MAX_RESULTS = int(os.getenv("KB_MAX_RESULTS", "3"))
+KB_ANSWER_MAX_CHARS = int(os.getenv("KB_ANSWER_MAX_CHARS", "300"))
+KB_DEDUPE_SIMILARITY = float(os.getenv("KB_DEDUPE_SIMILARITY", "0.85"))
+
+_WORD_RE = re.compile(r"[a-z0-9$]+(?:[.:][0-9]+)?")
+_SENTENCE_END_RE = re.compile(r"[.!?](?=\s|$)")
+
+
+def _words(text: str) -> set[str]:
+    return set(_WORD_RE.findall(text.lower()))
+
+
+def near_duplicate(a: str, b: str, threshold: float = KB_DEDUPE_SIMILARITY) -> bool:
+    """Word-set Jaccard similarity of two answers is at least `threshold`."""
+    words_a, words_b = _words(a), _words(b)
+    if not words_a or not words_b:
+        return a.strip().lower() == b.strip().lower()
+    return len(words_a & words_b) / len(words_a | words_b) >= threshold
+
+
+def truncate_answer(answer: str, max_chars: int = KB_ANSWER_MAX_CHARS) -> str:
+    """
+    Cut an answer to at most `max_chars`, at the last sentence end if that
+    keeps at least half of it, otherwise at the last word boundary.
+    """
+    answer = answer.strip()
+    if max_chars <= 0 or len(answer) <= max_chars:
+        return answer
+    head = answer[:max_chars]
+    sentence_ends = [m.end() for m in _SENTENCE_END_RE.finditer(head)]
+    if sentence_ends and sentence_ends[-1] >= max_chars // 2:
+        return head[:sentence_ends[-1]]
+    return head[:max_chars - 1].rsplit(" ", 1)[0].rstrip(",;:") + "…"
+
+
+def shape_results(formatted_results: list[dict], tier: str) -> list[dict]:
+    """
+    Compact form of `format_kb_results` output for the LLM:
+      - high tier: only the top result (and any tied with it, since tag
+        matches score a flat 0.85), with question and answer
+      - otherwise: question, answer and score of each result
+    At most KB_MAX_RESULTS results are kept, answers that are near-duplicates
+    of a higher-ranked one are dropped and long answers are truncated to
+    KB_ANSWER_MAX_CHARS.
+    """
+    high = tier == "high"
+    if high:
+        top_score = formatted_results[0]["similarity_score"]
+        formatted_results = [r for r in formatted_results if r["similarity_score"] >= top_score]
+
+    shaped: list[dict] = []
+    for r in formatted_results:
+        if any(near_duplicate(r["answer"], kept["answer"]) for kept in shaped):
+            continue
+        result = {"question": r["question"], "answer": truncate_answer(r["answer"])}
+        if not high:
+            result["score"] = r["similarity_score"]
+        shaped.append(result)
+        if len(shaped) >= KB_MAX_RESULTS:
+            break
+    return shaped
+
+
+def kb_payload(formatted_results: list[dict], tier: str, result_format: str | None = None) -> dict:
+    """Response body for one question's qualifying results."""
+    if (result_format or KB_RESULT_FORMAT) == FULL:
+        return {
+            "found": True,
+            "count": len(formatted_results),
+            "results": formatted_results,
+            "confidence_tier": tier
+        }
+    return {"found": True, "confidence_tier": tier, "results": shape_results(formatted_results, tier)}
+
+
+def dumps(payload: dict, result_format: str | None = None) -> str:
+    """Serialize a tool response; compact drops JSON whitespace and keeps non-ASCII text unescaped."""
+    if (result_format or KB_RESULT_FORMAT) == FULL:
+        return json.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
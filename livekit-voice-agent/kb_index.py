@@ -0,0 +1,555 @@
+import asyncio
+import logging
+import math
+import os
+import re
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+
+import httpx
+
+from kb_embeddings import VectorIndex, new_vector_index
+from tenant import DEFAULT_TENANT, current_tenant, tenant_headers
+
+logger = logging.getLogger("priya-salon-assistant")
+
+# =============================================================================
+# pg_trgm similarity()
+# =============================================================================
+
+_TRGM_WORD = re.compile(r"[^\W_]+")
+
+
+def trigrams(text: str) -> frozenset[str]:
+    """Trigram set as built by pg_trgm: each alphanumeric word padded with '  ' and ' '."""
+    grams = set()
+    for word in _TRGM_WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def trigram_similarity(a: frozenset[str], b: frozenset[str]) -> float:
+    if not a or not b:
+        return 0.0
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+
+def similarity(a: str, b: str) -> float:
+    return trigram_similarity(trigrams(a), trigrams(b))
+
+
+# =============================================================================
+# normalize_question() from migration 002
+# =============================================================================
+
+_NON_WORD = re.compile(r"[^\w\s']")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    return _SPACES.sub(" ", _NON_WORD.sub("", question.strip().lower()))
+
+
+# =============================================================================
+# to_tsvector('english') / plainto_tsquery('english') / ts_rank()
+# =============================================================================
+
+# PostgreSQL english.stop
+STOPWORDS = frozenset("""
+i me my myself we our ours ourselves you your yours yourself yourselves he him
+his himself she her hers herself it its itself they them their theirs themselves
+what which who whom this that these those am is are was were be been being have
+has had having do does did doing a an the and but if or because as until while
+of at by for with about against between into through during before after above
+below to from up down in out on off over under again further then once here
+there when where why how all any both each few more most other some such no nor
+not only own same so than too very s t can will just don should now
+""".split())
+
+_TS_TOKEN = re.compile(r"[^\W_]+(?:-[^\W_]+)*")
+_VOWELS = frozenset("aeiou")
+
+
+def _is_consonant(word: str, i: int) -> bool:
+    ch = word[i]
+    if ch in _VOWELS:
+        return False
+    if ch == "y":
+        return i == 0 or not _is_consonant(word, i - 1)
+    return True
+
+
+def _measure(stem: str) -> int:
+    """Number of VC sequences in `stem` (Porter's m)."""
+    m, prev_vowel = 0, False
+    for i in range(len(stem)):
+        vowel = not _is_consonant(stem, i)
+        if prev_vowel and not vowel:
+            m += 1
+        prev_vowel = vowel
+    return m
+
+
+def _has_vowel(stem: str) -> bool:
+    return any(not _is_consonant(stem, i) for i in range(len(stem)))
+
+
+def _ends_double_consonant(word: str) -> bool:
+    return len(word) >= 2 and word[-1] == word[-2] and _is_consonant(word, len(word) - 1)
+
+
+def _ends_cvc(word: str) -> bool:
+    return (
+        len(word) >= 3
+        and _is_consonant(word, len(word) - 3)
+        and not _is_consonant(word, len(word) - 2)
+        and _is_consonant(word, len(word) - 1)
+        and word[-1] not in "wxy"
+    )
+
+
+def _replace(word: str, rules: list[tuple[str, str]], min_measure: int) -> str:
+    for suffix, replacement in rules:
+        if word.endswith(suffix):
+            stem = word[: -len(suffix)]
+            return stem + replacement if _measure(stem) > min_measure else word
+    return word
+
+
+_STEP2 = [
+    ("ational", "ate"), ("tional", "tion"), ("enci", "ence"), ("anci", "ance"),
+    ("izer", "ize"), ("abli", "able"), ("alli", "al"), ("entli", "ent"),
+    ("eli", "e"), ("ousli", "ous"), ("ization", "ize"), ("ation", "ate"),
+    ("ator", "ate"), ("alism", "al"), ("iveness", "ive"), ("fulness", "ful"),
+    ("ousness", "ous"), ("aliti", "al"), ("iviti", "ive"), ("biliti", "ble"),
+]
+_STEP3 = [
+    ("icate", "ic"), ("ative", ""), ("alize", "al"), ("iciti", "ic"),
+    ("ical", "ic"), ("ful", ""), ("ness", ""),
+]
+_STEP4 = [
+    "al", "ance", "ence", "er", "ic", "able", "ible", "ant", "ement", "ment",
+    "ent", "ion", "ou", "ism", "ate", "iti", "ous", "ive", "ize",
+]
+
+
+def stem(word: str) -> str:
+    """
+    Porter stemmer. PostgreSQL's english config uses the Snowball (Porter2)
+    variant; the two agree on the everyday vocabulary callers use.
+    """
+    if len(word) <= 2:
+        return word
+
+    # Step 1a
+    if word.endswith("sses"):
+        word = word[:-2]
+    elif word.endswith("ies"):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+
+    # Step 1b
+    if word.endswith("eed"):
+        if _measure(word[:-3]) > 0:
+            word = word[:-1]
+    else:
+        for suffix in ("ed", "ing"):
+            if word.endswith(suffix) and _has_vowel(word[: -len(suffix)]):
+                word = word[: -len(suffix)]
+                if word.endswith(("at", "bl", "iz")):
+                    word += "e"
+                elif _ends_double_consonant(word) and word[-1] not in "lsz":
+                    word = word[:-1]
+                elif _measure(word) == 1 and _ends_cvc(word):
+                    word += "e"
+                break
+
+    # Step 1c
+    if word.endswith("y") and _has_vowel(word[:-1]):
+        word = word[:-1] + "i"
+
+    word = _replace(word, _STEP2, 0)
+    word = _replace(word, _STEP3, 0)
+
+    # Step 4
+    for suffix in _STEP4:
+        if word.endswith(suffix):
+            base = word[: -len(suffix)]
+            if _measure(base) > 1 and (suffix != "ion" or base.endswith(("s", "t"))):
+                word = base
+            break
+
+    # Step 5
+    if word.endswith("e"):
+        base = word[:-1]
+        m = _measure(base)
+        if m > 1 or (m == 1 and not _ends_cvc(base)):
+            word = base
+    if _measure(word) > 1 and _ends_double_consonant(word) and word.endswith("l"):
+        word = word[:-1]
+
+    return word
+
+
+def _ts_tokens(text: str) -> list[str]:
+    """
+    Tokens in the order the default text search parser emits them: a
+    hyphenated word yields the compound followed by each of its parts.
+    """
+    tokens = []
+    for token in _TS_TOKEN.findall(text.lower()):
+        tokens.append(token)
+        if "-" in token:
+            tokens.extend(token.split("-"))
+    return tokens
+
+
+def to_tsvector(text: str) -> dict[str, list[int]]:
+    """Lexeme -> positions. Stopwords are dropped but still consume a position."""
+    vector: dict[str, list[int]] = defaultdict(list)
+    for position, token in enumerate(_ts_tokens(text), start=1):
+        if token not in STOPWORDS:
+            vector[stem(token)].append(position)
+    return dict(vector)
+
+
+def plainto_tsquery(text: str) -> list[str]:
+    """Distinct lexemes ANDed together by plainto_tsquery."""
+    lexemes = []
+    for token in _ts_tokens(text):
+        if token not in STOPWORDS:
+            lexeme = stem(token)
+            if lexeme not in lexemes:
+                lexemes.append(lexeme)
+    return lexemes
+
+
+def ts_matches(vector: dict[str, list[int]], query: list[str]) -> bool:
+    return bool(query) and all(lexeme in vector for lexeme in query)
+
+
+_DEFAULT_WEIGHT = 0.1  # ts_rank weight for unlabelled (D) positions
+
+
+def _word_distance(distance: int) -> float:
+    if distance > 100:
+        return 1e-30
+    return 1.0 / (1.005 + 0.05 * math.exp(distance / 1.5 - 2))
+
+
+def ts_rank(vector: dict[str, list[int]], query: list[str]) -> float:
+    """ts_rank() with default weights and normalization 0 (calc_rank_or / calc_rank_and)."""
+    if not query:
+        return 0.0
+
+    if len(query) < 2:
+        total = 0.0
+        for lexeme in query:
+            positions = vector.get(lexeme)
+            if not positions:
+                continue
+            # All positions carry the same weight, so the "maximum weight"
+            # correction in calc_rank_or cancels out
+            resj = sum(_DEFAULT_WEIGHT / ((j + 1) ** 2) for j in range(len(positions)))
+            total += resj / 1.64493406685
+        return total / len(query)
+
+    res = -1.0
+    seen: list[list[int]] = []
+    for lexeme in query:
+        positions = vector.get(lexeme)
+        if not positions:
+            continue
+        for previous in seen:
+            for p in positions:
+                for q in previous:
+                    distance = abs(p - q)
+                    if distance:
+                        curw = math.sqrt(_DEFAULT_WEIGHT * _DEFAULT_WEIGHT * _word_distance(distance))
+                        res = curw if res < 0 else 1.0 - (1.0 - res) * (1.0 - curw)
+        seen.append(positions)
+
+    return res if res >= 0 else 1e-20
+
+
+# =============================================================================
+# Index
+# =============================================================================
+
+class _IndexedEntry:
+    __slots__ = ("row", "pattern_lower", "pattern_trgm", "normalized_trgm", "tsvector", "tags_lower", "tag_trgms")
+
+    def __init__(self, row: dict) -> None:
+        self.row = row
+        pattern = row["question_pattern"]
+        self.pattern_lower = pattern.lower()
+        self.pattern_trgm = trigrams(pattern)
+        normalized = row.get("normalized_question") or normalize_question(pattern)
+        self.normalized_trgm = trigrams(normalized)
+        self.tsvector = to_tsvector(pattern)
+        tags = row.get("tags") or []
+        self.tags_lower = [str(tag).lower() for tag in tags]
+        self.tag_trgms = [trigrams(tag) for tag in tags]
+
+
+class KnowledgeIndex:
+    """
+    In-memory copy of the active knowledge base that reproduces the scoring of
+    `searchKnowledgeBase` in backend/api/services/knowledge.service.js:
+    exact match, pg_trgm similarity on the raw and normalized question,
+    ts_rank full-text rank, exact/fuzzy tag-in-query matches and the
+    extracted-tag overlap boost.
+
+    Every entry's trigram sets and tsvector are precomputed on load, so a
+    search over a few hundred rows is a handful of set intersections per row.
+    Rows are kept up to date by `apply_changes`, which takes rows from the
+    backend's delta sync endpoint (inactive rows are removed), and passed on
+    to `vectors`, the entries' embeddings, when KB_EMBEDDINGS is on.
+    """
+
+    def __init__(self, vectors: VectorIndex | None = None) -> None:
+        self._entries: dict[str, _IndexedEntry] = {}
+        self.vectors = vectors
+        self.synced_at: datetime | None = None
+        self.loaded = False
+        self._sync_task: asyncio.Task | None = None
+        self._syncers = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def rows(self) -> list[dict]:
+        """The active rows, as last synced."""
+        return [entry.row for entry in self._entries.values()]
+
+    def apply_changes(self, rows: list[dict], server_time: str | None = None) -> int:
+        """Upsert active rows and drop inactive ones. Returns the number of rows applied."""
+        for row in rows:
+            self._entries.pop(row["id"], None)
+            if row.get("is_active", True):
+                self._entries[row["id"]] = _IndexedEntry(row)
+        if self.vectors is not None:
+            embedded = self.vectors.apply_changes(rows)
+            if embedded:
+                logger.info(f"[KB Embeddings] Embedded {embedded} changed entries ({len(self.vectors)} vectors)")
+        if server_time:
+            self.synced_at = datetime.fromisoformat(server_time.replace("Z", "+00:00"))
+        self.loaded = True
+        return len(rows)
+
+    def start_delta_sync(self, sync_once, interval: float) -> None:
+        """
+        Run `sync_once` (an async callable that fetches and applies changes)
+        every `interval` seconds. Called once per job of the tenant and paired
+        with `stop_delta_sync`: the index outlives the job, so one sync loop
+        runs per process for as long as any job of the tenant does.
+        """
+        self._syncers += 1
+        if interval <= 0 or (self._sync_task is not None and not self._sync_task.done()):
+            return
+
+        async def _sync() -> None:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await sync_once()
+                except Exception as e:
+                    logger.warning(f"[KB Index] Delta sync failed: {e}")
+
+        self._sync_task = asyncio.create_task(_sync())
+
+    async def stop_delta_sync(self) -> None:
+        """Release this job's hold on the sync loop; it stops when the tenant's last job does."""
+        self._syncers = max(0, self._syncers - 1)
+        if self._syncers == 0 and self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+
+    def record_use(self, entry_id: str) -> None:
+        """Bump the local times_used tie-breaker, mirroring incrementUsageCount."""
+        entry = self._entries.get(entry_id)
+        if entry is not None:
+            entry.row["times_used"] = (entry.row.get("times_used") or 0) + 1
+
+    def search(
+        self,
+        question: str,
+        threshold: float = 0.3,
+        extracted_tags: list[str] | None = None,
+        limit: int = 5,
+    ) -> list[dict]:
+        if not question or not question.strip():
+            return []
+
+        limit = min(max(1, limit), 20)
+        trimmed = question.strip()
+
+        # Strategy 1: Exact match (highest confidence)
+        lowered = trimmed.lower()
+        exact = [
+            {**e.row, "similarity_score": 1.0}
+            for e in self._entries.values()
+            if e.pattern_lower == lowered
+        ]
+        if exact:
+            return exact[:limit]
+
+        # Strategy 2-5: Combined fuzzy matching
+        query_trgm = trigrams(trimmed)
+        normalized_trgm = trigrams(normalize_question(trimmed))
+        tsquery = plainto_tsquery(trimmed)
+        lower_words = set(lowered.split(" "))
+        word_trgms = [trigrams(word) for word in trimmed.split(" ")]
+        extracted = [tag.lower() for tag in extracted_tags or []]
+
+        matches = []
+        for entry in self._entries.values():
+            sim_original = trigram_similarity(entry.pattern_trgm, query_trgm)
+            sim_normalized = trigram_similarity(entry.normalized_trgm, normalized_trgm)
+            fts_match = ts_matches(entry.tsvector, tsquery)
+            exact_tag_match = any(tag in lower_words for tag in entry.tags_lower)
+            tag_similarity = None
+            if entry.tag_trgms and word_trgms:
+                tag_similarity = max(
+                    trigram_similarity(tag, word) for tag in entry.tag_trgms for word in word_trgms
+                )
+            overlap = sum(1 for kb_tag in entry.tags_lower for tag in extracted if kb_tag == tag)
+
+            if not (
+                overlap > 0
+                or sim_original > threshold
+                or sim_normalized > threshold
+                or fts_match
+                or exact_tag_match
+                or (tag_similarity or 0) > 0.7
+            ):
+                continue
+
+            fts_rank = ts_rank(entry.tsvector, tsquery)
+            if overlap > 0:
+                score = min(0.90, 0.70 + overlap * 0.05)
+            elif exact_tag_match:
+                score = 0.85
+            elif (tag_similarity or 0) > 0.7:
+                score = 0.75
+            else:
+                score = sim_original * 0.5 + sim_normalized * 0.3 + fts_rank * 0.2
+
+            match = {
+                **entry.row,
+                "sim_original": sim_original,
+                "sim_normalized": sim_normalized,
+                "fts_rank": fts_rank,
+                "exact_tag_match": exact_tag_match,
+                "tag_similarity": tag_similarity,
+                "similarity_score": score,
+            }
+            if extracted:
+                match["extracted_tag_overlap_count"] = overlap
+                match["has_extracted_tag_match"] = overlap > 0
+            matches.append(match)
+
+        matches.sort(key=lambda m: (m["similarity_score"], m.get("times_used") or 0), reverse=True)
+        return matches[:limit]
+
+
+# =============================================================================
+# Backend sync
+# =============================================================================
+
+# Re-read a few seconds before the last sync so rows committed late by
+# concurrent transactions (with an older updated_at) are not missed
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def sync_params(index: KnowledgeIndex) -> dict:
+    if index.synced_at is None:
+        return {}
+    return {"since": (index.synced_at - SYNC_OVERLAP).isoformat()}
+
+
+def fetch_kb_snapshot(api_base_url: str, tenant_id: str | None = None, timeout: float = 2.0) -> dict | None:
+    """
+    Blocking full load of a tenant's active knowledge base (default: the
+    default tenant) from the sync endpoint. Used from `prewarm`, before the
+    event loop runs, so the timeout is short: prewarm has to finish within
+    livekit's initialize_process_timeout (10s). Returns the response body
+    ({"data": [...], "server_time": ...}), or None if the backend is unreachable.
+    """
+    start = time.perf_counter()
+    try:
+        response = httpx.get(
+            f"{api_base_url}/api/knowledge-base/sync",
+            headers=tenant_headers(tenant_id or DEFAULT_TENANT.id),
+            timeout=timeout,
+        )
+        response.raise_for_status()
+    except Exception as e:
+        logger.warning(f"[KB Index] Failed to load knowledge base snapshot: {e}")
+        return None
+
+    snapshot = response.json()
+    logger.info(f"[KB Index] Fetched {len(snapshot.get('data', []))} entries in {(time.perf_counter() - start) * 1000:.1f}ms")
+    return snapshot
+
+
+# One index per tenant, least recently served evicted beyond KB_INDEX_MAX_TENANTS
+_indexes: OrderedDict[str, KnowledgeIndex] = OrderedDict()
+KB_INDEX_MAX_TENANTS = int(os.getenv("KB_INDEX_MAX_TENANTS", "64"))
+
+
+def local_index_enabled() -> bool:
+    return os.getenv("KB_LOCAL_INDEX", "false").lower() in ("1", "true", "yes")
+
+
+def init_kb_index(snapshot: dict | None, tenant_id: str | None = None) -> KnowledgeIndex:
+    """
+    Create the index of `tenant_id` (default: the default tenant) from a
+    `fetch_kb_snapshot` result. Called from `prewarm`. Without a snapshot the
+    index stays unloaded and searches fall back to the backend API until its
+    first delta sync.
+    """
+    index = tenant_kb_index(tenant_id or DEFAULT_TENANT.id)
+    if snapshot is None:
+        logger.warning("[KB Index] No snapshot available, using backend search")
+    else:
+        index.apply_changes(snapshot.get("data", []), snapshot.get("server_time"))
+        logger.info(f"[KB Index] Loaded {len(index)} entries")
+    return index
+
+
+def tenant_kb_index(tenant_id: str) -> KnowledgeIndex:
+    """
+    The index of `tenant_id`, created empty (unloaded) on first use. The
+    first `sync_kb_index` for it does a full load. Evicting a tenant's index
+    stops its delta sync unless a running job still holds it.
+    """
+    index = _indexes.get(tenant_id)
+    if index is None:
+        index = _indexes[tenant_id] = KnowledgeIndex(vectors=new_vector_index(tenant_id))
+        while len(_indexes) > KB_INDEX_MAX_TENANTS:
+            evicted_id, evicted = _indexes.popitem(last=False)
+            if evicted._sync_task is not None and evicted._syncers == 0:
+                evicted._sync_task.cancel()
+            logger.info(f"[KB Index] Evicted index of tenant {evicted_id} ({len(evicted)} entries)")
+    _indexes.move_to_end(tenant_id)
+    return index
+
+
+def get_kb_index(tenant_id: str | None = None) -> KnowledgeIndex | None:
+    """
+    Return the loaded local index of `tenant_id` (default: the current call's
+    tenant), or None if it is disabled or not loaded.
+    """
+    index = _indexes.get(tenant_id or current_tenant().id)
+    if index is None or not index.loaded:
+        return None
+    return index
@@ -0,0 +1,219 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from kb_cache import normalize_question
+from kb_index import trigrams
+
+logger = logging.getLogger("priya-salon-assistant")
+
+# Opt-in: look up the knowledge base from interim transcripts while the caller is still talking
+KB_PREFETCH = os.getenv("KB_PREFETCH", "false").lower() in ("1", "true", "yes")
+
+
+def question_coverage(question: str, utterance: str) -> float:
+    """
+    Share of the tool question's trigrams found in what the caller said.
+    Tolerates filler around the question ("yeah hi so um how much is a
+    haircut") that would sink a plain similarity score.
+    """
+    question_trgm = trigrams(normalize_question(question))
+    if not question_trgm:
+        return 0.0
+    return len(question_trgm & trigrams(normalize_question(utterance))) / len(question_trgm)
+
+
+def _top_question(response: str) -> str | None:
+    """The knowledge base question of the best result in a check_knowledge_base response."""
+    try:
+        results = json.loads(response).get("results") or []
+    except (ValueError, AttributeError):
+        return None
+    return results[0].get("question") if results else None
+
+
+@dataclass
+class _Prefetch:
+    text: str
+    task: asyncio.Task | None = None
+    started_at: float = field(default_factory=time.monotonic)
+    duration: float | None = None
+    used: bool = False
+
+
+class KBPrefetcher:
+    """
+    Speculative knowledge base lookups driven by the caller's transcripts.
+
+    Interim transcripts are debounced: a lookup starts once the text has
+    been stable for `debounce` seconds (a pause), and a final transcript
+    starts one straight away. A newer interim transcript cancels the lookup
+    of the previous one, which is stale. When the LLM then calls
+    check_knowledge_base, `take` returns the prefetched response that
+    matches the tool question best, awaiting it if it is still running, so
+    the tool call skips the search and tag extraction. A prefetch matches if
+    the utterance covers the question, or, once its lookup is done, if the
+    knowledge base question of its top result does (the LLM often rephrases
+    "what time do you open tomorrow" as "What are your business hours?").
+
+    Only responses that found something are reused; for "not_found" the
+    tool runs its normal lookup on the LLM's (cleaner) question.
+    """
+
+    def __init__(
+        self,
+        lookup: Callable[[str], Awaitable[str]],
+        debounce: float = 0.25,
+        min_words: int = 3,
+        min_coverage: float = 0.6,
+        max_age: float = 30.0,
+        keep: int = 4,
+    ) -> None:
+        self.lookup = lookup
+        self.debounce = debounce
+        self.min_words = min_words
+        self.min_coverage = min_coverage
+        self.max_age = max_age
+        self.keep = keep
+        self.started = 0
+        self.cancelled = 0
+        self.tool_calls = 0
+        self.hits = 0
+        self.not_found = 0
+        self.saved: list[float] = []  # seconds of lookup the tool call did not wait for, per hit
+        self._interim: _Prefetch | None = None
+        self._prefetches: list[_Prefetch] = []
+
+    def on_transcript(self, transcript: str, is_final: bool) -> None:
+        """Feed one STT transcript (AgentSession "user_input_transcribed")."""
+        text = transcript.strip()
+        if len(text.split()) < self.min_words:
+            return
+        if self._interim is not None and self._interim.text == text:
+            if is_final:
+                self._interim = None  # confirmed by the final transcript, keep it running
+            return
+
+        # The caller kept talking: the previous interim lookup is for words that have changed
+        self._cancel_interim()
+        if any(p.text == text for p in self._prefetches):
+            return
+
+        prefetch = _Prefetch(text=text)
+        prefetch.task = asyncio.create_task(self._run(prefetch, 0.0 if is_final else self.debounce))
+        self._prefetches.append(prefetch)
+        del self._prefetches[:-self.keep]
+        if not is_final:
+            self._interim = prefetch
+
+    async def _run(self, prefetch: _Prefetch, delay: float) -> str:
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.started += 1
+        start = time.perf_counter()
+        result = await self.lookup(prefetch.text)
+        prefetch.duration = time.perf_counter() - start
+        return result
+
+    @staticmethod
+    def _coverage(question: str, prefetch: _Prefetch) -> float:
+        coverage = question_coverage(question, prefetch.text)
+        task = prefetch.task
+        if task.done() and not task.cancelled() and task.exception() is None:
+            answered = _top_question(task.result())
+            if answered:
+                coverage = max(coverage, question_coverage(question, answered))
+        return coverage
+
+    def _cancel_interim(self) -> None:
+        interim, self._interim = self._interim, None
+        if interim is not None and not interim.task.done():
+            interim.task.cancel()
+            self._prefetches.remove(interim)
+            self.cancelled += 1
+
+    async def take(self, question: str) -> str | None:
+        """
+        The prefetched response for a check_knowledge_base question, or None
+        if no recent utterance covers it or its lookup found nothing.
+        """
+        self.tool_calls += 1
+        now = time.monotonic()
+        candidates = [
+            (self._coverage(question, p), p)
+            for p in self._prefetches
+            if not p.used and not p.task.cancelled() and now - p.started_at <= self.max_age
+        ]
+        coverage, prefetch = max(candidates, key=lambda c: c[0], default=(0.0, None))
+        if prefetch is None or coverage < self.min_coverage:
+            return None
+
+        if prefetch is self._interim:
+            # Claimed by the tool: no longer stale when the caller says more
+            self._interim = None
+        waited = time.perf_counter()
+        try:
+            result = await asyncio.shield(prefetch.task)
+        except asyncio.CancelledError:
+            if not prefetch.task.cancelled():
+                raise  # the tool call itself was cancelled
+            return None
+        except Exception as e:
+            logger.warning(f"[Prefetch] Lookup for '{prefetch.text}' failed: {e}")
+            return None
+        waited = time.perf_counter() - waited
+
+        if result == "not_found":
+            self.not_found += 1
+            return None
+        prefetch.used = True
+        self.hits += 1
+        self.saved.append(max(0.0, (prefetch.duration or 0.0) - waited))
+        logger.info(f"[Prefetch] Hit for '{question}' from '{prefetch.text}' (coverage {coverage:.2f}, "
+                    f"saved {self.saved[-1] * 1000:.0f}ms)")
+        return result
+
+    async def aclose(self) -> None:
+        for prefetch in self._prefetches:
+            prefetch.task.cancel()
+        await asyncio.gather(*(p.task for p in self._prefetches), return_exceptions=True)
+        self._prefetches.clear()
+        self._interim = None
+
+    def stats(self) -> dict:
+        saved_ms = sorted(s * 1000 for s in self.saved)
+        return {
+            "started": self.started,
+            "cancelled": self.cancelled,
+            "tool_calls": self.tool_calls,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.tool_calls, 3) if self.tool_calls else 0.0,
+            "not_found": self.not_found,
+            "saved_ms_mean": round(sum(saved_ms) / len(saved_ms), 1) if saved_ms else 0.0,
+            "saved_ms_p50": round(saved_ms[len(saved_ms) // 2], 1) if saved_ms else 0.0,
+        }
+
+
+# Prefetcher of the call being handled; set in `entrypoint` so tool calls inherit it
+_prefetcher: contextvars.ContextVar[KBPrefetcher | None] = contextvars.ContextVar("kb_prefetcher", default=None)
+
+
+def start_prefetching(lookup: Callable[[str], Awaitable[str]]) -> KBPrefetcher:
+    """Create this call's prefetcher from KB_PREFETCH_* env vars."""
+    prefetcher = KBPrefetcher(
+        lookup,
+        debounce=float(os.getenv("KB_PREFETCH_DEBOUNCE", "0.25")),
+        min_words=int(os.getenv("KB_PREFETCH_MIN_WORDS", "3")),
+        min_coverage=float(os.getenv("KB_PREFETCH_MIN_COVERAGE", "0.6")),
+    )
+    _prefetcher.set(prefetcher)
+    return prefetcher
+
+
+def get_prefetcher() -> KBPrefetcher | None:
+    return _prefetcher.get()
@@ -0,0 +1,130 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import psutil
+
+logger = logging.getLogger("priya-salon-assistant")
+
+EAGER = "eager"
+LAZY = "lazy"
+
+
+@dataclass
+class ModelStats:
+    load_ms: float
+    rss_delta_mb: float
+    uses: int = 0
+
+
+class ModelRegistry:
+    """
+    Per-process registry of the speech models used by every call (VAD and
+    noise cancellation).
+
+    Each model is loaded once per worker process and the same instance is
+    handed to every job that process runs. In eager mode everything is
+    loaded in `prewarm`, before the process accepts a job; in lazy mode a
+    model is loaded by the first job that asks for it.
+
+    The turn detector is not in the registry: MultilingualModel takes the
+    job's inference executor when it is constructed, so it is built per job
+    (see `load_turn_detector`). It is only a handle; the model itself runs
+    in the worker's shared inference process.
+    """
+
+    def __init__(self, mode: str = EAGER) -> None:
+        self.mode = mode
+        self._loaders: dict[str, Callable[[], Any]] = {}
+        self._models: dict[str, Any] = {}
+        self._stats: dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any]) -> None:
+        self._loaders[name] = loader
+
+    def _load(self, name: str) -> Any:
+        process = psutil.Process()
+        rss_before = process.memory_info().rss
+        start = time.perf_counter()
+        model = self._loaders[name]()
+        load_ms = (time.perf_counter() - start) * 1000
+        rss_delta_mb = (process.memory_info().rss - rss_before) / (1024 * 1024)
+
+        self._models[name] = model
+        self._stats[name] = ModelStats(load_ms=load_ms, rss_delta_mb=rss_delta_mb)
+        logger.info(f"[Models] Loaded {name} in {load_ms:.0f}ms (+{rss_delta_mb:.1f}MB RSS)")
+        return model
+
+    def get(self, name: str) -> Any:
+        model = self._models.get(name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(name) or self._load(name)
+        self._stats[name].uses += 1
+        return model
+
+    def load_all(self) -> None:
+        for name in self._loaders:
+            if name not in self._models:
+                with self._lock:
+                    if name not in self._models:
+                        self._load(name)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "rss_mb": round(psutil.Process().memory_info().rss / (1024 * 1024), 1),
+            "models": {
+                name: {"load_ms": round(s.load_ms, 1), "rss_delta_mb": round(s.rss_delta_mb, 1), "uses": s.uses}
+                for name, s in self._stats.items()
+            },
+        }
+
+
+def _load_vad():
+    from livekit.plugins import silero
+
+    return silero.VAD.load()
+
+
+def load_turn_detector():
+    """Turn detector for the current job; needs a job context (call it from `entrypoint`)."""
+    from livekit.plugins.turn_detector.multilingual import MultilingualModel
+
+    return MultilingualModel()
+
+
+def _load_noise_cancellation():
+    from livekit.plugins import noise_cancellation
+
+    # For telephony applications, use `BVCTelephony` instead for best results
+    return noise_cancellation.BVC()
+
+
+_registry: ModelRegistry | None = None
+
+
+def init_model_registry() -> ModelRegistry:
+    """
+    Create the process-wide registry. Called from `prewarm`; MODEL_LOADING
+    selects eager (default, load everything now) or lazy loading.
+    """
+    global _registry
+    mode = os.getenv("MODEL_LOADING", EAGER).lower()
+    _registry = ModelRegistry(mode=LAZY if mode == LAZY else EAGER)
+    _registry.register("vad", _load_vad)
+    _registry.register("noise_cancellation", _load_noise_cancellation)
+
+    if _registry.mode == EAGER:
+        _registry.load_all()
+    return _registry
+
+
+def get_model_registry() -> ModelRegistry:
+    if _registry is None:
+        return init_model_registry()
+    return _registry
@@ -0,0 +1,67 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Call:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one upstream call.
+
+    The first caller for a key starts `fn()` as a task; callers arriving
+    while it is in flight await the same task and get the same result or
+    exception. A caller hanging up (cancellation) only detaches that caller;
+    the shared call is cancelled once no caller is waiting for it any more.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.leaders = 0
+        self.collapsed = 0
+        self.abandoned = 0
+        self._calls: dict[Hashable, _Call] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(task=asyncio.create_task(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.leaders += 1
+        else:
+            self.collapsed += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Every caller hung up: nobody needs the result
+                call.task.cancel()
+                self._forget(key, call)
+                self.abandoned += 1
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        requests = self.leaders + self.collapsed
+        return {
+            "in_flight": len(self._calls),
+            "upstream_calls": self.leaders,
+            "collapsed": self.collapsed,
+            "collapse_rate": round(self.collapsed / requests, 3) if requests else 0.0,
+            "abandoned": self.abandoned,
+        }
@@ -0,0 +1,263 @@
+import logging
+import math
+import os
+import re
+import time
+import zlib
+from collections import OrderedDict, defaultdict
+from typing import Awaitable, Callable, Protocol
+
+from kb_index import STOPWORDS, stem
+from tag_memo import init_tag_memo
+from tenant import DEFAULT_TENANT, current_tenant
+
+logger = logging.getLogger("priya-salon-assistant")
+
+MAX_TAGS = 6
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Keyword lexicon for the tag categories listed in the LLM extraction prompt.
+# Keys are Porter stems of caller words; values are the tags the LLM would emit.
+CATEGORY_LEXICON: dict[str, list[str]] = {
+    "location": ["location", "address", "directions", "place"],
+    "pricing": ["pricing", "cost", "price", "rates"],
+    "services": ["services", "treatments", "offerings"],
+    "hours": ["hours", "schedule", "timing", "open"],
+    "appointments": ["appointments", "booking", "reservation", "walk-ins"],
+    "staff": ["staff", "stylist", "team"],
+    "policies": ["policies", "cancellation", "payment", "rules"],
+    "products": ["products", "retail", "brands"],
+}
+
+CATEGORY_KEYWORDS: dict[str, str] = {
+    **dict.fromkeys(["where", "address", "locat", "direct", "find", "park", "near"], "location"),
+    **dict.fromkeys(["much", "cost", "price", "charg", "rate", "fee", "expens", "cheap", "pai"], "pricing"),
+    **dict.fromkeys(["servic", "treatment", "offer", "menu"], "services"),
+    **dict.fromkeys(["hour", "open", "close", "when", "late", "earli", "todai", "tomorrow",
+                     "mondai", "tuesdai", "wednesdai", "thursdai", "fridai", "saturdai", "sundai"], "hours"),
+    **dict.fromkeys(["appoint", "book", "walk", "reserv", "slot", "avail", "schedul"], "appointments"),
+    **dict.fromkeys(["who", "stylist", "team", "staff", "technician", "employe"], "staff"),
+    **dict.fromkeys(["cancel", "polici", "refund", "tip", "payment", "rule"], "policies"),
+    **dict.fromkeys(["product", "retail", "brand", "bui", "sell", "shampoo"], "products"),
+}
+
+
+def _words(text: str, keep_stopwords: bool = False) -> list[str]:
+    return [stem(w) for w in _WORD.findall(text.lower()) if keep_stopwords or w not in STOPWORDS]
+
+
+class TagExtractor(Protocol):
+    """Maps a caller question onto knowledge base tags."""
+
+    name: str
+
+    async def extract(self, question: str) -> list[str]:
+        ...
+
+
+class LocalTagExtractor:
+    """
+    Offline tag extractor combining a keyword lexicon for the fixed tag
+    categories with a hashed n-gram linear model trained on the knowledge
+    base's own `tags` column. Training takes a few milliseconds for a few
+    hundred rows; extraction is a few dictionary lookups per query word.
+    A model tag needs `min_support` question n-grams behind it: one rare
+    word only points at the row it happens to occur in.
+
+    `generation` is the tenant's KB cache generation the model was trained
+    under (None: not trained yet), so a knowledge base change shows up as a
+    model to retrain.
+    """
+
+    name = "local"
+
+    def __init__(self, n_features: int = 1 << 18, min_score: float = 0.35, relative_cutoff: float = 0.5,
+                 min_support: int = 2) -> None:
+        self.n_features = n_features
+        self.min_score = min_score
+        self.relative_cutoff = relative_cutoff
+        self.min_support = min_support
+        self._weights: dict[int, dict[str, float]] = {}
+        self._tag_stems: dict[str, str] = {}
+        self.trained_rows = 0
+        self.generation: int | None = None
+
+    def _features(self, text: str) -> set[int]:
+        words = _words(text)
+        grams = list(words)
+        grams += [f"{a} {b}" for a, b in zip(words, words[1:])]
+        return {zlib.crc32(g.encode()) % self.n_features for g in grams}
+
+    def train(self, rows: list[dict], generation: int | None = None) -> "LocalTagExtractor":
+        """Learn feature -> tag weights from (question, answer, tags) rows, replacing what was learned before."""
+        cooccurrence: dict[int, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        document_frequency: dict[int, int] = defaultdict(int)
+        tag_stems: dict[str, str] = {}
+        n_rows = 0
+
+        for row in rows:
+            tags = [str(tag).lower() for tag in row.get("tags") or []]
+            if not tags:
+                continue
+            n_rows += 1
+            text = " ".join([row.get("question_pattern", ""), row.get("answer", ""), *(t.replace("-", " ") for t in tags)])
+            for feature in self._features(text):
+                document_frequency[feature] += 1
+                for tag in tags:
+                    cooccurrence[feature][tag] += 1
+            for tag in tags:
+                tag_stems.setdefault(" ".join(_words(tag.replace("-", " "))), tag)
+
+        self._weights = {
+            feature: {
+                tag: count / document_frequency[feature] * math.log(1 + n_rows / document_frequency[feature])
+                for tag, count in tags.items()
+            }
+            for feature, tags in cooccurrence.items()
+        }
+        self._tag_stems = tag_stems
+        self.trained_rows = n_rows
+        self.generation = generation
+        logger.info(f"[Tags] Local tag model trained on {n_rows} rows ({len(self._weights)} features, {len(self._tag_stems)} tags)")
+        return self
+
+    def extract_sync(self, question: str) -> list[str]:
+        """
+        Tags for `question`, or [] when only category words back them: "how
+        much" or "book" fit half the knowledge base, so a tier 2 search on
+        those alone answers questions it has no answer for.
+        """
+        words = _words(question)
+        tags: list[str] = []
+        specific = False
+
+        # Category lexicon ("where", "when" and "who" are stopwords but carry the intent)
+        for word in _words(question, keep_stopwords=True):
+            category = CATEGORY_KEYWORDS.get(word)
+            if category is not None:
+                tags.extend(tag for tag in CATEGORY_LEXICON[category] if tag not in tags)
+
+        # Knowledge base tags named directly by the caller (e.g. "threading", "wifi")
+        for word in words:
+            tag = self._tag_stems.get(word)
+            if tag is not None:
+                specific = specific or word not in CATEGORY_KEYWORDS
+                if tag not in tags:
+                    tags.insert(0, tag)
+
+        # Hashed n-gram model
+        scores: dict[str, float] = defaultdict(float)
+        support: dict[str, int] = defaultdict(int)
+        for feature in self._features(question):
+            for tag, weight in self._weights.get(feature, {}).items():
+                scores[tag] += weight
+                support[tag] += 1
+        supported = {tag: score for tag, score in scores.items() if support[tag] >= self.min_support}
+        if supported:
+            top = max(supported.values())
+            predicted = sorted(
+                (tag for tag, score in supported.items() if score >= self.min_score and score >= top * self.relative_cutoff),
+                key=lambda tag: supported[tag],
+                reverse=True,
+            )
+            specific = specific or bool(predicted)
+            tags = [tag for tag in predicted if tag not in tags] + tags
+
+        return tags[:MAX_TAGS] if specific else []
+
+    async def extract(self, question: str) -> list[str]:
+        return self.extract_sync(question)
+
+
+class LLMTagExtractor:
+    """Adapter for the OpenAI-based extractor in tool.py."""
+
+    name = "llm"
+
+    def __init__(self, extract_fn: Callable[[str], Awaitable[list[str]]]) -> None:
+        self._extract_fn = extract_fn
+
+    async def extract(self, question: str) -> list[str]:
+        return await self._extract_fn(question)
+
+
+class FallbackTagExtractor:
+    """Use `primary`, and ask `fallback` only when the primary finds no tags."""
+
+    def __init__(self, primary: TagExtractor, fallback: TagExtractor) -> None:
+        self.primary = primary
+        self.fallback = fallback
+        self.name = f"{primary.name}+{fallback.name}"
+
+    async def extract(self, question: str) -> list[str]:
+        tags = await self.primary.extract(question)
+        if tags:
+            return tags
+        logger.info(f"[Tags] {self.primary.name} extractor found no tags, falling back to {self.fallback.name}")
+        return await self.fallback.extract(question)
+
+
+_mode: str | None = None
+_llm_extractor: TagExtractor | None = None
+
+# One local model per tenant, trained on that tenant's knowledge base; least
+# recently served evicted beyond TAG_MODEL_MAX_TENANTS
+_local_extractors: OrderedDict[str, LocalTagExtractor] = OrderedDict()
+TAG_MODEL_MAX_TENANTS = int(os.getenv("TAG_MODEL_MAX_TENANTS", "64"))
+
+
+def init_tag_extractor(rows: list[dict], llm_extract: Callable[[str], Awaitable[list[str]]]) -> TagExtractor:
+    """
+    Set up the extractors selected by TAG_EXTRACTOR. Called from `prewarm`
+    with the default tenant's knowledge base, which its local model is
+    trained on; other tenants' models are trained by their first call.
+      - local      offline lexicon + model (default)
+      - llm        OpenAI gpt-4o-mini only
+      - local+llm  local, falling back to OpenAI when it finds no tags
+    OpenAI results are memoized on disk (see tag_memo.py) unless TAG_MEMO=false.
+    Returns the default tenant's extractor.
+    """
+    global _mode, _llm_extractor
+    _mode = os.getenv("TAG_EXTRACTOR", "local").lower()
+    _llm_extractor = init_tag_memo(LLMTagExtractor(llm_extract)) if _mode in ("llm", "local+llm") else None
+    _local_extractors.clear()
+
+    # Always trained: it is also the fallback while the OpenAI circuit breaker is open
+    if rows:
+        start = time.perf_counter()
+        tenant_local_extractor(DEFAULT_TENANT.id).train(rows, generation=0)
+        logger.info(f"[Tags] Local tag extractor ready in {(time.perf_counter() - start) * 1000:.1f}ms")
+    return get_tag_extractor(DEFAULT_TENANT.id)
+
+
+def local_model_first() -> bool:
+    """Whether TAG_EXTRACTOR tries the local model first (so `prewarm` should train it on the knowledge base)."""
+    return os.getenv("TAG_EXTRACTOR", "local").lower() != "llm"
+
+
+def tenant_local_extractor(tenant_id: str) -> LocalTagExtractor:
+    """The local model of `tenant_id`, created untrained (lexicon only) on first use."""
+    extractor = _local_extractors.get(tenant_id)
+    if extractor is None:
+        extractor = _local_extractors[tenant_id] = LocalTagExtractor()
+        while len(_local_extractors) > TAG_MODEL_MAX_TENANTS:
+            _local_extractors.popitem(last=False)
+    _local_extractors.move_to_end(tenant_id)
+    return extractor
+
+
+def get_tag_extractor(tenant_id: str | None = None) -> TagExtractor | None:
+    """The extractor for `tenant_id` (default: the current call's tenant), or None before `init_tag_extractor`."""
+    if _mode is None:
+        return None
+    if _mode == "llm":
+        return _llm_extractor
+    local = get_local_tag_extractor(tenant_id)
+    if _mode == "local+llm" and _llm_extractor is not None:
+        return FallbackTagExtractor(local, _llm_extractor)
+    return local
+
+
+def get_local_tag_extractor(tenant_id: str | None = None) -> LocalTagExtractor:
+    return tenant_local_extractor(tenant_id or current_tenant().id)
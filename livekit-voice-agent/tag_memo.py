@@ -0,0 +1,253 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from kb_cache import normalize_question
+from kb_index import STOPWORDS
+
+if TYPE_CHECKING:
+    from tag_extractor import TagExtractor
+
+logger = logging.getLogger("priya-salon-assistant")
+
+# Stopwords that still decide the answer: "where is the salon" and "when is the
+# salon open" must not share tags, nor "do you do nails" and "don't you do nails"
+_MEANINGFUL = frozenset("""
+what which who whom when where why how
+no nor not don t
+before after more most only
+""".split())
+MEMO_STOPWORDS = STOPWORDS - _MEANINGFUL
+
+# gpt-4o-mini: ~300 prompt tokens at $0.15/1M + ~20 completion tokens at $0.60/1M
+DEFAULT_COST_PER_CALL = 0.000057
+
+
+def memo_key(question: str) -> str:
+    """Normalize and drop filler stopwords: "Where is the salon?" -> "where salon"."""
+    words = normalize_question(question).split()
+    return " ".join(w for w in words if w not in MEMO_STOPWORDS) or " ".join(words)
+
+
+class TagStore:
+    """
+    SQLite-backed tag memo shared by every job process on the host.
+    WAL mode lets several worker processes read while one writes. Lookups
+    and writes run in worker threads, so the connection is shared under a lock.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS tag_memo (
+                 key TEXT NOT NULL,
+                 extractor TEXT NOT NULL,
+                 tags TEXT NOT NULL,
+                 created_at REAL NOT NULL,
+                 PRIMARY KEY (key, extractor)
+               )"""
+        )
+        self._conn.commit()
+
+    def get(self, key: str, extractor: str) -> list[str] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT tags FROM tag_memo WHERE key = ? AND extractor = ?", (key, extractor)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_many(self, items: list[tuple[str, str, list[str]]]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tag_memo (key, extractor, tags, created_at) VALUES (?, ?, ?, ?)",
+                [(key, extractor, json.dumps(tags), now) for key, extractor, tags in items],
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class MemoizedTagExtractor:
+    """
+    Memoizes another extractor (normally the OpenAI one) on `memo_key`.
+
+    Lookups check a bounded in-memory LRU, then the on-disk store. New
+    results are written behind: they are queued and flushed to disk in a
+    background batch, so the turn never waits on a disk write. Empty results
+    are not memoized, since the LLM extractor returns [] on API errors.
+    """
+
+    def __init__(
+        self,
+        inner: "TagExtractor",
+        store: TagStore | None,
+        max_entries: int = 2048,
+        flush_interval: float = 2.0,
+        cost_per_call: float = DEFAULT_COST_PER_CALL,
+    ) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.store = store
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self.cost_per_call = cost_per_call
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lru: OrderedDict[str, list[str]] = OrderedDict()
+        self._pending: list[tuple[str, str, list[str]]] = []
+        self._flush_task: asyncio.Task | None = None
+
+    def _remember(self, key: str, tags: list[str]) -> None:
+        self._lru[key] = tags
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    async def extract(self, question: str) -> list[str]:
+        key = memo_key(question)
+
+        tags = self._lru.get(key)
+        if tags is not None:
+            self._lru.move_to_end(key)
+            self.memory_hits += 1
+            return tags
+
+        if self.store is not None:
+            tags = await asyncio.to_thread(self.store.get, key, self.name)
+            if tags is not None:
+                self.disk_hits += 1
+                self._remember(key, tags)
+                return tags
+
+        self.misses += 1
+        tags = await self.inner.extract(question)
+        if tags:
+            self._remember(key, tags)
+            self._schedule_write(key, tags)
+        return tags
+
+    def _schedule_write(self, key: str, tags: list[str]) -> None:
+        if self.store is None:
+            return
+        self._pending.append((key, self.name, tags))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Write queued results to disk. Also registered as a job shutdown callback."""
+        if self.store is None or not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        try:
+            await asyncio.to_thread(self.store.put_many, pending)
+        except Exception as e:
+            logger.warning(f"[Tag Memo] Failed to persist {len(pending)} entries: {e}")
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "saved_calls": hits,
+            "saved_usd": round(hits * self.cost_per_call, 4),
+        }
+
+
+_memo: MemoizedTagExtractor | None = None
+
+
+def open_tag_store() -> TagStore | None:
+    path = os.getenv("TAG_MEMO_PATH", os.path.join(tempfile.gettempdir(), "priya_tag_memo.sqlite3"))
+    try:
+        return TagStore(path)
+    except Exception as e:
+        logger.warning(f"[Tag Memo] Could not open {path}, memoizing in memory only: {e}")
+        return None
+
+
+def init_tag_memo(inner: "TagExtractor") -> "TagExtractor":
+    """Wrap `inner` in the process-wide memo unless TAG_MEMO is disabled."""
+    global _memo
+    if os.getenv("TAG_MEMO", "true").lower() != "true":
+        return inner
+    _memo = MemoizedTagExtractor(
+        inner,
+        open_tag_store(),
+        max_entries=int(os.getenv("TAG_MEMO_MAX_ENTRIES", "2048")),
+        cost_per_call=float(os.getenv("TAG_LLM_COST_PER_CALL", str(DEFAULT_COST_PER_CALL))),
+    )
+    return _memo
+
+
+def get_tag_memo() -> MemoizedTagExtractor | None:
+    return _memo
+
+
+async def warm_from_help_requests(extractor: MemoizedTagExtractor, api_base_url: str, limit: int) -> int:
+    """Run historical help request questions through the extractor so their tags are on disk."""
+    from http_client import KB_SEARCH, get_http_client
+
+    client = get_http_client()
+    warmed, offset, page_size = 0, 0, 100
+    while offset < limit:
+        response = await client.get(
+            f"{api_base_url}/api/help-requests",
+            endpoint=KB_SEARCH,
+            params={"limit": min(page_size, limit - offset), "offset": offset},
+        )
+        response.raise_for_status()
+        requests = response.json().get("data", [])
+        if not requests:
+            break
+        for request in requests:
+            misses = extractor.misses
+            await extractor.extract(request["question"])
+            warmed += extractor.misses - misses
+        offset += len(requests)
+
+    await extractor.flush()
+    await client.aclose()
+    return warmed
+
+
+if __name__ == "__main__":
+    # Warm the on-disk memo from past escalations:
+    #   uv run python tag_memo.py --limit 1000
+    from dotenv import load_dotenv
+
+    load_dotenv(".env.local")
+
+    import tool
+    from tag_extractor import LLMTagExtractor
+
+    parser = argparse.ArgumentParser(description="Warm the tag memo from the help_requests table")
+    parser.add_argument("--limit", type=int, default=1000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    memo = MemoizedTagExtractor(LLMTagExtractor(tool.extract_query_tags_llm), open_tag_store(), flush_interval=0)
+    count = asyncio.run(warm_from_help_requests(memo, tool.API_BASE_URL, args.limit))
+    print(f"Warmed {count} new questions, {memo.stats()}")
@@ -0,0 +1,204 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+import pytz
+
+logger = logging.getLogger("priya-salon-assistant")
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# Header the backend uses to scope every knowledge base and help request call
+TENANT_HEADER = "X-Tenant-Id"
+
+# SIP participant attribute holding the number the caller dialed
+SIP_DIALED_NUMBER = "sip.trunkPhoneNumber"
+
+
+class TenantUnavailableError(Exception):
+    """The tenant of a call could not be determined: the backend did not answer, or no caller joined."""
+
+
+@dataclass(frozen=True)
+class Tenant:
+    """
+    One salon hosted on the worker fleet: its persona, services and opening
+    hours (by weekday, Monday = 0, None = closed). Frozen and hashable so
+    rendered prompts can be cached per tenant.
+    """
+    id: str
+    slug: str
+    business_name: str
+    assistant_name: str
+    services: tuple[str, ...]
+    timezone: str
+    business_hours: tuple[tuple[int, int] | None, ...]
+    phone_numbers: tuple[str, ...] = ()
+
+    @property
+    def tz(self):
+        return pytz.timezone(self.timezone)
+
+    @classmethod
+    def from_row(cls, row: dict) -> "Tenant":
+        """Build from a /api/tenants response row (business_hours keyed "mon".."sun")."""
+        hours = row.get("business_hours") or {}
+        return cls(
+            id=row["id"],
+            slug=row["slug"],
+            business_name=row["business_name"],
+            assistant_name=row.get("assistant_name") or "Priya",
+            services=tuple(row.get("services") or ()),
+            timezone=row.get("timezone") or "Asia/Kolkata",
+            business_hours=tuple(tuple(hours[day]) if hours.get(day) else None for day in WEEKDAYS),
+            phone_numbers=tuple(row.get("phone_numbers") or ()),
+        )
+
+
+# Seeded by backend migration 010; serves calls no other tenant claims
+DEFAULT_TENANT = Tenant(
+    id=os.getenv("DEFAULT_TENANT_ID", "00000000-0000-0000-0000-000000000001"),
+    slug="priya-beauty-lounge",
+    business_name="PRIYA'S BEAUTY LOUNGE",
+    assistant_name="Priya",
+    services=(
+        "Hair Services",
+        "Makeup Services",
+        "Skin Care",
+        "Nail Services",
+        "Bridal packages and Henna/Mehndi",
+    ),
+    timezone="Asia/Kolkata",
+    business_hours=(None, (10, 19), (10, 19), (10, 19), (10, 19), (9, 20), (10, 18)),
+)
+
+# Tenant of the call being handled; set at the top of `entrypoint` so tool calls inherit it
+_current_tenant: contextvars.ContextVar[Tenant] = contextvars.ContextVar("tenant", default=DEFAULT_TENANT)
+
+
+def current_tenant() -> Tenant:
+    return _current_tenant.get()
+
+
+def set_current_tenant(tenant: Tenant) -> None:
+    _current_tenant.set(tenant)
+
+
+def tenant_headers(tenant_id: str | None = None) -> dict:
+    """Backend request headers scoping the call to `tenant_id` (default: the current tenant)."""
+    return {TENANT_HEADER: tenant_id or current_tenant().id}
+
+
+async def call_routing(ctx, participant_timeout: float = 15.0) -> dict:
+    """
+    What identifies the tenant of a job: a "tenant_id" in the dispatch or room
+    metadata (set by the dispatch rule), otherwise the number the SIP caller
+    dialed. Waiting for the SIP participant connects to the room, so it is
+    only done when the metadata does not name a tenant, and for at most
+    `participant_timeout` seconds (then TenantUnavailableError).
+    """
+    for metadata in (ctx.job.metadata, ctx.job.room.metadata):
+        try:
+            tenant_id = json.loads(metadata).get("tenant_id") if metadata else None
+        except (ValueError, AttributeError):
+            tenant_id = None
+        if tenant_id:
+            return {"tenant_id": tenant_id}
+
+    await ctx.connect()
+    try:
+        participant = await asyncio.wait_for(ctx.wait_for_participant(), participant_timeout)
+    except asyncio.TimeoutError:
+        raise TenantUnavailableError(f"no participant joined within {participant_timeout:g}s") from None
+    phone = (participant.attributes or {}).get(SIP_DIALED_NUMBER)
+    return {"phone": phone} if phone else {}
+
+
+class TenantDirectory:
+    """
+    Process-wide cache of resolved tenants, keyed by tenant id/slug or dialed
+    number and kept for `ttl` seconds, so only the first call of a tenant on
+    a worker pays for the backend lookup.
+
+    Only a call the backend has no tenant for (404) is served as
+    DEFAULT_TENANT. A failed lookup is retried `attempts` times with a
+    `timeout` each and then raises TenantUnavailableError: answering as the
+    default salon would file the caller's help requests under the wrong
+    tenant.
+    """
+
+    def __init__(self, ttl: float = 300.0, attempts: int = 3, timeout: float = 2.0) -> None:
+        self.ttl = ttl
+        self.attempts = attempts
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[tuple, tuple[float, Tenant]] = {}
+
+    async def resolve(
+        self,
+        fetch: Callable[..., Awaitable[dict | None]],
+        tenant_id: str | None = None,
+        phone: str | None = None,
+    ) -> Tenant:
+        """
+        Tenant for a call. `fetch` (an async callable taking tenant_id and
+        phone) returns the backend's tenant row, None if the backend has no
+        tenant for it, and raises if the backend could not be asked.
+        """
+        if not tenant_id and not phone:
+            return DEFAULT_TENANT
+
+        key = (tenant_id, phone)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        for attempt in range(1, self.attempts + 1):
+            try:
+                row = await asyncio.wait_for(fetch(tenant_id=tenant_id, phone=phone), self.timeout)
+                break
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                logger.warning(f"[Tenant] Resolving {key} failed (attempt {attempt}/{self.attempts}): {error}")
+                if attempt < self.attempts:
+                    await asyncio.sleep(0.2 * attempt)
+        else:
+            raise TenantUnavailableError(f"resolving {key} failed {self.attempts} times: {error}")
+        if row is None:
+            logger.warning(f"[Tenant] No tenant for {key}, using default tenant")
+            return DEFAULT_TENANT
+
+        tenant = Tenant.from_row(row)
+        self._entries[key] = (time.monotonic(), tenant)
+        return tenant
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_directory: TenantDirectory | None = None
+
+
+def init_tenant_directory() -> TenantDirectory:
+    """Create the process-wide directory. Called from `prewarm`."""
+    global _directory
+    _directory = TenantDirectory(
+        ttl=float(os.getenv("TENANT_CACHE_TTL", "300")),
+        attempts=int(os.getenv("TENANT_RESOLVE_ATTEMPTS", "3")),
+        timeout=float(os.getenv("TENANT_RESOLVE_TIMEOUT", "2")),
+    )
+    return _directory
+
+
+def get_tenant_directory() -> TenantDirectory:
+    if _directory is None:
+        return init_tenant_directory()
+    return _directory
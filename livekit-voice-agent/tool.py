@@ -1,18 +1,116 @@
+import asyncio
 import logging
-import httpx
 import os
 import json
 from livekit import api
 from livekit.agents import function_tool, RunContext, get_job_context
 
+from circuit_breaker import CircuitOpenError, backend_breaker, openai_breaker
+from escalation_queue import PermanentDeliveryError, get_escalation_queue
+from http_client import HELP_REQUEST, KB_SEARCH, TAG_EXTRACTION, get_http_client
+import kb_format
+from kb_cache import get_kb_cache, normalize_question
+from kb_index import fetch_kb_snapshot, get_kb_index, sync_params, tenant_kb_index
+from kb_prefetch import get_prefetcher
+from single_flight import SingleFlight
+from tag_extractor import get_local_tag_extractor, get_tag_extractor, tenant_local_extractor
+from tenant import current_tenant, tenant_headers
+from tracing import annotate_span, traced
+
 logger = logging.getLogger("priya-salon-assistant")
 
+# Fire-and-forget tasks (kept referenced so they are not garbage collected)
+_background_tasks: set[asyncio.Task] = set()
+
+
+async def wait_background_tasks(timeout: float) -> None:
+    """Wait up to `timeout` seconds for the fire-and-forget requests still running (e.g. /usage POSTs)."""
+    if _background_tasks:
+        await asyncio.wait(set(_background_tasks), timeout=timeout)
+
+
+# Concurrent identical lookups (many callers asking the same thing at once)
+# share one in-flight backend search / tag extraction
+kb_search_flight = SingleFlight("kb_search")
+tag_extraction_flight = SingleFlight("tag_extraction")
+
 # API configuration
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:3000")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+
+# Speculative mode runs tag extraction in parallel with the tier 1 search,
+# bounded by an overall latency budget (seconds)
+KB_SPECULATIVE = os.getenv("KB_SPECULATIVE", "false").lower() in ("1", "true", "yes")
+KB_LATENCY_BUDGET = float(os.getenv("KB_LATENCY_BUDGET", "3.0"))
+
+# Most questions the backend batch search endpoint accepts per request
+KB_BATCH_MAX_QUERIES = 10
 
 
+@traced("kb.tag_extraction")
 async def extract_query_tags(question: str) -> list[str]:
+    """
+    Extract semantic tags from a customer question with the extractor chosen
+    in prewarm (local classifier by default, see tag_extractor.py), using the
+    current tenant's local model. Falls back to the LLM extractor if prewarm
+    did not run.
+    """
+    tenant_id = current_tenant().id
+    key = (tenant_id, normalize_question(question))
+    extractor = get_tag_extractor(tenant_id)
+    if extractor is None:
+        return await tag_extraction_flight.do(key, lambda: extract_query_tags_llm(question))
+
+    refresh_tag_model(tenant_id)
+    if openai_breaker.is_open and extractor.name != "local":
+        # Degraded mode: OpenAI is failing or slow, use the offline classifier instead
+        extractor = get_local_tag_extractor(tenant_id)
+        key = ("local", *key)
+
+    annotate_span(extractor=extractor.name, coalesced=key in tag_extraction_flight)
+    tags = await tag_extraction_flight.do(key, lambda: extractor.extract(question))
+    annotate_span(tags=len(tags))
+    logger.info(f"Extracted tags ({extractor.name}) for '{question}': {tags}")
+    return tags
+
+
+# Local tag model trainings in flight, per tenant
+_tag_model_trainings: dict[str, asyncio.Task] = {}
+
+
+def refresh_tag_model(tenant_id: str) -> None:
+    """
+    Retrain the tenant's local tag model in the background if it was never
+    trained or its knowledge base changed since (its KB cache was
+    invalidated by a version change or a pushed change). Trains from the
+    tenant's local index when it is loaded, otherwise from a full snapshot.
+    Until then the model it has (or the lexicon alone) keeps serving.
+    """
+    generation = get_kb_cache(tenant_id).generation
+    if tenant_local_extractor(tenant_id).generation == generation:
+        return
+    running = _tag_model_trainings.get(tenant_id)
+    if running is not None and not running.done():
+        return
+
+    async def _train() -> None:
+        index = get_kb_index(tenant_id)
+        if index is not None:
+            rows = index.rows()
+        else:
+            snapshot = await asyncio.to_thread(
+                fetch_kb_snapshot, API_BASE_URL, tenant_id, float(os.getenv("KB_SNAPSHOT_TIMEOUT", "2"))
+            )
+            if snapshot is None:
+                return  # retried by the tenant's next extraction
+            rows = snapshot.get("data", [])
+        tenant_local_extractor(tenant_id).train(rows, generation)
+
+    _tag_model_trainings[tenant_id] = asyncio.create_task(_train())
+
+
+async def extract_query_tags_llm(question: str) -> list[str]:
     """
     Extract semantic tags from a customer question using LLM.
     Returns a list of tags representing the intent/entities in the question.
@@ -27,19 +125,19 @@ async def extract_query_tags(question: str) -> list[str]:
         return []
 
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {OPENAI_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "gpt-4o-mini",
-                    "messages": [
-                        {
-                            "role": "developer",
-                            "content": """You are a semantic tag extractor for a salon/spa business knowledge base.
+        response = await openai_breaker.call(lambda: get_http_client().post(
+            f"{OPENAI_BASE_URL}/chat/completions",
+            endpoint=TAG_EXTRACTION,
+            headers={
+                "Authorization": f"Bearer {OPENAI_API_KEY}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": "gpt-4o-mini",
+                "messages": [
+                    {
+                        "role": "developer",
+                        "content": """You are a semantic tag extractor for a salon/spa business knowledge base.
 Extract semantic tags from customer questions that represent the intent and entities.
 
 Common tag categories:
@@ -54,16 +152,16 @@ Common tag categories:
 
 Return ONLY a JSON array of lowercase tags (3-6 tags), no explanation.
 Example: ["location", "address", "directions", "place"]"""
-                        },
-                        {
-                            "role": "user",
-                            "content": f"Extract tags from: {question}"
-                        }
-                    ],
-                    "temperature": 0.3,
-                    "max_tokens": 50
-                }
-            )
+                    },
+                    {
+                        "role": "user",
+                        "content": f"Extract tags from: {question}"
+                    }
+                ],
+                "temperature": 0.3,
+                "max_tokens": 50
+            }
+        ), is_failure=lambda r: r.status_code >= 500 or r.status_code == 429)
 
         if response.status_code == 200:
             data = response.json()
@@ -85,152 +183,629 @@ Example: ["location", "address", "directions", "place"]"""
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse tags from OpenAI response: {e}")
         return []
+    except CircuitOpenError:
+        logger.info("OpenAI circuit open, skipping tag extraction")
+        return []
     except Exception as e:
         logger.error(f"Tag extraction failed: {e}")
         return []
 
 
+async def fetch_tenant(tenant_id: str | None = None, phone: str | None = None) -> dict | None:
+    """
+    Resolve a call's tenant (by id/slug or dialed number) via the backend.
+    None if the backend has no tenant for it (404); raises on any other failure.
+    """
+    params = {key: value for key, value in (("tenant_id", tenant_id), ("phone", phone)) if value}
+    response = await backend_breaker.call(
+        lambda: get_http_client().get(
+            f"{API_BASE_URL}/api/tenants/resolve",
+            endpoint=KB_SEARCH,
+            params=params
+        ),
+        is_failure=lambda r: r.status_code >= 500
+    )
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json().get("data")
+
+
+async def fetch_kb_version(tenant_id: str | None = None) -> str | None:
+    """Return the tenant's backend knowledge base version (changes on every create/update)."""
+    response = await get_http_client().get(
+        f"{API_BASE_URL}/api/knowledge-base/version",
+        endpoint=KB_SEARCH,
+        headers=tenant_headers(tenant_id)
+    )
+    if response.status_code != 200:
+        logger.warning(f"Knowledge base version API error: {response.status_code}")
+        return None
+    return response.json().get("data", {}).get("version")
+
+
+async def sync_kb_index(tenant_id: str | None = None) -> None:
+    """
+    Fetch the tenant's knowledge base rows changed since the last sync and
+    apply them to its local index (a full load if the index is not loaded yet).
+    """
+    tenant_id = tenant_id or current_tenant().id
+    index = tenant_kb_index(tenant_id)
+
+    response = await get_http_client().get(
+        f"{API_BASE_URL}/api/knowledge-base/sync",
+        endpoint=KB_SEARCH,
+        params=sync_params(index),
+        headers=tenant_headers(tenant_id)
+    )
+    if response.status_code != 200:
+        logger.warning(f"Knowledge base sync API error: {response.status_code}")
+        return
+
+    data = response.json()
+    changed = index.apply_changes(data.get("data", []), data.get("server_time"))
+    if changed:
+        logger.info(f"[KB Index] Applied {changed} changed entries ({len(index)} active)")
+        # The tenant's local tag model learns from the same rows
+        tenant_local_extractor(tenant_id).train(index.rows(), get_kb_cache(tenant_id).generation)
+
+
+# Pushed-change index syncs in flight, per tenant; each runs after the previous one
+_kb_syncs: dict[str, asyncio.Task] = {}
+
+
+def apply_kb_change(tenant_id: str) -> None:
+    """
+    A tenant's knowledge base changed (pushed by the backend): drop its cached
+    answers now, and pull the changed rows into its local index if loaded,
+    instead of waiting for the next version poll and delta sync.
+    """
+    get_kb_cache(tenant_id).invalidate(reason="pushed change")
+    if get_kb_index(tenant_id) is None:
+        return
+
+    previous = _kb_syncs.get(tenant_id)
+
+    async def _sync() -> None:
+        if previous is not None:
+            # A sync that started before this change may have missed it
+            await asyncio.gather(previous, return_exceptions=True)
+        try:
+            await sync_kb_index(tenant_id)
+        except Exception as e:
+            logger.warning(f"[KB Index] Pushed sync for tenant {tenant_id} failed: {e}")
+
+    task = asyncio.create_task(_sync())
+    _kb_syncs[tenant_id] = task
+    task.add_done_callback(lambda t: _kb_syncs.pop(tenant_id) if _kb_syncs.get(tenant_id) is t else None)
+
+
+async def fetch_help_request(request_id: str, tenant_id: str | None = None) -> dict | None:
+    """Return a help request of the tenant (with the supervisor's answer, once resolved), or None."""
+    response = await get_http_client().get(
+        f"{API_BASE_URL}/api/help-requests/{request_id}",
+        endpoint=HELP_REQUEST,
+        headers=tenant_headers(tenant_id)
+    )
+    if response.status_code != 200:
+        logger.warning(f"Help request API error: {response.status_code}")
+        return None
+    return response.json().get("data")
+
+
+async def _record_kb_usage(tenant_id: str, entry_id: str) -> None:
+    try:
+        await get_http_client().post(
+            f"{API_BASE_URL}/api/knowledge-base/{entry_id}/usage",
+            endpoint=KB_SEARCH,
+            headers=tenant_headers(tenant_id)
+        )
+    except Exception as e:
+        logger.warning(f"Failed to record knowledge base usage for {entry_id}: {e}")
+
+
+def _record_local_use(index, tenant_id: str, entry_id: str) -> None:
+    """Keep times_used statistics accurate for local index hits without blocking the turn."""
+    index.record_use(entry_id)
+    task = asyncio.create_task(_record_kb_usage(tenant_id, entry_id))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+@traced("kb.search")
+async def search_knowledge_base(question: str, extracted_tags: list[str] | None = None) -> list[dict] | None:
+    """
+    Search the current tenant's knowledge base. Uses its in-process index
+    when it is loaded, otherwise the backend search endpoint with repeated
+    questions served from the tenant's KB cache. Returns the list of matches
+    (possibly empty), or None if the API call failed.
+    """
+    tenant_id = current_tenant().id
+    annotate_span(tier=2 if extracted_tags is not None else 1)
+    index = get_kb_index(tenant_id)
+    if index is not None:
+        annotate_span(source="local_index")
+        results = index.search(question, extracted_tags=extracted_tags)[:5]
+        if results:
+            _record_local_use(index, tenant_id, results[0]["id"])
+        return results
+
+    cache = get_kb_cache(tenant_id)
+    cached = cache.get(question, extracted_tags)
+    if cached is not None:
+        annotate_span(source="cache")
+        logger.info(f"[KB Cache] Hit for: {question} (tags: {extracted_tags or []})")
+        return cached
+
+    key = (tenant_id, *cache.make_key(question, extracted_tags))
+    annotate_span(source="backend", coalesced=key in kb_search_flight)
+    try:
+        return await kb_search_flight.do(key, lambda: _fetch_kb_search(tenant_id, question, extracted_tags))
+    except CircuitOpenError:
+        # Degraded mode: answer from an expired cache entry rather than not at all
+        stale = cache.get(question, extracted_tags, allow_stale=True)
+        if stale is None:
+            raise
+        annotate_span(source="stale_cache")
+        logger.info(f"[KB Cache] Backend circuit open, serving stale results for: {question}")
+        return stale
+
+
+@traced("kb.vector_search")
+async def search_knowledge_base_vectors(question: str) -> list[dict] | None:
+    """
+    Search the current tenant's knowledge base by embedding similarity (see
+    kb_embeddings.py): catches paraphrases that share few words with the
+    stored question, without a round trip. Returns the list of matches
+    (possibly empty), or None if the tenant has no loaded vector index.
+    """
+    tenant_id = current_tenant().id
+    index = get_kb_index(tenant_id)
+    if index is None or index.vectors is None:
+        return None
+
+    results = index.vectors.search(question)
+    annotate_span(results=len(results))
+    if results:
+        _record_local_use(index, tenant_id, results[0]["id"])
+    return results
+
+
+async def _fetch_kb_search(tenant_id: str, question: str, extracted_tags: list[str] | None) -> list[dict] | None:
+    generation = get_kb_cache(tenant_id).generation
+    params = {"q": question}
+    if extracted_tags:
+        params["extracted_tags"] = ",".join(extracted_tags)
+
+    response = await backend_breaker.call(
+        lambda: get_http_client().get(
+            f"{API_BASE_URL}/api/knowledge-base/search",
+            endpoint=KB_SEARCH,
+            params=params,
+            headers=tenant_headers(tenant_id)
+        ),
+        is_failure=lambda r: r.status_code >= 500
+    )
+
+    if response.status_code != 200:
+        logger.warning(f"Knowledge base API error: {response.status_code}")
+        return None
+
+    data = response.json()
+    if data.get("success") and data.get("found") and data.get("data"):
+        results = data["data"][:5]  # Top 5 results for the LLM to analyze
+    else:
+        results = []
+
+    get_kb_cache(tenant_id).put(question, extracted_tags, results, generation)
+    return results
+
+
+@traced("kb.search_batch")
+async def search_knowledge_base_batch(queries: list[tuple[str, list[str] | None]]) -> list[list[dict] | None]:
+    """
+    Search the current tenant's knowledge base for several (question,
+    extracted_tags) pairs. Uses its in-process index when it is loaded,
+    otherwise serves what it can from its KB cache and sends the rest to the backend batch endpoint, one
+    request (one SQL round trip) per KB_BATCH_MAX_QUERIES questions. Returns
+    one entry per query: its matches, or None if that lookup failed.
+    """
+    tenant_id = current_tenant().id
+    annotate_span(queries=len(queries))
+    if get_kb_index(tenant_id) is not None:
+        return [await search_knowledge_base(question, tags) for question, tags in queries]
+
+    cache = get_kb_cache(tenant_id)
+    results = [cache.get(question, tags) for question, tags in queries]
+    misses = [i for i, cached in enumerate(results) if cached is None]
+    annotate_span(cache_hits=len(queries) - len(misses))
+
+    for start in range(0, len(misses), KB_BATCH_MAX_QUERIES):
+        chunk = misses[start:start + KB_BATCH_MAX_QUERIES]
+        try:
+            fetched = await _fetch_kb_search_batch(tenant_id, [queries[i] for i in chunk])
+        except CircuitOpenError:
+            # Degraded mode: expired cache entries where there are any
+            fetched = [cache.get(*queries[i], allow_stale=True) for i in chunk]
+        for i, matches in zip(chunk, fetched):
+            results[i] = matches
+    return results
+
+
+async def _fetch_kb_search_batch(tenant_id: str, queries: list[tuple[str, list[str] | None]]) -> list[list[dict] | None]:
+    generation = get_kb_cache(tenant_id).generation
+    body = {"queries": [{"q": question, "extracted_tags": tags} if tags else {"q": question} for question, tags in queries]}
+
+    response = await backend_breaker.call(
+        lambda: get_http_client().post(
+            f"{API_BASE_URL}/api/knowledge-base/search/batch",
+            endpoint=KB_SEARCH,
+            json=body,
+            headers=tenant_headers(tenant_id)
+        ),
+        is_failure=lambda r: r.status_code >= 500
+    )
+
+    if response.status_code != 200:
+        logger.warning(f"Knowledge base batch API error: {response.status_code}")
+        return [None] * len(queries)
+
+    results = []
+    for (question, tags), item in zip(queries, response.json().get("data", [])):
+        matches = item["data"][:5] if item.get("found") and item.get("data") else []
+        get_kb_cache(tenant_id).put(question, tags, matches, generation)
+        results.append(matches)
+    return results
+
+
+def format_kb_results(results: list[dict]) -> tuple[str, float, list[dict]]:
+    """
+    Determine the confidence tier from the top score and keep results above the tier threshold.
+    Returns (tier, top_score, formatted_results).
+    """
+    top_score = float(results[0].get("similarity_score", 0))
+
+    # Determine confidence tier based on top score
+    if top_score >= 0.7:
+        tier = "high"
+        threshold = 0.7
+    elif top_score >= 0.4:
+        tier = "medium"
+        threshold = 0.4
+    else:
+        tier = "low"
+        threshold = 0.3
+
+    # Format results for LLM with relevant metadata
+    formatted_results = []
+    for r in results:
+        score = float(r.get("similarity_score", 0))
+        if score >= threshold:
+            formatted_results.append({
+                "question": r.get("question_pattern", ""),
+                "answer": r.get("answer", ""),
+                "similarity_score": round(score, 2),
+                "has_tags": r.get("tags") is not None and len(r.get("tags", [])) > 0,
+                "exact_tag_match": r.get("exact_tag_match", False)
+            })
+
+    return tier, top_score, formatted_results
+
+
+def kb_response(formatted_results: list[dict], tier: str) -> str:
+    """Structured JSON returned to the LLM when the knowledge base has qualifying results (see kb_format.py)."""
+    return kb_format.dumps(kb_format.kb_payload(formatted_results, tier))
+
+
+async def _check_sequential(question: str) -> str:
+    """
+    Tier 1 search, then the embedding search and, if that finds nothing
+    either, tag extraction and a tier 2 search, only when tier 1 found
+    nothing usable.
+    """
+    # First attempt: Direct question matching
+    results = await search_knowledge_base(question)
+    if results is None:
+        return "not_found"
+
+    if results:
+        tier, top_score, formatted_results = format_kb_results(results)
+
+        # Return structured JSON if we have qualifying results
+        if formatted_results:
+            logger.info(f"[Tier 1] Returning {len(formatted_results)} results (tier: {tier}, top score: {top_score:.3f})")
+            return kb_response(formatted_results, tier)
+        logger.info(f"[Tier 1] Knowledge base match but low confidence: {top_score:.3f}, trying semantic tag matching...")
+    else:
+        logger.info(f"[Tier 1] No knowledge base match for: {question}, trying semantic tag matching...")
+
+    # Embedding similarity, when enabled: in-process, so tried before the tag extraction round trip
+    results = await search_knowledge_base_vectors(question)
+    if results:
+        tier, top_score, formatted_results = format_kb_results(results)
+        if formatted_results:
+            logger.info(f"[Embeddings] Returning {len(formatted_results)} results (tier: {tier}, top score: {top_score:.3f})")
+            return kb_response(formatted_results, tier)
+
+    # Second attempt: Semantic tag-based matching
+    extracted_tags = await extract_query_tags(question)
+
+    if not extracted_tags:
+        logger.info(f"[Tier 2] No tags extracted, skipping semantic matching")
+        return "not_found"
+
+    logger.info(f"[Tier 2] Retrying with extracted tags: {extracted_tags}")
+    results = await search_knowledge_base(question, extracted_tags)
+
+    if not results:
+        logger.info(f"[Tier 2] No tag-based match found")
+        return "not_found"
+
+    tier, top_score, formatted_results = format_kb_results(results)
+    if formatted_results:
+        logger.info(f"[Tier 2] Returning {len(formatted_results)} results via tags (tier: {tier}, top score: {top_score:.3f})")
+        return kb_response(formatted_results, tier)
+
+    logger.info(f"[Tier 2] Tag-based match but low confidence: {top_score:.3f}")
+    return "not_found"
+
+
+def _completed_result(task: asyncio.Task):
+    """Result of a finished task, or None if it is still running or failed."""
+    if not task.done() or task.cancelled():
+        return None
+    if task.exception() is not None:
+        logger.warning(f"Knowledge base lookup failed: {task.exception()}")
+        return None
+    return task.result()
+
+
+async def _check_speculative(question: str, budget: float) -> str:
+    """
+    Start tag extraction alongside the tier 1 search instead of after it.
+
+    A high-confidence tier 1 result is returned straight away and the
+    extraction is cancelled, as is a high-confidence embedding match (looked
+    for as soon as tier 1 has none). Otherwise the tier 2 search starts as
+    soon as the tags arrive, and the best of the tiers is returned. Whatever
+    has been found when `budget` seconds run out is returned instead of
+    waiting longer.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + budget
+    best: tuple[float, str] | None = None  # (top score, response)
+
+    def consider(label: str, results: list[dict] | None) -> str | None:
+        """Keep the best qualifying results; the response if they end the lookup (high confidence before tier 2)."""
+        nonlocal best
+        if not results:
+            return None
+
+        tier, top_score, formatted_results = format_kb_results(results)
+        if not formatted_results:
+            logger.info(f"[{label}] Knowledge base match but low confidence: {top_score:.3f}")
+            return None
+
+        if label != "Tier 2" and tier == "high":
+            logger.info(f"[{label}] Returning {len(formatted_results)} results (tier: {tier}, top score: {top_score:.3f}), cancelling tag extraction")
+            return kb_response(formatted_results, tier)
+
+        if best is None or top_score > best[0]:
+            logger.info(f"[{label}] Best so far: {len(formatted_results)} results (tier: {tier}, top score: {top_score:.3f})")
+            best = (top_score, kb_response(formatted_results, tier))
+        return None
+
+    tier1_task = asyncio.create_task(search_knowledge_base(question))
+    tags_task = asyncio.create_task(extract_query_tags(question))
+    tier2_task: asyncio.Task | None = None
+    pending = {tier1_task, tags_task}
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=max(0.0, deadline - loop.time()),
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                logger.info(f"[Speculative] Latency budget ({budget:.1f}s) exhausted, returning best result so far")
+                break
+
+            for task in done:
+                if task is tags_task:
+                    extracted_tags = _completed_result(task)
+                    if extracted_tags:
+                        logger.info(f"[Tier 2] Searching with speculatively extracted tags: {extracted_tags}")
+                        tier2_task = asyncio.create_task(search_knowledge_base(question, extracted_tags))
+                        pending.add(tier2_task)
+                    else:
+                        logger.info(f"[Tier 2] No tags extracted, skipping semantic matching")
+                    continue
+
+                label = "Tier 1" if task is tier1_task else "Tier 2"
+                response = consider(label, _completed_result(task))
+                if response is None and task is tier1_task:
+                    # Embedding similarity, when enabled: in-process, so it does not wait for the tags
+                    response = consider("Embeddings", await search_knowledge_base_vectors(question))
+                if response is not None:
+                    return response
+
+        return best[1] if best is not None else "not_found"
+
+    finally:
+        for task in (tier1_task, tags_task, tier2_task):
+            if task is not None and not task.done():
+                task.cancel()
+
+
+async def lookup_knowledge_base(question: str) -> str:
+    """
+    The lookup behind check_knowledge_base: tier 1 (the tenant's local index
+    when loaded, else the backend search), the embedding search when
+    KB_EMBEDDINGS is on, then tag extraction and tier 2. Tag extraction runs
+    alongside tier 1 if KB_SPECULATIVE is set.
+    """
+    if KB_SPECULATIVE:
+        return await _check_speculative(question, KB_LATENCY_BUDGET)
+    return await _check_sequential(question)
+
+
+@traced("kb.prefetch")
+async def prefetch_knowledge_base(utterance: str) -> str:
+    """Lookup started from the caller's transcript before the LLM asks for it (see kb_prefetch.py)."""
+    return await lookup_knowledge_base(utterance)
+
+
 @function_tool
+@traced("tool.check_knowledge_base")
 async def check_knowledge_base(question: str) -> str:
     """
-    Search the knowledge base for answers to customer questions using two-tier matching:
-    1. First attempt: Direct question matching (fast)
-    2. Second attempt: Semantic tag-based matching (if first attempt fails)
-
-    Returns the answer if found, or "not_found" if no matching answer exists.
+    Search this salon's knowledge base for answers to customer questions:
+    1. Direct question matching against the stored questions (fast)
+    2. Similar-meaning matching for rephrased questions
+    3. Topic tag matching, if neither found a confident answer
+    The lookup may already have started from what the customer said, so pass
+    the question in the customer's own words.
+
+    Returns JSON with "results" and a "confidence_tier" (high, medium or low)
+    if something matches, or "not_found" if no matching answer exists.
     Use this BEFORE answering any question about services, pricing, hours, or policies.
     """
     try:
-        # First attempt: Direct question matching
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(
-                f"{API_BASE_URL}/api/knowledge-base/search",
-                params={"q": question}
-            )
+        prefetcher = get_prefetcher()
+        if prefetcher is not None:
+            prefetched = await prefetcher.take(question)
+            annotate_span(prefetched=prefetched is not None)
+            if prefetched is not None:
+                return prefetched
+        return await lookup_knowledge_base(question)
 
-        if response.status_code == 200:
-            data = response.json()
+    except Exception as e:
+        logger.error(f"Knowledge base search failed: {e}")
+        return "not_found"
+
+
+def _batch_answer(results: list[dict] | None) -> dict | None:
+    """Per-subquestion part of the batch response, or None if nothing qualifies."""
+    if not results:
+        return None
+    tier, top_score, formatted_results = format_kb_results(results)
+    if not formatted_results:
+        return None
+    return kb_format.kb_payload(formatted_results, tier)
 
-            # Check if we have results with good confidence
-            # API now returns array of results, return top 5 for LLM to analyze
-            if data.get("success") and data.get("found") and data.get("data") and len(data.get("data", [])) > 0:
-                results = data["data"][:5]  # Get top 5 results
-                top_score = float(results[0].get("similarity_score", 0))
-
-                # Determine confidence tier based on top score
-                if top_score >= 0.7:
-                    tier = "high"
-                    threshold = 0.7
-                elif top_score >= 0.4:
-                    tier = "medium"
-                    threshold = 0.4
-                else:
-                    tier = "low"
-                    threshold = 0.3
-
-                # Format results for LLM with relevant metadata
-                formatted_results = []
-                for r in results:
-                    score = float(r.get("similarity_score", 0))
-                    if score >= threshold:
-                        formatted_results.append({
-                            "question": r.get("question_pattern", ""),
-                            "answer": r.get("answer", ""),
-                            "similarity_score": round(score, 2),
-                            "has_tags": r.get("tags") is not None and len(r.get("tags", [])) > 0,
-                            "exact_tag_match": r.get("exact_tag_match", False)
-                        })
-
-                # Return structured JSON if we have qualifying results
-                if formatted_results:
-                    response = {
-                        "found": True,
-                        "count": len(formatted_results),
-                        "results": formatted_results,
-                        "confidence_tier": tier
-                    }
-                    logger.info(f"[Tier 1] Returning {len(formatted_results)} results (tier: {tier}, top score: {top_score:.3f})")
-                    return json.dumps(response)
-                else:
-                    logger.info(f"[Tier 1] Knowledge base match but low confidence: {top_score:.3f}, trying semantic tag matching...")
-            else:
-                logger.info(f"[Tier 1] No knowledge base match for: {question}, trying semantic tag matching...")
-
-            # Second attempt: Semantic tag-based matching
-            extracted_tags = await extract_query_tags(question)
-
-            if extracted_tags:
-                logger.info(f"[Tier 2] Retrying with extracted tags: {extracted_tags}")
-
-                async with httpx.AsyncClient(timeout=5.0) as client:
-                    response = await client.get(
-                        f"{API_BASE_URL}/api/knowledge-base/search",
-                        params={
-                            "q": question,
-                            "extracted_tags": ",".join(extracted_tags)
-                        }
-                    )
-
-                if response.status_code == 200:
-                    data = response.json()
-
-                    # API now returns array of results, return top 5 for LLM to analyze
-                    if data.get("success") and data.get("found") and data.get("data") and len(data.get("data", [])) > 0:
-                        results = data["data"][:5]  # Get top 5 results
-                        top_score = float(results[0].get("similarity_score", 0))
-
-                        # Determine confidence tier based on top score (lower thresholds for tag-based)
-                        if top_score >= 0.7:
-                            tier = "high"
-                            threshold = 0.7
-                        elif top_score >= 0.4:
-                            tier = "medium"
-                            threshold = 0.4
-                        else:
-                            tier = "low"
-                            threshold = 0.3
-
-                        # Format results for LLM with relevant metadata
-                        formatted_results = []
-                        for r in results:
-                            score = float(r.get("similarity_score", 0))
-                            if score >= threshold:
-                                formatted_results.append({
-                                    "question": r.get("question_pattern", ""),
-                                    "answer": r.get("answer", ""),
-                                    "similarity_score": round(score, 2),
-                                    "has_tags": r.get("tags") is not None and len(r.get("tags", [])) > 0,
-                                    "exact_tag_match": r.get("exact_tag_match", False)
-                                })
-
-                        # Return structured JSON if we have qualifying results
-                        if formatted_results:
-                            response = {
-                                "found": True,
-                                "count": len(formatted_results),
-                                "results": formatted_results,
-                                "confidence_tier": tier
-                            }
-                            logger.info(f"[Tier 2] Returning {len(formatted_results)} results via tags (tier: {tier}, top score: {top_score:.3f})")
-                            return json.dumps(response)
-                        else:
-                            logger.info(f"[Tier 2] Tag-based match but low confidence: {top_score:.3f}")
-                    else:
-                        logger.info(f"[Tier 2] No tag-based match found")
-            else:
-                logger.info(f"[Tier 2] No tags extracted, skipping semantic matching")
 
-            return "not_found"
+async def _check_batch(questions: list[str]) -> str:
+    """
+    Two-tier matching for several sub-questions: one batch search for all of
+    them, an embedding search for those tier 1 could not answer, then
+    concurrent tag extraction and one more batch search for what is left.
+    """
+    answers: dict[str, dict] = {}
+    retry = []
+    for question, results in zip(questions, await search_knowledge_base_batch([(q, None) for q in questions])):
+        answer = _batch_answer(results)
+        if answer is not None:
+            answers[question] = answer
+        elif results is not None:
+            retry.append(question)
+    logger.info(f"[Tier 1] Batch answered {len(answers)}/{len(questions)} sub-questions")
+
+    unanswered = []
+    for question in retry:
+        answer = _batch_answer(await search_knowledge_base_vectors(question))
+        if answer is not None:
+            answers[question] = answer
         else:
-            logger.warning(f"Knowledge base API error: {response.status_code}")
-            return "not_found"
+            unanswered.append(question)
+    if len(unanswered) < len(retry):
+        logger.info(f"[Embeddings] Batch answered {len(answers)}/{len(questions)} sub-questions")
+    retry = unanswered
+
+    if retry:
+        tag_lists = await asyncio.gather(*(extract_query_tags(q) for q in retry), return_exceptions=True)
+        tagged = [(q, tags) for q, tags in zip(retry, tag_lists) if tags and not isinstance(tags, BaseException)]
+        if tagged:
+            for (question, _), results in zip(tagged, await search_knowledge_base_batch(tagged)):
+                answer = _batch_answer(results)
+                if answer is not None:
+                    answers[question] = answer
+            logger.info(f"[Tier 2] Batch answered {len(answers)}/{len(questions)} sub-questions via tags")
+
+    return kb_format.dumps({
+        "found": bool(answers),
+        "answers": [{"question": q, **answers[q]} if q in answers else {"question": q, "found": False}
+                    for q in questions]
+    })
+
+
+@function_tool
+@traced("tool.check_knowledge_base_batch")
+async def check_knowledge_base_batch(questions: list[str]) -> str:
+    """
+    Search the knowledge base for several questions at once. Use this instead of
+    calling check_knowledge_base repeatedly when the customer asks more than one
+    thing in the same turn: split what they said into separate, self-contained
+    questions (e.g. "how much is a haircut and are you open Sunday" becomes
+    ["how much is a haircut", "are you open on Sunday"]).
+
+    Returns JSON with one entry per question in "answers", each with its own
+    "found", "results" and "confidence_tier".
+    """
+    subquestions = list(dict.fromkeys(q.strip() for q in questions if q and q.strip()))
+    if not subquestions:
+        return "not_found"
+
+    try:
+        return await _check_batch(subquestions)
 
     except Exception as e:
-        logger.error(f"Knowledge base search failed: {e}")
+        logger.error(f"Knowledge base batch search failed: {e}")
         return "not_found"
 
 
+def get_caller_phone(room) -> str | None:
+    """Phone number of the SIP caller in `room`, or None if there is no SIP participant yet."""
+    for participant in room.remote_participants.values():
+        if hasattr(participant, 'identity') and participant.identity.startswith("sip_"):
+            # Try to extract phone from identity or metadata
+            return participant.identity.replace("sip_", "") or None
+    return None
+
+
+async def post_help_requests(payloads: list[dict]) -> None:
+    """
+    Deliver a batch from the escalation queue, all of one tenant. A single
+    escalation uses the original endpoint; several go to /batch in one round
+    trip. Both are scoped by the tenant header.
+
+    Any rejection of a batch (including a 404 from a backend without /batch)
+    raises PermanentDeliveryError, and the queue falls back to single
+    requests. A single request is only rejected for good on a 4xx other than
+    404 (not routed yet, e.g. mid-deploy), 408 and 429, which are retried;
+    409 means the backend already has it.
+    """
+    tenant_id = payloads[0].get("tenant_id")
+    headers = tenant_headers(tenant_id) if tenant_id else {}
+    payloads = [{k: v for k, v in payload.items() if k != "tenant_id"} for payload in payloads]
+    if len(payloads) == 1:
+        url, body = f"{API_BASE_URL}/api/help-requests", payloads[0]
+    else:
+        url, body = f"{API_BASE_URL}/api/help-requests/batch", {"requests": payloads}
+
+    response = await get_http_client().post(url, endpoint=HELP_REQUEST, json=body, headers=headers)
+    if len(payloads) == 1 and response.status_code == 409:
+        logger.info("Help request already delivered to backend")
+        return
+    retryable = (404, 408, 429) if len(payloads) == 1 else (408, 429)
+    if 400 <= response.status_code < 500 and response.status_code not in retryable:
+        raise PermanentDeliveryError(f"{response.status_code} - {response.text}")
+    response.raise_for_status()
+    logger.info(f"Delivered {len(payloads)} help request(s) to backend")
+
+
 @function_tool
+@traced("tool.create_help_request")
 async def create_help_request(question: str) -> str:
     """
     Create a help request to escalate customer question to supervisor.
@@ -244,27 +819,31 @@ async def create_help_request(question: str) -> str:
             return "error"
 
         # Extract customer phone from SIP participant
-        customer_phone = "unknown"
+        customer_phone = get_caller_phone(job_ctx.room) or "unknown"
         call_id = job_ctx.room.name
-
-        for participant in job_ctx.room.remote_participants.values():
-            if hasattr(participant, 'identity') and participant.identity.startswith("sip_"):
-                # Try to extract phone from identity or metadata
-                customer_phone = participant.identity.replace("sip_", "") or "unknown"
-                logger.info(f"Extracted customer phone from SIP participant: {customer_phone}")
-                break
+        tenant_id = current_tenant().id
+        logger.info(f"Extracted customer phone from SIP participant: {customer_phone}")
+
+        # Hand off to the background escalation queue (journaled to disk first)
+        queue = get_escalation_queue()
+        if queue is not None:
+            key = await queue.enqueue(
+                customer_phone=customer_phone, question=question, call_id=call_id, tenant_id=tenant_id
+            )
+            logger.info(f"Help request queued. Key: {key}, Question: {question[:50]}")
+            return f"created: {key}"
 
         # Create help request via API
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(
-                f"{API_BASE_URL}/api/help-requests",
-                json={
-                    "customer_phone": customer_phone,
-                    "question": question,
-                    "call_id": call_id
-                },
-                headers={"Content-Type": "application/json"}
-            )
+        response = await get_http_client().post(
+            f"{API_BASE_URL}/api/help-requests",
+            endpoint=HELP_REQUEST,
+            json={
+                "customer_phone": customer_phone,
+                "question": question,
+                "call_id": call_id
+            },
+            headers={"Content-Type": "application/json", **tenant_headers(tenant_id)}
+        )
 
         if response.status_code == 201 or response.status_code == 200:
             data = response.json()
@@ -281,6 +860,7 @@ async def create_help_request(question: str) -> str:
 
 
 @function_tool
+@traced("tool.end_call")
 async def end_call(_ctx: RunContext) -> str:
     """
     End the current call gracefully.
@@ -0,0 +1,327 @@
+import bisect
+import contextvars
+import functools
+import json
+import logging
+import os
+import secrets
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+logger = logging.getLogger("priya-salon-assistant")
+
+SERVICE_NAME = "priya-salon-assistant"
+
+# Prometheus histogram buckets (seconds)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_ns: int
+    end_ns: int | None = None
+    attributes: dict = field(default_factory=dict)
+    error: str | None = None
+
+    @property
+    def duration(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class LatencyHistograms:
+    """Process-wide Prometheus histograms of span durations, labelled by span name."""
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS) -> None:
+        self.buckets = buckets
+        self._counts: dict[str, list[int]] = {}
+        self._sums: dict[str, float] = {}
+
+    def observe(self, name: str, seconds: float) -> None:
+        counts = self._counts.setdefault(name, [0] * (len(self.buckets) + 1))
+        counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self._sums[name] = self._sums.get(name, 0.0) + seconds
+
+    def render(self) -> str:
+        lines = [
+            "# HELP priya_span_duration_seconds Latency of agent pipeline stages",
+            "# TYPE priya_span_duration_seconds histogram",
+        ]
+        for name in sorted(self._counts):
+            cumulative = 0
+            for le, count in zip((*self.buckets, "+Inf"), self._counts[name]):
+                cumulative += count
+                lines.append(f'priya_span_duration_seconds_bucket{{span="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'priya_span_duration_seconds_sum{{span="{name}"}} {self._sums[name]:.6f}')
+            lines.append(f'priya_span_duration_seconds_count{{span="{name}"}} {cumulative}')
+        return "\n".join(lines) + "\n"
+
+
+HISTOGRAMS = LatencyHistograms()
+
+# Callables returning Prometheus text appended to the exported textfile
+PROMETHEUS_RENDERERS = [HISTOGRAMS.render]
+
+_tracer: contextvars.ContextVar["CallTracer | None"] = contextvars.ContextVar("call_tracer", default=None)
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("current_span", default=None)
+
+
+class CallTracer:
+    """
+    Collects the spans of one call. Each user turn gets a root `turn` span,
+    opened when end-of-utterance is detected; tool calls and pipeline
+    metrics (LLM, TTS, STT) that follow are recorded as its children.
+    """
+
+    def __init__(self, call_id: str) -> None:
+        self.call_id = call_id
+        self.trace_id = secrets.token_hex(16)
+        self.started_ns = time.time_ns()
+        self.spans: list[Span] = []
+        self.turns: list[Span] = []
+
+    def _new_span(self, name: str, parent: Span | None, start_ns: int, attributes: dict | None = None) -> Span:
+        span = Span(
+            name=name,
+            trace_id=self.trace_id,
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else None,
+            start_ns=start_ns,
+            attributes=attributes or {},
+        )
+        self.spans.append(span)
+        return span
+
+    def _finish(self, span: Span, end_ns: int) -> None:
+        span.end_ns = end_ns
+        HISTOGRAMS.observe(span.name, span.duration)
+
+    @property
+    def current_turn(self) -> Span | None:
+        return self.turns[-1] if self.turns else None
+
+    def start_turn(self, start_ns: int) -> Span:
+        self._close_turn()
+        turn = self._new_span("turn", None, start_ns, {"call_id": self.call_id, "turn": len(self.turns) + 1})
+        self.turns.append(turn)
+        return turn
+
+    def _close_turn(self) -> None:
+        turn = self.current_turn
+        if turn is None or turn.end_ns is not None:
+            return
+        children = [s.end_ns for s in self.spans if s.parent_id == turn.span_id and s.end_ns]
+        self._finish(turn, max(children, default=turn.start_ns))
+
+    def record(self, name: str, start_ns: int, end_ns: int, parent: Span | None = None, **attributes) -> Span:
+        """Record an already-finished span, e.g. one reconstructed from pipeline metrics."""
+        span = self._new_span(name, parent or self.current_turn, start_ns, attributes)
+        self._finish(span, end_ns)
+        return span
+
+    def on_metrics(self, metrics) -> None:
+        """Turn AgentSession `metrics_collected` payloads into spans."""
+        from livekit.agents.metrics import EOUMetrics, LLMMetrics, STTMetrics, TTSMetrics
+
+        end_ns = int(metrics.timestamp * 1e9)
+        if isinstance(metrics, EOUMetrics):
+            start_ns = end_ns - int(metrics.end_of_utterance_delay * 1e9)
+            turn = self.start_turn(start_ns)
+            turn.attributes["speech_id"] = metrics.speech_id or ""
+            self.record("eou", start_ns, end_ns, transcription_delay=metrics.transcription_delay)
+        elif isinstance(metrics, LLMMetrics):
+            start_ns = end_ns - int(metrics.duration * 1e9)
+            llm = self.record("llm", start_ns, end_ns, model=metrics.label, completion_tokens=metrics.completion_tokens,
+                              prompt_tokens=metrics.prompt_tokens, cancelled=metrics.cancelled)
+            self.record("llm.ttft", start_ns, start_ns + int(metrics.ttft * 1e9), parent=llm)
+        elif isinstance(metrics, TTSMetrics):
+            start_ns = end_ns - int(metrics.duration * 1e9)
+            tts = self.record("tts", start_ns, end_ns, model=metrics.label, characters=metrics.characters_count,
+                              cancelled=metrics.cancelled)
+            if metrics.ttfb >= 0:
+                self.record("tts.ttfa", start_ns, start_ns + int(metrics.ttfb * 1e9), parent=tts)
+        elif isinstance(metrics, STTMetrics):
+            start_ns = end_ns - int(metrics.duration * 1e9)
+            self.record("stt", start_ns, end_ns, model=metrics.label, audio_duration=metrics.audio_duration)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        parent = _current_span.get() or self.current_turn
+        span = self._new_span(name, parent, time.time_ns(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span, time.time_ns())
+
+    def _descendants(self, root: Span) -> list[Span]:
+        ids, found = {root.span_id}, []
+        for span in self.spans:  # parents are always created before their children
+            if span.parent_id in ids:
+                ids.add(span.span_id)
+                found.append(span)
+        return found
+
+    def summary(self) -> dict:
+        """Per-call latency summary: percentiles per span name and a per-turn breakdown."""
+        self._close_turn()
+        by_name: dict[str, list[float]] = {}
+        for span in self.spans:
+            if span.end_ns is not None:
+                by_name.setdefault(span.name, []).append(span.duration * 1000)
+
+        def pct(values: list[float], p: float) -> float:
+            values = sorted(values)
+            return round(values[min(len(values) - 1, int(p * len(values)))], 1)
+
+        turns = []
+        for turn in self.turns:
+            breakdown = {"turn": turn.attributes["turn"], "total_ms": round(turn.duration * 1000, 1)}
+            for span in self._descendants(turn):
+                key = f"{span.name}_ms"
+                breakdown[key] = round(breakdown.get(key, 0.0) + span.duration * 1000, 1)
+            turns.append(breakdown)
+
+        return {
+            "call_id": self.call_id,
+            "trace_id": self.trace_id,
+            "duration_s": round((time.time_ns() - self.started_ns) / 1e9, 1),
+            "turns": len(self.turns),
+            "spans": {
+                name: {"count": len(v), "p50_ms": pct(v, 0.5), "p95_ms": pct(v, 0.95), "max_ms": round(max(v), 1)}
+                for name, v in sorted(by_name.items())
+            },
+            "per_turn": turns,
+        }
+
+    def to_otlp(self) -> dict:
+        """OTLP/JSON `ExportTraceServiceRequest` body."""
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    _otlp_attribute("service.name", SERVICE_NAME),
+                    _otlp_attribute("call.id", self.call_id),
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": SERVICE_NAME},
+                    "spans": [s.to_otlp() for s in self.spans if s.end_ns is not None],
+                }],
+            }]
+        }
+
+
+@contextmanager
+def trace_span(name: str, **attributes):
+    """Span under the current call's tracer; a no-op outside a traced call."""
+    tracer = _tracer.get()
+    if tracer is None:
+        yield None
+        return
+    with tracer.span(name, **attributes) as span:
+        yield span
+
+
+def annotate_span(**attributes) -> None:
+    """Attach attributes to the innermost open span, if any."""
+    span = _current_span.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+def traced(name: str):
+    """Decorator recording each call of an async function as a span (place under @function_tool)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with trace_span(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def tracing_enabled() -> bool:
+    """TRACING=true/false; unset, tracing is on only when there is somewhere to export the spans to."""
+    setting = os.getenv("TRACING")
+    if setting is not None:
+        return setting.lower() == "true"
+    return bool(os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT") or os.getenv("TRACE_EXPORT_DIR"))
+
+
+def start_call_tracing(call_id: str) -> CallTracer:
+    """Create the tracer for this job and make it current for tasks spawned from here on."""
+    tracer = CallTracer(call_id)
+    _tracer.set(tracer)
+    return tracer
+
+
+async def export_call_trace(tracer: CallTracer) -> None:
+    """
+    Log the per-call summary and export spans. With TRACE_EXPORT_DIR set,
+    writes <call_id>.summary.json, <call_id>.otlp.json and a Prometheus
+    textfile (priya_agent_<pid>.prom, for node_exporter's textfile
+    collector). With OTEL_EXPORTER_OTLP_ENDPOINT set, also POSTs the spans
+    to <endpoint>/v1/traces.
+    """
+    summary = tracer.summary()
+    logger.info(f"[Trace] Call summary: {json.dumps(summary)}")
+
+    export_dir = os.getenv("TRACE_EXPORT_DIR")
+    if export_dir:
+        try:
+            os.makedirs(export_dir, exist_ok=True)
+            with open(os.path.join(export_dir, f"{tracer.call_id}.summary.json"), "w") as f:
+                json.dump(summary, f, indent=2)
+            with open(os.path.join(export_dir, f"{tracer.call_id}.otlp.json"), "w") as f:
+                json.dump(tracer.to_otlp(), f)
+            prom_path = os.path.join(export_dir, f"priya_agent_{os.getpid()}.prom")
+            with open(f"{prom_path}.tmp", "w") as f:
+                f.write("".join(render() for render in PROMETHEUS_RENDERERS))
+            os.replace(f"{prom_path}.tmp", prom_path)
+        except OSError as e:
+            logger.warning(f"[Trace] Failed to write trace files to {export_dir}: {e}")
+
+    otlp_endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    if otlp_endpoint:
+        from http_client import TRACE_EXPORT, get_http_client
+
+        try:
+            response = await get_http_client().post(
+                f"{otlp_endpoint.rstrip('/')}/v1/traces", endpoint=TRACE_EXPORT, json=tracer.to_otlp()
+            )
+            if response.status_code >= 300:
+                logger.warning(f"[Trace] OTLP export failed: {response.status_code}")
+        except Exception as e:
+            logger.warning(f"[Trace] OTLP export failed: {e}")
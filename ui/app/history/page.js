@@ -1,7 +1,7 @@
 "use client";
 
 import { useEffect, useState } from "react";
-import { helpRequests } from "@/lib/api";
+import { helpRequests, subscribeToChanges } from "@/lib/api";
 
 export default function RequestHistoryPage() {
   const [requests, setRequests] = useState([]);
@@ -11,9 +11,8 @@ export default function RequestHistoryPage() {
 
   useEffect(() => {
     loadRequests();
-    // Auto-refresh every 30 seconds
-    const interval = setInterval(loadRequests, 30000);
-    return () => clearInterval(interval);
+    // Refresh when the backend pushes a change
+    return subscribeToChanges(["help_requests"], loadRequests);
   }, [filter]);
 
   async function loadRequests() {
@@ -1,7 +1,7 @@
 'use client'
 
 import { useEffect, useState } from 'react'
-import { knowledgeBase } from '@/lib/api'
+import { knowledgeBase, subscribeToChanges } from '@/lib/api'
 import Link from 'next/link'
 import { useToast } from '@/components/Toast'
 import { ConfirmDialog } from '@/components/ConfirmDialog'
@@ -16,9 +16,8 @@ export default function LearnedAnswersPage() {
 
   useEffect(() => {
     loadLearnedAnswers()
-    // Auto-refresh every 30 seconds
-    const interval = setInterval(loadLearnedAnswers, 30000)
-    return () => clearInterval(interval)
+    // Refresh when the backend pushes a change
+    return subscribeToChanges(['knowledge_base'], loadLearnedAnswers)
   }, [])
 
   async function loadLearnedAnswers() {
@@ -1,7 +1,7 @@
 "use client";
 
 import { useEffect, useState } from "react";
-import { helpRequests, knowledgeBase } from "../lib/api";
+import { helpRequests, knowledgeBase, subscribeToChanges } from "../lib/api";
 import Link from "next/link";
 
 export default function DashboardPage() {
@@ -13,9 +13,8 @@ export default function DashboardPage() {
 
   useEffect(() => {
     loadStats();
-    // Auto-refresh every 30 seconds
-    const interval = setInterval(loadStats, 30000);
-    return () => clearInterval(interval);
+    // Refresh when the backend pushes a change
+    return subscribeToChanges(["help_requests", "knowledge_base"], loadStats);
   }, []);
 
   async function loadStats() {
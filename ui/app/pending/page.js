@@ -1,7 +1,7 @@
 'use client'
 
 import { useEffect, useState } from 'react'
-import { helpRequests } from '@/lib/api'
+import { helpRequests, subscribeToChanges } from '@/lib/api'
 import { useToast } from '@/components/Toast'
 
 export default function PendingRequestsPage() {
@@ -12,9 +12,8 @@ export default function PendingRequestsPage() {
 
   useEffect(() => {
     loadPendingRequests()
-    // Auto-refresh every 30 seconds
-    const interval = setInterval(loadPendingRequests, 30000)
-    return () => clearInterval(interval)
+    // Refresh when the backend pushes a change
+    return subscribeToChanges(['help_requests'], loadPendingRequests)
   }, [])
 
   async function loadPendingRequests() {
@@ -124,3 +124,40 @@ export const knowledgeBase = {
     });
   },
 };
+
+// Live updates (server-sent events from /events)
+// Calls onChange() whenever help requests or knowledge base entries of the
+// given topics change, so pages refetch instead of polling. Changes arriving
+// together (an answer resolves a request and adds a knowledge base entry) are
+// coalesced into one call. onChange() is also called whenever the stream
+// (re)connects, since changes made while it was down were not delivered.
+// Returns a function that closes the stream.
+export function subscribeToChanges(topics, onChange) {
+  const params = new URLSearchParams({ topics: topics.join(",") });
+  const source = new EventSource(`${API_BASE_URL}/events?${params.toString()}`);
+  let timer = null;
+  let fallback = null;
+
+  const notify = () => {
+    clearTimeout(timer);
+    timer = setTimeout(onChange, 250);
+  };
+
+  ["ready", "resync", ...topics].forEach((event) =>
+    source.addEventListener(event, notify)
+  );
+
+  source.onerror = () => {
+    // EventSource retries dropped streams itself, but gives up on HTTP errors
+    // (e.g. a backend without /events): fall back to polling every 30 seconds
+    if (source.readyState === EventSource.CLOSED && !fallback) {
+      fallback = setInterval(onChange, 30000);
+    }
+  };
+
+  return () => {
+    source.close();
+    clearTimeout(timer);
+    clearInterval(fallback);
+  };
+}